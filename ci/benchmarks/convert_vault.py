@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Times `obsidianhtml convert` end-to-end and per phase on generated vaults of several sizes (see generate_vault.py), and writes the results
+to a json file, so that the results of two commits can be compared.
+
+Usage (from the root of this repo):
+    python ci/benchmarks/convert_vault.py run [--sizes 1000,10000,50000] [--repeat 1] [--jobs 1] [--output benchmark.json]
+    python ci/benchmarks/convert_vault.py compare <old results.json> <new results.json>
+
+The vaults and the output are kept in --work-folder (default: /tmp/obsidianhtml_benchmark), vaults are only generated again when the
+generator settings change. The per phase timings come from the report of `obsidianhtml convert --profile` (see core/Profiler.py).
+Versions of obsidianhtml without --profile (or --jobs) ignore the option, for these only the end-to-end time is recorded.
+Every conversion runs in a new process, using the obsidianhtml package in this repo, or in the checkout given with --repo (e.g. a
+`git worktree` of an older commit, which does not contain this script).
+"""
+
+import os
+import sys
+import json
+import time
+import yaml
+import argparse
+import platform
+import subprocess
+
+from pathlib import Path
+
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent))
+from generate_vault import get_arguments as get_generator_arguments, get_settings, generate_vault, vault_is_up_to_date
+
+REPO_ROOT = Path(os.path.realpath(__file__)).parent.parent.parent
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks obsidianhtml convert on generated vaults.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="run the benchmark")
+    run.add_argument("--sizes", default="1000,10000,50000", help="comma separated amounts of notes (default: 1000,10000,50000)")
+    run.add_argument("--repeat", type=int, default=1, help="amount of runs per size, the fastest run is kept (default: 1)")
+    run.add_argument("--jobs", type=int, default=1, help="passed on to obsidianhtml convert --jobs (default: 1)")
+    run.add_argument("--work-folder", default="/tmp/obsidianhtml_benchmark", help="folder for the vaults and the output")
+    run.add_argument("--output", default="benchmark.json", help="path of the results file (default: benchmark.json)")
+    run.add_argument("--generator-args", default="", help='extra arguments for generate_vault.py, e.g. "--links 10 --depth 5"')
+    run.add_argument("--repo", default=REPO_ROOT.as_posix(), help="checkout of obsidianhtml to benchmark (default: this repo)")
+
+    compare = subparsers.add_parser("compare", help="compare two results files")
+    compare.add_argument("old")
+    compare.add_argument("new")
+
+    return parser.parse_args()
+
+
+def get_commit(repo_root):
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=repo_root, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_config(work_folder, vault_folder):
+    output_folder = work_folder.joinpath("output")
+    config = {
+        "obsidian_entrypoint_path_str": vault_folder.joinpath("index.md").as_posix(),
+        "md_folder_path_str": output_folder.joinpath("md").as_posix(),
+        "md_entrypoint_path_str": output_folder.joinpath("md/index.md").as_posix(),
+        "html_output_folder_path_str": output_folder.joinpath("html").as_posix(),
+        "module_data_folder": output_folder.joinpath("mod").as_posix(),
+        "toggles": {"process_all": True},
+    }
+    config_path = work_folder.joinpath("config.yml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write(yaml.dump(config))
+    return config_path
+
+
+def convert(repo_root, config_path, profile_path, jobs):
+    if profile_path.exists():
+        profile_path.unlink()
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "obsidianhtml", "convert", "-i", config_path.as_posix(), "--jobs", str(jobs), "--profile", profile_path.as_posix()],
+        cwd=repo_root,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stdout.decode(errors="replace")[-3000:])
+        raise Exception(f"obsidianhtml convert failed with exit code {result.returncode}")
+
+    # versions without --profile only get the end-to-end time
+    if not profile_path.exists():
+        return {
+            "seconds": seconds,
+            "peak_rss_kb": None,
+            "peak_rss_kb_workers": None,
+            "bytes_read": None,
+            "bytes_written": None,
+            "phases": {},
+            "modules": None,
+        }
+
+    with open(profile_path, "r", encoding="utf-8") as f:
+        profile = json.loads(f.read())
+
+    return {
+        "seconds": seconds,
+        "peak_rss_kb": profile["peak_rss_kb"],
+        "peak_rss_kb_workers": profile["peak_rss_kb_workers"],
+        "bytes_read": profile["bytes_read"],
+        "bytes_written": profile["bytes_written"],
+        # module runs are summed up, these are mostly constant
+        "phases": {x["name"]: x["seconds"] for x in profile["phases"] if not x["name"].startswith("module:")},
+        "modules": sum(x["seconds"] for x in profile["phases"] if x["name"].startswith("module:")),
+    }
+
+
+def run(args):
+    work_folder = Path(args.work_folder).resolve()
+    repo_root = Path(args.repo).resolve()
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+
+    results = {
+        "commit": get_commit(repo_root),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "jobs": args.jobs,
+        "repeat": args.repeat,
+        "runs": [],
+    }
+
+    for size in sizes:
+        vault_folder = work_folder.joinpath(f"vault_{size}")
+        settings = get_settings(get_generator_arguments([vault_folder.as_posix(), "--notes", str(size)] + args.generator_args.split()))
+        if not vault_is_up_to_date(vault_folder, settings):
+            print(f"Generating vault with {size} notes")
+            generate_vault(vault_folder, settings)
+
+        config_path = write_config(work_folder, vault_folder)
+
+        best = None
+        for i in range(args.repeat):
+            print(f"Converting vault with {size} notes ({i + 1}/{args.repeat})", end="", flush=True)
+            result = convert(repo_root, config_path, work_folder.joinpath("profile.json"), args.jobs)
+            print(f": {result['seconds']:.2f}s")
+            if best is None or result["seconds"] < best["seconds"]:
+                best = result
+
+        results["runs"].append({"notes": size, "generator": settings, **best})
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+
+def compare(args):
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.loads(f.read())
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.loads(f.read())
+
+    def line(name, a, b):
+        if a is None or b is None:
+            return f"  {name:40} {'-' if a is None else f'{a:9.2f}s':>10} {'-' if b is None else f'{b:9.2f}s':>10}"
+        change = (b - a) / a * 100 if a else 0
+        return f"  {name:40} {a:9.2f}s {b:9.2f}s {change:+7.1f}%"
+
+    print(f"old: {old['commit']}, new: {new['commit']}")
+    old_runs = {x["notes"]: x for x in old["runs"]}
+    for new_run in new["runs"]:
+        old_run = old_runs.get(new_run["notes"])
+        if old_run is None:
+            continue
+        print(f"\n{new_run['notes']} notes")
+        print(line("total", old_run["seconds"], new_run["seconds"]))
+        for name in list(dict.fromkeys(list(old_run["phases"].keys()) + list(new_run["phases"].keys()))):
+            print(line(name, old_run["phases"].get(name), new_run["phases"].get(name)))
+        if old_run["peak_rss_kb"] is not None and new_run["peak_rss_kb"] is not None:
+            print(f"  {'peak rss (MB)':40} {old_run['peak_rss_kb'] / 1024:9.1f}  {new_run['peak_rss_kb'] / 1024:9.1f}")
+
+
+def main():
+    args = get_arguments()
+    if args.command == "run":
+        run(args)
+    elif args.command == "compare":
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
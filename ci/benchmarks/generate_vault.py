@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+Generates a synthetic obsidian vault to benchmark the conversion with. The same arguments always result in the same vault.
+
+Usage (from the root of this repo):
+    python ci/benchmarks/generate_vault.py <output folder> [--notes 1000] [--links 5] [--depth 3] ...
+
+Run with -h to see all the options. The entrypoint of the vault is <output folder>/index.md
+"""
+
+import os
+import sys
+import json
+import shutil
+import random
+import argparse
+
+from pathlib import Path
+
+# Smallest valid png (1x1 pixel), used for all the attachments
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d4944415478da63f8cfc0f01f0005000201a5dd39d90000000049454e44ae426082"
+)
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore magna aliqua "
+    "enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+CALLOUT_TYPES = ("note", "info", "tip", "warning", "example", "quote")
+
+CODE_BLOCKS = (
+    ("python", "def add(a, b):\n    return a + b\n\nprint(add({i}, 1))"),
+    ("bash", "for x in $(seq 1 {i}); do\n    echo $x\ndone"),
+    ("js", "const note = {i};\nconsole.log(`note ${{note}}`);"),
+)
+
+
+def get_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Generates a deterministic obsidian vault to benchmark the conversion with.")
+    parser.add_argument("output_folder", help="folder to write the vault to (emptied first)")
+    parser.add_argument("--notes", type=int, default=1000, help="amount of notes (default: 1000)")
+    parser.add_argument("--links", type=int, default=5, help="amount of links to other notes per note (default: 5)")
+    parser.add_argument("--depth", type=int, default=3, help="depth of the folder structure (default: 3)")
+    parser.add_argument("--folders", type=int, default=4, help="amount of subfolders per folder (default: 4)")
+    parser.add_argument("--attachments", type=float, default=0.2, help="amount of embedded images per note (default: 0.2)")
+    parser.add_argument("--tags", type=int, default=3, help="amount of tags per note, half in the frontmatter, half inline (default: 3)")
+    parser.add_argument("--tag-pool", type=int, default=50, help="amount of distinct tags in the vault (default: 50)")
+    parser.add_argument("--inclusions", type=float, default=0.2, help="amount of included notes per note (default: 0.2)")
+    parser.add_argument("--callouts", type=float, default=1, help="amount of callouts per note (default: 1)")
+    parser.add_argument("--code-blocks", type=float, default=1, help="amount of code blocks per note (default: 1)")
+    parser.add_argument("--paragraphs", type=int, default=3, help="amount of paragraphs of text per note (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator (default: 0)")
+    return parser.parse_args(argv)
+
+
+def get_settings(args):
+    settings = vars(args).copy()
+    del settings["output_folder"]
+    return settings
+
+
+def get_folders(depth, folders_per_folder):
+    """Returns the relative paths (posix) of all the folders in the tree, "" being the root folder"""
+    folders = [""]
+    level = [""]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(folders_per_folder):
+                next_level.append("/".join(x for x in (parent, f"folder {i}") if x))
+        folders += next_level
+        level = next_level
+    return folders
+
+
+def count(rnd, amount):
+    """Turns a (possibly fractional) average amount into a whole amount for a single note"""
+    whole = int(amount)
+    if rnd.random() < amount - whole:
+        whole += 1
+    return whole
+
+
+def sentence(rnd, length=12):
+    return " ".join(rnd.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+
+def generate_vault(output_folder, settings):
+    rnd = random.Random(settings["seed"])
+    output_folder = Path(output_folder)
+
+    if output_folder.exists():
+        shutil.rmtree(output_folder)
+    output_folder.joinpath(".obsidian").mkdir(parents=True)
+    output_folder.joinpath("attachments").mkdir()
+
+    n = settings["notes"]
+    folders = get_folders(settings["depth"], settings["folders"])
+    tags = [f"topic/{rnd.choice(WORDS)}{i}" for i in range(settings["tag_pool"])]
+
+    # note i is placed in a folder, names are unique so that wikilinks don't need a path
+    names = [f"Note {i}" for i in range(n)]
+    paths = [Path("/".join(x for x in (folders[i % len(folders)], f"{names[i]}.md") if x)) for i in range(n)]
+
+    # inclusions only point to notes without inclusions, so that these cannot be recursive
+    leaf_notes = list(range(0, n, 10))
+
+    attachment_count = 0
+    for i in range(n):
+        lines = []
+
+        # frontmatter
+        note_tags = rnd.sample(tags, min(settings["tags"], len(tags)))
+        frontmatter_tags = note_tags[: (len(note_tags) + 1) // 2]
+        inline_tags = note_tags[len(frontmatter_tags) :]
+        lines.append("---")
+        lines.append(f"tags: [{', '.join(frontmatter_tags)}]")
+        lines.append(f"created: 2023-01-{(i % 28) + 1:02d}")
+        lines.append("---")
+        lines.append(f"# {names[i]}")
+        lines.append("")
+
+        for p in range(settings["paragraphs"]):
+            lines.append(" ".join(sentence(rnd) for _ in range(3)))
+            lines.append("")
+            if p == 0 and len(inline_tags) > 0:
+                lines.append(" ".join(f"#{x}" for x in inline_tags))
+                lines.append("")
+
+        # links
+        lines.append("## Links")
+        for _ in range(settings["links"]):
+            target = rnd.randrange(n)
+            if rnd.random() < 0.5:
+                lines.append(f"- [[{names[target]}]]")
+            else:
+                rel_path = Path(os.path.relpath(paths[target], paths[i].parent)).as_posix()
+                lines.append(f"- [{names[target]}]({rel_path.replace(' ', '%20')})")
+        lines.append("")
+
+        # callouts
+        for _ in range(count(rnd, settings["callouts"])):
+            lines.append(f"> [!{rnd.choice(CALLOUT_TYPES)}] {sentence(rnd, 4)}")
+            lines.append(f"> {sentence(rnd)}")
+            lines.append("")
+
+        # code blocks
+        for _ in range(count(rnd, settings["code_blocks"])):
+            language, code = rnd.choice(CODE_BLOCKS)
+            lines.append(f"``` {language}")
+            lines.append(code.format(i=i))
+            lines.append("```")
+            lines.append("")
+
+        # attachments
+        for _ in range(count(rnd, settings["attachments"])):
+            name = f"image {attachment_count}.png"
+            output_folder.joinpath("attachments", name).write_bytes(PNG_BYTES)
+            attachment_count += 1
+            lines.append(f"![[{name}]]")
+            lines.append("")
+
+        # inclusions
+        if i % 10 != 0:
+            for _ in range(count(rnd, settings["inclusions"])):
+                lines.append(f"![[{names[rnd.choice(leaf_notes)]}]]")
+                lines.append("")
+
+        note_path = output_folder.joinpath(paths[i])
+        note_path.parent.mkdir(parents=True, exist_ok=True)
+        note_path.write_text("\n".join(lines), encoding="utf-8")
+
+    # entrypoint links to the first note of every folder, the rest is found through the links (or process_all)
+    index = ["# Index", ""]
+    for i in range(min(n, len(folders))):
+        index.append(f"- [[{names[i]}]]")
+    output_folder.joinpath("index.md").write_text("\n".join(index) + "\n", encoding="utf-8")
+
+    # record the settings, so that the vault does not need to be generated again for the same settings
+    output_folder.joinpath(".obsidian", "generate_vault.json").write_text(json.dumps(settings, sort_keys=True), encoding="utf-8")
+
+    return output_folder.joinpath("index.md")
+
+
+def vault_is_up_to_date(output_folder, settings):
+    settings_path = Path(output_folder).joinpath(".obsidian", "generate_vault.json")
+    if not settings_path.exists():
+        return False
+    return json.loads(settings_path.read_text(encoding="utf-8")) == json.loads(json.dumps(settings, sort_keys=True))
+
+
+def main():
+    args = get_arguments()
+    entrypoint = generate_vault(args.output_folder, get_settings(args))
+    print(f"Generated vault with {args.notes} notes, entrypoint: {entrypoint.as_posix()}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Measures the per-page overhead of converting markdown to html (md2html.pythonmarkdown_convert_md_to_html), with a markdown converter
+that is created for every page versus the cached converter that is reused between pages.
+
+Usage (from the root of this repo):
+    python ci/benchmarks/markdown_converter.py [number of notes, default 3000]
+"""
+
+import os
+import sys
+import time
+import yaml
+
+from pathlib import Path
+
+# add /obsidian-html to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent))
+
+from obsidianhtml import md2html
+from obsidianhtml.lib import OpenIncludedFile
+from obsidianhtml.core.PicknickBasket import PicknickBasket
+
+
+def generate_note(i):
+    """Small note that touches most of the extensions"""
+    return f"""# Note {i}
+
+Some **bold** and ==highlighted== text, a ~~strikethrough~~ and a footnote[^1].
+
+## Header {i}.1
+- item {i}
+- item {i + 1}
+
+> [!note] Callout {i}
+> Callout contents
+
+``` python
+print({i})
+```
+
+[^1]: Footnote of note {i}
+"""
+
+
+def run(pb, notes, reuse):
+    start = time.perf_counter()
+    for i, note in enumerate(notes):
+        if not reuse:
+            md2html._markdown_converters.clear()
+        md2html.pythonmarkdown_convert_md_to_html(pb, note, Path(f"note_{i}.html"))
+    return time.perf_counter() - start
+
+
+def main():
+    n = 3000
+    if len(sys.argv) > 1:
+        n = int(sys.argv[1])
+
+    pb = PicknickBasket()
+    pb.config = yaml.safe_load(OpenIncludedFile("defaults_config.yml"))
+    pb.paths = {}
+
+    notes = [generate_note(i) for i in range(n)]
+
+    # warm up: imports, regex compilation, pygments lexers
+    run(pb, notes[:10], reuse=False)
+
+    new_per_page = run(pb, notes, reuse=False)
+    reused = run(pb, notes, reuse=True)
+
+    print(f"notes: {n}")
+    print(f"new converter per page: {new_per_page:.2f}s ({new_per_page / n * 1000:.3f} ms/page)")
+    print(f"reused converter:       {reused:.2f}s ({reused / n * 1000:.3f} ms/page)")
+    print(f"setup overhead per page: {(new_per_page - reused) / n * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+from pathlib import Path
+import os
+import sys
+import yaml
+import shutil
+import tempfile
+import subprocess
+
+import regex as re
+
+# unittest
+import unittest
+
+# Helper functions
+# --------------------------------
+# add /obsidian-html/ci to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent))
+from tests.lib import get_paths, customize_default_config
+
+USE_PIP_INSTALL = (os.getenv('OBS_HTML_USE_PIP_INSTALL') == 'true')
+
+# files that differ between two runs on the same input
+VOLATILE_FILES = ['obs.html/data/search.json.gzip', 'obs.html/data/search_index.json.gzip']
+
+
+def convert(vault_path, output_path, incremental, extra_config=()):
+    """ Converts the vault to output_path/{md,html}, returns the printout of the conversion """
+    output_path.mkdir(parents=True, exist_ok=True)
+    config = customize_default_config([
+        ('obsidian_entrypoint_path_str', vault_path.joinpath('entrypoint.md').as_posix()),
+        ('md_folder_path_str', output_path.joinpath('md').as_posix()),
+        ('md_entrypoint_path_str', output_path.joinpath('md/index.md').as_posix()),
+        ('html_output_folder_path_str', output_path.joinpath('html').as_posix()),
+        ('module_data_folder', output_path.joinpath('mod').as_posix()),
+        ('incremental_build', incremental),
+        ('toggles/process_all', True),
+        *extra_config,
+    ], write_to_tmp_config=False)
+
+    config_path = output_path.joinpath('config.yml')
+    with open(config_path, 'w', encoding="utf-8") as f:
+        f.write(yaml.dump(config))
+
+    command = ['obsidianhtml'] if USE_PIP_INSTALL else ['python', '-m', 'obsidianhtml']
+    result = subprocess.run(command + ['convert', '-i', config_path.as_posix()], cwd=get_paths()['root'], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Conversion failed:\n{result.stdout}\n{result.stderr}")
+    return result.stdout
+
+
+def list_files(folder):
+    files = {}
+    for root, dirs, names in os.walk(folder):
+        for name in names:
+            path = Path(root).joinpath(name)
+            files[path.relative_to(folder).as_posix()] = path
+    return files
+
+
+def get_modified_times(folder):
+    return {rel_path: path.stat().st_mtime_ns for rel_path, path in list_files(folder).items()}
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    """Changes a copy of the test vault step by step, and checks after every step that an incremental build gives the same output as a
+    fresh build, and that only the affected notes are converted again"""
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n--------------------- Incremental build -----------------------------', flush=True)
+        cls.temp_dir = Path(tempfile.mkdtemp())
+        cls.vault = cls.temp_dir.joinpath('vault')
+        shutil.copytree(get_paths()['test_vault'], cls.vault)
+
+        cls.incremental = cls.temp_dir.joinpath('incremental')
+        convert(cls.vault, cls.incremental, incremental=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def scribe(self, msg):
+        print(f'Incremental build:\t > {msg}', flush=True)
+
+    def build(self):
+        """ Does an incremental build, returns (amount of pages rendered, total amount of pages, markdown files that were written) """
+        before = get_modified_times(self.incremental.joinpath('md'))
+        printout = convert(self.vault, self.incremental, incremental=True)
+        after = get_modified_times(self.incremental.joinpath('md'))
+
+        rendered, total = re.search(r'INCREMENTAL BUILD: (\d+) of (\d+) pages changed', printout).groups()
+        written = sorted([x for x in after if before.get(x) != after[x]])
+        return (int(rendered), int(total), written)
+
+    def assertSameAsFreshBuild(self):
+        fresh = self.temp_dir.joinpath('fresh')
+        if fresh.exists():
+            shutil.rmtree(fresh)
+        convert(self.vault, fresh, incremental=False)
+
+        for folder in ('md', 'html'):
+            expected = list_files(fresh.joinpath(folder))
+            actual = list_files(self.incremental.joinpath(folder))
+            self.assertEqual(sorted(expected.keys()), sorted(actual.keys()), msg=f'Different files in the {folder} folder')
+
+            for rel_path, path in expected.items():
+                if rel_path in VOLATILE_FILES:
+                    continue
+                with open(path, 'rb') as f, open(actual[rel_path], 'rb') as g:
+                    self.assertTrue(f.read() == g.read(), msg=f'{folder}/{rel_path} differs from a fresh build')
+
+    def edit_note(self, rel_path, old, new):
+        path = self.vault.joinpath(rel_path)
+        with open(path, 'r', encoding="utf-8") as f:
+            contents = f.read()
+        self.assertIn(old, contents)
+        with open(path, 'w', encoding="utf-8") as f:
+            f.write(contents.replace(old, new, 1))
+
+    def test_A_no_changes(self):
+        self.scribe('a second run without changes should not render or write anything')
+        rendered, total, written = self.build()
+        self.assertEqual(rendered, 0)
+        self.assertEqual(written, [])
+        self.assertSameAsFreshBuild()
+
+    def test_B_edit(self):
+        self.scribe('editing a note should only convert that note again')
+        self.edit_note('Note link.md', '# Note link', '# Note link\nAn extra line, and a link to [[Future note]].')
+        rendered, total, written = self.build()
+        self.assertEqual(written, ['Note link.md'])
+        self.assertLess(rendered, total)
+        self.assertSameAsFreshBuild()
+
+    def test_C_tag_change(self):
+        self.scribe('changing the tags of a note should render all pages again (tags show up in every page)')
+        self.edit_note('Note link.md', '# Note link', '#incremental_build_test\n# Note link')
+        rendered, total, written = self.build()
+        self.assertEqual(written, ['Note link.md'])
+        self.assertEqual(rendered, total)
+        self.assertSameAsFreshBuild()
+
+    def test_D_add_attachment(self):
+        self.scribe('adding a file that no note links to should not convert or render anything')
+        shutil.copyfile(self.vault.joinpath('images/obsidian-html-logo.png'), self.vault.joinpath('images/unlinked.png'))
+        rendered, total, written = self.build()
+        self.assertEqual(rendered, 0)
+        self.assertEqual(written, [])
+        self.assertSameAsFreshBuild()
+
+    def test_E_add_linked_note(self):
+        self.scribe('adding a note should convert the notes that link to it again')
+        with open(self.vault.joinpath('Future note.md'), 'w', encoding="utf-8") as f:
+            f.write('# Future note\nThis note was added later.\n')
+        rendered, total, written = self.build()
+        self.assertEqual(written, ['Future note.md', 'Note link.md'])
+        self.assertSameAsFreshBuild()
+
+    def test_F_delete(self):
+        self.scribe('deleting a note should convert the notes that link to it again, and remove its output')
+        os.remove(self.vault.joinpath('Future note.md'))
+        rendered, total, written = self.build()
+        self.assertEqual(written, ['Note link.md'])
+        self.assertFalse(self.incremental.joinpath('md/Future note.md').exists())
+        self.assertFalse(self.incremental.joinpath('html/Future note.html').exists())
+        self.assertSameAsFreshBuild()
+
+
+class TestIncrementalBuildPrecompression(unittest.TestCase):
+    """With precompression enabled, the compressed files of the previous run are in the output folder when building incrementally. These
+    should not end up in the output (e.g. in the dir tree), so that a run without changes writes nothing."""
+
+    EXTRA_CONFIG = [('toggles/features/precompression/enabled', True)]
+
+    @classmethod
+    def setUpClass(cls):
+        print('\n\n--------------------- Incremental build with precompression -----------------------------', flush=True)
+        cls.temp_dir = Path(tempfile.mkdtemp())
+        cls.vault = cls.temp_dir.joinpath('vault')
+        shutil.copytree(get_paths()['test_vault'], cls.vault)
+
+        cls.incremental = cls.temp_dir.joinpath('incremental')
+        convert(cls.vault, cls.incremental, incremental=True, extra_config=cls.EXTRA_CONFIG)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_no_changes(self):
+        print('Incremental build:\t > a second run without changes should not write or compress anything', flush=True)
+        before = {folder: get_modified_times(self.incremental.joinpath(folder)) for folder in ('md', 'html')}
+        printout = convert(self.vault, self.incremental, incremental=True, extra_config=self.EXTRA_CONFIG)
+        after = {folder: get_modified_times(self.incremental.joinpath(folder)) for folder in ('md', 'html')}
+
+        for folder in ('md', 'html'):
+            self.assertEqual(sorted(before[folder].keys()), sorted(after[folder].keys()), msg=f'Different files in the {folder} folder')
+            written = sorted([x for x in after[folder] if before[folder][x] != after[folder][x]])
+            self.assertEqual(written, [], msg=f'Files in the {folder} folder were written')
+
+        self.assertIn('\t0 files compressed', printout)
+
+
+if __name__ == '__main__':
+    unittest.main()
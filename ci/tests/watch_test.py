@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+from pathlib import Path
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import http.client
+
+# unittest
+import unittest
+
+# Helper functions
+# --------------------------------
+# add /obsidian-html/ci and /obsidian-html to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent))
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent))
+
+from obsidianhtml.controller.Serve import start_server_thread
+from obsidianhtml.controller.Watch import LiveReload, PollingWatcher, InotifyWatcher, LIVE_RELOAD_URL_PATH
+
+INCLUDE_GLOBS = ["*"]
+EXCLUDE_GLOBS = [".obsidian/**/*", "*.tmp"]
+
+# (long enough for the polling watcher to see the change)
+TIMEOUT = 2
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class WatcherTests:
+    """Tests that are run for both watchers, see get_watcher()"""
+
+    def setUp(self):
+        self.folder = Path(tempfile.mkdtemp())
+        write(self.folder.joinpath('note.md'), 'note')
+        write(self.folder.joinpath('folder/nested.md'), 'nested')
+        write(self.folder.joinpath('.obsidian/app.json'), '{}')
+        self.watcher = self.get_watcher()
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.folder)
+
+    def assertChangeSeen(self, msg):
+        self.assertTrue(self.watcher.wait(timeout=TIMEOUT), msg)
+        # the changes that belong to the same edit are seen as one
+        while self.watcher.wait(timeout=0.2):
+            pass
+
+    def test_no_changes(self):
+        self.assertFalse(self.watcher.wait(timeout=0.6))
+
+    def test_modified_note(self):
+        write(self.folder.joinpath('note.md'), 'note, edited')
+        self.assertChangeSeen('modified note')
+
+    def test_created_and_removed_notes(self):
+        write(self.folder.joinpath('folder/new.md'), 'new')
+        self.assertChangeSeen('created note')
+        self.folder.joinpath('folder/new.md').unlink()
+        self.assertChangeSeen('removed note')
+
+    def test_new_folder(self):
+        write(self.folder.joinpath('new folder/new.md'), 'new')
+        self.assertChangeSeen('created folder')
+
+        # files in the new folder are watched as well
+        write(self.folder.joinpath('new folder/new.md'), 'new, edited')
+        self.assertChangeSeen('modified note in the created folder')
+
+    def test_moved_folder(self):
+        self.folder.joinpath('folder').rename(self.folder.joinpath('renamed'))
+        self.assertChangeSeen('moved folder')
+
+    def test_excluded_files(self):
+        write(self.folder.joinpath('.obsidian/app.json'), '{"edited": true}')
+        write(self.folder.joinpath('.obsidian/plugins/x.json'), '{}')
+        write(self.folder.joinpath('folder/scratch.tmp'), 'scratch')
+        self.assertFalse(self.watcher.wait(timeout=0.6))
+
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    def get_watcher(self):
+        return PollingWatcher(self.folder.as_posix(), INCLUDE_GLOBS, EXCLUDE_GLOBS)
+
+
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    def get_watcher(self):
+        try:
+            return InotifyWatcher(self.folder.as_posix(), INCLUDE_GLOBS, EXCLUDE_GLOBS)
+        except OSError as e:
+            shutil.rmtree(self.folder)
+            self.skipTest(f'inotify is not available: {e}')
+
+
+class TestLiveReload(unittest.TestCase):
+    """Serves a folder with live reload, and checks that html pages get the reload script, and that open event streams get a reload
+    event after notify()"""
+
+    def setUp(self):
+        self.folder = Path(tempfile.mkdtemp())
+        write(self.folder.joinpath('index.html'), '<html><body><p>index</p></body></html>')
+        write(self.folder.joinpath('folder/page.html'), '<p>no body</p>')
+        write(self.folder.joinpath('style.css'), 'p {}')
+
+        self.live_reload = LiveReload()
+        self.httpd = start_server_thread(0, self.folder, self.live_reload)
+        self.port = self.httpd.server_address[1]
+
+    def tearDown(self):
+        self.live_reload.notify()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.folder)
+
+    def get(self, path):
+        connection = http.client.HTTPConnection('localhost', self.port, timeout=TIMEOUT)
+        connection.request('GET', path)
+        response = connection.getresponse()
+        body = response.read().decode('utf-8')
+        connection.close()
+        return response, body
+
+    def test_html_pages_get_the_script(self):
+        for path in ('/', '/index.html', '/folder/page.html'):
+            response, body = self.get(path)
+            self.assertEqual(response.status, 200, path)
+            self.assertIn(f'new EventSource("{LIVE_RELOAD_URL_PATH}")', body, path)
+            self.assertEqual(int(response.getheader('Content-Length')), len(body.encode('utf-8')), path)
+
+        _, body = self.get('/index.html')
+        self.assertTrue(body.startswith('<html><body><p>index</p>\n<script>'), 'script is added before </body>')
+        self.assertTrue(body.endswith('</script>\n</body></html>'), 'script is added before </body>')
+
+    def test_other_files_are_served_as_is(self):
+        response, body = self.get('/style.css')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, 'p {}')
+
+        response, _ = self.get('/folder')
+        self.assertEqual(response.status, 301, 'folder without trailing slash is redirected')
+
+    def test_reload_event(self):
+        connection = http.client.HTTPConnection('localhost', self.port, timeout=TIMEOUT)
+        connection.request('GET', LIVE_RELOAD_URL_PATH)
+        response = connection.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'text/event-stream')
+
+        # notify from another thread, the way WatchVault does after a conversion
+        timer = threading.Timer(0.3, self.live_reload.notify)
+        timer.start()
+        start = time.monotonic()
+        event = response.read()
+        timer.join()
+        connection.close()
+
+        self.assertEqual(event, b'event: reload\ndata: \n\n')
+        self.assertLess(time.monotonic() - start, TIMEOUT)
+
+    def test_reload_event_for_every_open_page(self):
+        responses = []
+        for _ in range(3):
+            connection = http.client.HTTPConnection('localhost', self.port, timeout=TIMEOUT)
+            connection.request('GET', LIVE_RELOAD_URL_PATH)
+            responses.append((connection, connection.getresponse()))
+
+        self.live_reload.notify()
+        for connection, response in responses:
+            self.assertEqual(response.read(), b'event: reload\ndata: \n\n')
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,13 +7,27 @@ print(str(Path(os.path.realpath(__file__)).parent.parent))
 sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent))
 
 
+os.environ["TESTS_FAILED"] = "0"
+
+# tests that don't need a picknick basket
+from unit_tests.tests_note_to_md.golden_corpus import run_tests as test_golden_corpus
+from unit_tests.tests_features.search_tokenizer import run_tests as test_search_tokenizer
+from unit_tests.tests_features.rss_page_values import run_tests as test_rss_page_values
+from unit_tests.tests_modules.get_file_list import run_tests as test_get_file_list
+from unit_tests.tests_compiler.static_assets import run_tests as test_static_assets
+
+test_golden_corpus()
+test_search_tokenizer()
+test_rss_page_values()
+test_get_file_list()
+test_static_assets()
+
+# tests that need a picknick basket (see unit_test_init.py)
 from unit_tests.tests_md_to_html.codeblocks_in_footnote import run_tests as test_codeblocks_in_footnote
 from unit_tests.tests_note_to_md.inline_tags import run_tests as test_inline_tags
 from unit_tests.tests_note_to_md.obs_img_to_md import run_tests as test_obs_img_to_md
 from unit_tests.tests_post_processing.obs_callout_to_markdown_callout import run_tests as test_obs_callout_to_markdown_callout
 
-os.environ["TESTS_FAILED"] = "0"
-
 test_codeblocks_in_footnote()
 test_inline_tags()
 test_obs_img_to_md()
@@ -0,0 +1,106 @@
+import sys
+import os
+from pathlib import Path
+
+import regex as re
+
+''' minify_css() should only remove comments and whitespace that has no meaning, so that the css of the minified files is read the same
+    way. For every css file in obsidianhtml/src, this test tokenizes the file and its minified version, and compares the tokens. Whitespace
+    is only compared where it separates tokens: runs of whitespace count as one, and whitespace next to { } ; , > is dropped.
+'''
+
+# add /obsidian-html/ci and /obsidian-html to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent))
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent.parent))
+
+# import tests
+from unit_tests.unit_test_lib import check_test_result
+
+from obsidianhtml.compiler.StaticAssets import minify_css
+
+SRC_FOLDER = Path(os.path.realpath(__file__)).parent.parent.parent.parent.joinpath('obsidianhtml/src')
+
+# a simplified version of the tokenizer of https://www.w3.org/TR/css-syntax-3/#tokenization
+NAME_CHAR = r"(?:[\w\-]|[^\x00-\x7f]|\\.)"
+IDENT = r"(?:--|-?(?:[a-zA-Z_]|[^\x00-\x7f]|\\.))" + NAME_CHAR + "*"
+TOKEN_RE = re.compile(r'''
+    (?P<comment>/\*.*?\*/)
+    | (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+    | (?P<url>url\(\s*(?:[^"'()\s\\]|\\.)*\s*\))
+    | (?P<whitespace>\s+)
+    | (?P<number>[+-]?(?:\d*\.\d+|\d+)(?:e[+-]?\d+)?(?:%|IDENT)?)
+    | (?P<word>\#NAME_CHAR+|@?IDENT)
+    | (?P<delimiter>.)
+'''.replace('NAME_CHAR', NAME_CHAR).replace('IDENT', IDENT), re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+# delimiters around which whitespace has no meaning
+WHITESPACE_INSENSITIVE = {'{', '}', ';', ',', '>'}
+
+
+def get_tokens(css):
+    tokens = []
+    for match in TOKEN_RE.finditer(css):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        if kind == 'whitespace':
+            if tokens and tokens[-1] not in WHITESPACE_INSENSITIVE and tokens[-1] != ' ':
+                tokens.append(' ')
+            continue
+        if kind == 'delimiter' and match.group() in WHITESPACE_INSENSITIVE and tokens and tokens[-1] == ' ':
+            tokens.pop()
+        tokens.append(match.group())
+
+    if tokens and tokens[-1] == ' ':
+        tokens.pop()
+    return tokens
+
+
+def run_tests():
+    cases = [
+        ('a/**/b{color:red}', ['a', 'b', '{', 'color', ':', 'red', '}']),
+        ('a /* x */ > b', ['a', '>', 'b']),
+        ('content: "/* not a comment */ { }"', ['content', ':', ' ', '"/* not a comment */ { }"']),
+        ('background: url( data:x;y,z )', ['background', ':', ' ', 'url( data:x;y,z )']),
+    ]
+    for css, expected in cases:
+        case = {
+            'name'   : f'Static assets :: css tokens of {css!r}',
+            'output' : repr(expected),
+        }
+        check_test_result(case, repr(get_tokens(css)))
+
+    snippets = [
+        'a/**/b{color:red}',
+        'a /* comment */ > b , c{ margin : 0 auto ; }',
+        '.x/*a*/.y/*b*/{}',
+        'p{content:"/* not a comment */ { ; }";font-family:\'Open Sans\',sans-serif}',
+        '@media screen and (max-width: 600px){.a :hover{width:calc(100% - 2em)}}',
+        'div{background:url( data:image/png;base64,AAAA )}',
+        'a{color:red!important}',
+    ]
+    for css in snippets:
+        case = {
+            'name'   : f'Static assets :: minifying {css!r} keeps its tokens',
+            'output' : '\n'.join(get_tokens(css)),
+        }
+        check_test_result(case, '\n'.join(get_tokens(minify_css(css))))
+
+    for path in sorted(SRC_FOLDER.rglob('*.css')):
+        with open(path, 'r', encoding='utf-8') as f:
+            css = f.read()
+
+        case = {
+            'name'   : f'Static assets :: minifying {path.relative_to(SRC_FOLDER).as_posix()} keeps its tokens',
+            'output' : '\n'.join(get_tokens(css)),
+        }
+        check_test_result(case, '\n'.join(get_tokens(minify_css(css))))
+
+
+if __name__ == "__main__":
+    os.environ["TESTS_FAILED"] = "0"
+
+    run_tests()
+
+    if (os.environ["TESTS_FAILED"] == '1'):
+        sys.exit(1)
@@ -0,0 +1,160 @@
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+import markdown
+
+''' The rss feed takes the first paragraphs and headers of the notes from the PageValuesExtension, which collects them while the markdown is
+    converted, and of the other html files from RssFeed.read_page(), which parses the whole page with BeautifulSoup (html5lib).
+    Both should give the same values for the same note.
+
+    The intended differences: paragraphs and headers that are written as raw html in the note are not collected by the extension, and a
+    paragraph with block level html in it (e.g. the <figure> of an embedded image with a size) is collected whole by the extension, where
+    html5lib ends the paragraph at the block. For these notes, only the headers are compared.
+'''
+
+# add /obsidian-html/ci and /obsidian-html to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent))
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent.parent))
+
+# import tests
+from tests.lib import get_paths
+from unit_tests.unit_test_lib import check_test_result
+
+from obsidianhtml.features.RssFeed import RssFeed
+from obsidianhtml.markdown_extensions.CustomTocExtension import CustomTocExtension
+from obsidianhtml.markdown_extensions.PageValuesExtension import PageValuesExtension
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head>
+    <meta name="node_id" content="node">
+    <title>Page</title>
+</head>
+<body>
+{body}
+</body>
+</html>
+'''
+
+NOTES = {
+    'inline formatting': '''
+# Header with *emphasis* and `code`
+
+Some **bold *and italic*** text, with [a `link`](x.html) &amp; an &lt;entity&gt; and a literal < & >.
+
+A paragraph with <span class="a">inline <b>html</b></span>
+after a line break, and a trailing space
+
+## Second _header_ {: #second }
+''',
+    'blocks': '''
+Before the code block
+
+```python
+print("<p>not a paragraph</p>")
+```
+
+<div class="raw">
+raw html block
+</div>
+
+- tight list item
+- second item
+
+1. loose list item
+
+2. second loose item
+
+> quoted paragraph
+>
+> ### quoted header
+
+| a | b |
+|---|---|
+| cell | cell |
+
+term
+:   definition
+
+#### Last header
+Last paragraph
+''',
+    'no paragraphs or headers': '''
+```
+code only
+```
+''',
+}
+
+HEADER_LEVELS = {'1', '2', '3', '4', '5', '6'}
+
+# notes with a paragraph that has block level html in it
+SPLIT_PARAGRAPH_NOTES = {'corpus: Wikilinks.md'}
+
+
+def get_notes():
+    """ Returns name --> markdown of the notes to compare: the notes above, and the prepared markdown of the note to markdown corpus """
+    notes = dict(NOTES)
+
+    corpus_md_folder = get_paths()['unit_test_input_output_folder'].joinpath('note_to_md_corpus/expected/md')
+    for path in sorted(corpus_md_folder.rglob('*.md')):
+        with open(path, 'r', encoding='utf-8') as f:
+            notes[f'corpus: {path.relative_to(corpus_md_folder).as_posix()}'] = f.read()
+    return notes
+
+
+def convert(note, number_of_paragraphs, header_levels):
+    """ Returns the html body and the values collected by the extension """
+    md = markdown.Markdown(extensions=[
+        'abbr', 'attr_list', 'def_list', 'fenced_code', 'tables', 'md_in_html', CustomTocExtension(),
+        PageValuesExtension(number_of_paragraphs=number_of_paragraphs, header_levels=header_levels),
+    ])
+    html_body = md.convert(note)
+    return html_body, md.page_values
+
+
+def read_page(html, number_of_paragraphs, header_levels):
+    feed = RssFeed.__new__(RssFeed)
+    feed.number_of_paragraphs = number_of_paragraphs
+    feed.header_levels = header_levels
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir).joinpath('page.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        values = feed.read_page(path)
+
+    del values['node_id']
+    return values
+
+
+def format_values(values):
+    lines = [f'p: {x!r}' for x in values['paragraphs']]
+    lines += [f'h{level}: {values["headers"][level]!r}' for level in sorted(values['headers'])]
+    return '\n'.join(lines)
+
+
+def run_tests():
+    for name, note in get_notes().items():
+        for number_of_paragraphs, header_levels in ((100, HEADER_LEVELS), (2, {'2', '4'}), (0, set())):
+            html_body, page_values = convert(note, number_of_paragraphs, header_levels)
+            expected = read_page(PAGE_TEMPLATE.replace('{body}', html_body), number_of_paragraphs, header_levels)
+            if name in SPLIT_PARAGRAPH_NOTES:
+                expected['paragraphs'] = page_values['paragraphs'] = []
+
+            case = {
+                'name'   : f'Rss page values :: {name} :: {number_of_paragraphs} paragraphs, header levels {sorted(header_levels)}',
+                'output' : format_values(expected),
+            }
+            check_test_result(case, format_values(page_values))
+
+
+if __name__ == "__main__":
+    os.environ["TESTS_FAILED"] = "0"
+
+    run_tests()
+
+    if (os.environ["TESTS_FAILED"] == '1'):
+        sys.exit(1)
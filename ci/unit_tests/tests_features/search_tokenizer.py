@@ -0,0 +1,135 @@
+import sys
+import os
+import json
+import shutil
+import functools
+import subprocess
+from pathlib import Path
+
+''' The search index is built in python (features/Search.py), and searched in the browser (src/search/search.js). This only works when:
+    - Tokenize() splits text into the same terms as tokenize() in search.js
+    - the terms are sorted in the order in which javascript compares strings (by UTF-16 code unit), which search.js relies on for its
+      binary search. This differs from the order of python strings (by code point) for characters outside of the basic multilingual plane.
+
+    The tokenizer of search.js is run with node when it is installed, otherwise only the order is tested.
+'''
+
+# add /obsidian-html/ci and /obsidian-html to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent))
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent.parent))
+
+# import tests
+from unit_tests.unit_test_lib import check_test_result, print_succes
+
+from obsidianhtml.features.Search import SearchIndex, Tokenize
+
+SEARCH_JS_PATH = Path(os.path.realpath(__file__)).parent.parent.parent.parent.joinpath('obsidianhtml/src/search/search.js')
+
+TEXTS = [
+    # non-ascii
+    'Straße café naïve ÜBER Ærøskøbing',
+    'ΣΊΣΥΦΟΣ and Ὀδυσσεύς',
+    'İstanbul ǅemal',
+    '日本語のテキスト, 中文文本。한국어 텍스트',
+    # punctuation
+    "don't stop-me-now e.mail a,b;c:d (paren) [bracket] {brace} «quoted» „quoted“ —dash— ellipsis… ¿qué? ¡sí!",
+    'under_score hash#tag at@sign 50% $100 1+1=2 a/b\\c',
+    # outside of the basic multilingual plane (stored as two UTF-16 code units in javascript)
+    '𝒳 𝔘𝔫𝔦𝔠𝔬𝔡𝔢 𠀀𠀁 😀smile 👍🏽thumbs 🇳🇱flag',
+    # inside of the basic multilingual plane, above the UTF-16 surrogates (sorted after the above in javascript, before them in python)
+    'Ａｂｃ fullwidth ﬁne ligature ｶﾀｶﾅ halfwidth ﻿bom',
+    # whitespace and control characters
+    'tab\tnew\nline nbsp emspace​zerowidth\u0000null',
+]
+
+
+def js_compare(a, b):
+    """ Compares two strings the way javascript does: by UTF-16 code unit """
+    def code_units(s):
+        units = []
+        for ch in s:
+            cp = ord(ch)
+            if cp > 0xFFFF:
+                cp -= 0x10000
+                units += [0xD800 + (cp >> 10), 0xDC00 + (cp & 0x3FF)]
+            else:
+                units.append(cp)
+        return units
+
+    a, b = code_units(a), code_units(b)
+    return (a > b) - (a < b)
+
+
+def get_terms():
+    index = SearchIndex(None, None)
+    for i, text in enumerate(TEXTS):
+        index.add(i, {'title': text, 'content': text})
+    return index.compile()['terms']
+
+
+def run_search_js(terms):
+    """ Returns the tokens of TEXTS according to search.js, and terms sorted by javascript. None when node is not installed. """
+    node = shutil.which('node')
+    if node is None:
+        return None
+
+    with open(SEARCH_JS_PATH, 'r', encoding='utf-8') as f:
+        search_js = f.read()
+    separator = search_js[search_js.index('var TERM_SEPARATOR'):].split('\n')[0]
+    tokenize = search_js[search_js.index('function tokenize('):]
+    tokenize = tokenize[:tokenize.index('\n}\n') + 3]
+
+    script = separator + '\n' + tokenize + '''
+        let input = JSON.parse(require("fs").readFileSync(0, "utf-8"));
+        console.log(JSON.stringify({
+            tokens: input.texts.map(tokenize),
+            sorted_terms: input.terms.slice().sort(),
+        }));
+    '''
+    result = subprocess.run([node, '-e', script], input=json.dumps({'texts': TEXTS, 'terms': terms}), capture_output=True, text=True, encoding='utf-8')
+    if result.returncode != 0:
+        raise Exception(f'node failed:\n{result.stderr}')
+    return json.loads(result.stdout)
+
+
+def run_tests():
+    terms = get_terms()
+
+    case = {
+        'name'   : 'Search index :: terms are sorted by UTF-16 code unit, like javascript compares strings',
+        'output' : '\n'.join(sorted(terms, key=functools.cmp_to_key(js_compare))),
+    }
+    check_test_result(case, '\n'.join(terms))
+
+    case = {
+        'name'   : 'Search index :: terms outside of the basic multilingual plane are sorted before fullwidth characters',
+        'output' : 'True',
+    }
+    check_test_result(case, str(terms.index('𝒳') < terms.index('ａｂｃ')))
+
+    js = run_search_js(terms)
+    if js is None:
+        print_succes({'name': 'Search index :: node is not installed, skipped the comparison with search.js'})
+        return
+
+    for text, js_tokens in zip(TEXTS, js['tokens']):
+        case = {
+            'name'   : f'Search index :: python and javascript tokenize {text[:30]!r} the same',
+            'output' : '\n'.join(js_tokens),
+        }
+        check_test_result(case, '\n'.join(Tokenize(text)))
+
+    case = {
+        'name'   : 'Search index :: terms are in the order of Array.sort() in javascript',
+        'output' : '\n'.join(js['sorted_terms']),
+    }
+    check_test_result(case, '\n'.join(terms))
+
+
+if __name__ == "__main__":
+    os.environ["TESTS_FAILED"] = "0"
+
+    run_tests()
+
+    if (os.environ["TESTS_FAILED"] == '1'):
+        sys.exit(1)
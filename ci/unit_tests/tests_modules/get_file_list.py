@@ -0,0 +1,165 @@
+import sys
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+''' The get_file_list module used to find the input files with pathlib's glob/rglob for each glob line (see glob_find() below), and now
+    translates the glob lines to regexes and walks the input folder once (compile_glob(), compile_prune_glob(), walk_input_folder()).
+    This test builds a folder tree and checks that both select the same files, for the default and the documented globs.
+
+    The only intended difference: symlinks that point to nothing were selected by the old implementation, and are not anymore.
+'''
+
+# add /obsidian-html/ci and /obsidian-html to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent))
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent.parent))
+
+# import tests
+from unit_tests.unit_test_lib import check_test_result
+
+from obsidianhtml.modules.builtin.get_file_list import compile_glob, compile_prune_glob, walk_input_folder
+
+DEFAULT_EXCLUDE_GLOB = [".obsidian/**/*", ".trash/**/*", ".DS_Store/**/*", ".git/**/*"]
+
+# (include_glob, exclude_glob)
+GLOBS = [
+    # defaults
+    (["*"], DEFAULT_EXCLUDE_GLOB),
+    # documented examples, see GetFileListModule.define_mod_config_defaults()
+    (["/Home.md"], DEFAULT_EXCLUDE_GLOB),
+    (["Blog/**/*"], DEFAULT_EXCLUDE_GLOB),
+    (["subfolder/*"], DEFAULT_EXCLUDE_GLOB),
+    (["/Home.md", "Blog/**/*", "subfolder/*"], DEFAULT_EXCLUDE_GLOB),
+    # other combinations
+    (["*"], ["*.pdf", "/filtering/excluded/**/*"]),
+    (["/entrypoint.md", "*.md"], ["**/*.png"]),
+    (["*/*.md"], ["[a-f]*"]),
+    (["*"], ["**/*"]),
+    (["/**/*"], ["/Blog/**/*"]),
+    (["?????.md", "[!a]*.md", "[]]*"], []),
+    (["*.MD"], []),
+]
+
+FILES = [
+    "entrypoint.md", "Home.md", "note.md", "Note Two.md", "a.md", "upper.MD", "image.png", "doc.pdf", ".DS_Store", "no_suffix", "[bracket].md",
+    "]bracket.md", "Blog/post.md", "Blog/sub/post 2.md", "Blog/image.png", "filtering/Blog/post.md", "filtering/excluded/x.md",
+    "filtering/included/y.md", "subfolder/a.md", "subfolder/deeper/subfolder/b.md", "subfolder/deeper/c.md", ".obsidian/app.json",
+    ".obsidian/plugins/x/main.js", ".trash/old.md", ".git/HEAD", ".git/objects/ab/cdef", "Folder.md/not_a_note.md",
+]
+FOLDERS = ["empty", "filtering/empty"]
+
+# link --> target
+SYMLINKS = {"link.md": "note.md", "linked_folder": "filtering"}
+DANGLING_SYMLINKS = {"dangling.md": "does_not_exist.md"}
+
+
+def glob_find(folder, glob_list):
+    """ The implementation of GetFileListModule before it walked the input folder """
+    folder = Path(folder)
+
+    found_files = []
+    for glob_line in glob_list:
+        if glob_line[0] == '/':
+            glob_line = glob_line[1:]
+            found_files = found_files + [x.as_posix() for x in folder.glob(glob_line)]
+        else:
+            found_files = found_files + [x.as_posix() for x in folder.rglob(glob_line)]
+
+    found_files = list(set(found_files))
+    found_files.sort()
+    return found_files
+
+
+def select_files_with_glob_find(folder, include_glob, exclude_glob):
+    included_files = glob_find(folder, include_glob)
+    excluded_files = glob_find(folder, exclude_glob)
+    selected_files = [x for x in included_files if x not in excluded_files]
+    selected_files.sort()
+    return [x for x in selected_files if Path(x).is_dir() == False]
+
+
+def select_files_with_walk(folder, include_glob, exclude_glob):
+    include_res = [compile_glob(x) for x in include_glob]
+    exclude_res = [compile_glob(x) for x in exclude_glob]
+    prune_res = [x for x in (compile_prune_glob(y) for y in exclude_glob) if x is not None]
+    selected_files, excluded_files, file_stats = walk_input_folder(folder, include_res, exclude_res, prune_res)
+    return selected_files, file_stats
+
+
+def create_tree(folder):
+    """ Creates the files and folders, returns whether the symlinks could be created (not always allowed on Windows) """
+    for rel_path in FILES:
+        path = folder.joinpath(rel_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(rel_path)
+    for rel_path in FOLDERS:
+        folder.joinpath(rel_path).mkdir(parents=True, exist_ok=True)
+
+    try:
+        for link, target in {**SYMLINKS, **DANGLING_SYMLINKS}.items():
+            folder.joinpath(link).symlink_to(target, target_is_directory=folder.joinpath(target).is_dir())
+    except OSError:
+        return False
+    return True
+
+
+def run_tests():
+    cases = [
+        ('.git/**/*', ['.git', 'sub/.git'], ['.gitignore', '.git/sub']),
+        ('/filtering/excluded/**/*', ['filtering/excluded'], ['sub/filtering/excluded', 'filtering']),
+        ('**/*', ['a', 'a/b'], []),
+        ('*.md', None, None),
+        ('.git/*', None, None),
+    ]
+    for glob_line, pruned, not_pruned in cases:
+        regex = compile_prune_glob(glob_line)
+        output = 'None' if regex is None else f'pruned: {[x for x in pruned + not_pruned if regex.fullmatch(x)]}'
+        case = {
+            'name'   : f'Get file list :: folders pruned by {glob_line}',
+            'output' : 'None' if pruned is None else f'pruned: {pruned}',
+        }
+        check_test_result(case, output)
+
+    folder = Path(tempfile.mkdtemp()).joinpath('vault')
+    try:
+        with_symlinks = create_tree(folder)
+        folder_str = folder.as_posix()
+
+        for include_glob, exclude_glob in GLOBS:
+            expected = select_files_with_glob_find(folder, include_glob, exclude_glob)
+            expected = [x for x in expected if x[len(folder_str) + 1:] not in DANGLING_SYMLINKS]
+            selected_files, file_stats = select_files_with_walk(folder, include_glob, exclude_glob)
+
+            case = {
+                'name'   : f'Get file list :: include {include_glob}, exclude {exclude_glob}',
+                'output' : '\n'.join(expected),
+            }
+            check_test_result(case, '\n'.join(selected_files))
+
+            case = {
+                'name'   : f'Get file list :: stats of the selected files, include {include_glob}, exclude {exclude_glob}',
+                'output' : '\n'.join(sorted(x[len(folder_str) + 1:] for x in expected)),
+            }
+            check_test_result(case, '\n'.join(sorted(file_stats.keys())))
+
+        if with_symlinks:
+            case = {
+                'name'   : 'Get file list :: symlinks that point to nothing were selected by glob_find, and are not by walk_input_folder',
+                'output' : f'{folder_str}/dangling.md',
+            }
+            expected = select_files_with_glob_find(folder, ['*'], DEFAULT_EXCLUDE_GLOB)
+            selected_files, _ = select_files_with_walk(folder, ['*'], DEFAULT_EXCLUDE_GLOB)
+            check_test_result(case, '\n'.join(sorted(set(expected) - set(selected_files))))
+    finally:
+        shutil.rmtree(folder.parent)
+
+
+if __name__ == "__main__":
+    os.environ["TESTS_FAILED"] = "0"
+
+    run_tests()
+
+    if (os.environ["TESTS_FAILED"] == '1'):
+        sys.exit(1)
@@ -0,0 +1,135 @@
+import sys
+import os
+import yaml
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+''' Converts the vault in input_output/note_to_md_corpus/vault, and compares the markdown output and the html of the notes with the
+    expected output in input_output/note_to_md_corpus/expected. The notes in the vault each cover a part of the conversion: wikilinks,
+    (nested) brackets, anchors, code, latex, svgs and tags.
+
+    After an intended change of the output, run this file with --update to write the new expected output, and check the diff.
+'''
+
+# add /obsidian-html/ci to path
+sys.path.insert(1, str(Path(os.path.realpath(__file__)).parent.parent.parent))
+
+# import tests
+from tests.lib import get_paths
+from unit_tests.unit_test_lib import check_test_result
+
+USE_PIP_INSTALL = (os.getenv('OBS_HTML_USE_PIP_INSTALL') == 'true')
+
+# the html of a note, without the parts of the template that are the same for every note (head, dir tree, side panes)
+HTML_CONTENT_START = '<div class="container">'
+HTML_CONTENT_END = '<!-- end content -->'
+
+
+def get_corpus_paths():
+    paths = get_paths()
+    corpus_folder = paths['unit_test_input_output_folder'].joinpath('note_to_md_corpus')
+    return {
+        'root': paths['root'],
+        'vault': corpus_folder.joinpath('vault'),
+        'expected_md': corpus_folder.joinpath('expected/md'),
+        'expected_html': corpus_folder.joinpath('expected/html'),
+    }
+
+
+def convert_corpus(output_folder):
+    corpus_paths = get_corpus_paths()
+    config = {
+        'obsidian_entrypoint_path_str': corpus_paths['vault'].joinpath('entrypoint.md').as_posix(),
+        'md_folder_path_str': output_folder.joinpath('md').as_posix(),
+        'md_entrypoint_path_str': output_folder.joinpath('md/index.md').as_posix(),
+        'html_output_folder_path_str': output_folder.joinpath('html').as_posix(),
+        'module_data_folder': output_folder.joinpath('mod').as_posix(),
+        'toggles': {'process_all': True},
+    }
+    config_path = output_folder.joinpath('config.yml')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        f.write(yaml.dump(config))
+
+    command = ['obsidianhtml'] if USE_PIP_INSTALL else ['python', '-m', 'obsidianhtml']
+    result = subprocess.run(command + ['convert', '-i', config_path.as_posix()], cwd=corpus_paths['root'], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Conversion of the corpus failed:\n{result.stdout}\n{result.stderr}")
+
+
+def get_html_content(html):
+    start = html.index(HTML_CONTENT_START)
+    end = html.index(HTML_CONTENT_END, start)
+    return html[start:end]
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def get_outputs(output_folder):
+    """ Returns rel path --> contents of the markdown files, and of the html of the notes """
+    outputs = {}
+    md_folder = output_folder.joinpath('md')
+    for path in sorted(md_folder.rglob('*.md')):
+        rel_path = path.relative_to(md_folder)
+        outputs[('md', rel_path.as_posix())] = read(path)
+
+        html_rel_path = rel_path.with_suffix('.html')
+        html_path = output_folder.joinpath('html', html_rel_path)
+        outputs[('html', html_rel_path.as_posix())] = get_html_content(read(html_path))
+    return outputs
+
+
+def update_expected_output(outputs):
+    corpus_paths = get_corpus_paths()
+    for folder in ('expected_md', 'expected_html'):
+        if corpus_paths[folder].exists():
+            shutil.rmtree(corpus_paths[folder])
+
+    for (kind, rel_path), contents in outputs.items():
+        path = corpus_paths[f'expected_{kind}'].joinpath(rel_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(contents)
+
+
+def run_tests(update=False):
+    corpus_paths = get_corpus_paths()
+    output_folder = Path(tempfile.mkdtemp())
+    try:
+        convert_corpus(output_folder)
+        outputs = get_outputs(output_folder)
+    finally:
+        shutil.rmtree(output_folder)
+
+    if update:
+        update_expected_output(outputs)
+
+    expected_files = [('md', x.relative_to(corpus_paths['expected_md']).as_posix()) for x in corpus_paths['expected_md'].rglob('*.md')]
+    expected_files += [('html', x.relative_to(corpus_paths['expected_html']).as_posix()) for x in corpus_paths['expected_html'].rglob('*.html')]
+    expected_files.sort()
+
+    case = {
+        'name'   : 'Note to markdown corpus :: the same files are written',
+        'output' : '\n'.join([f'{kind}/{rel_path}' for kind, rel_path in expected_files]),
+    }
+    check_test_result(case, '\n'.join([f'{kind}/{rel_path}' for kind, rel_path in sorted(outputs.keys())]))
+
+    for kind, rel_path in expected_files:
+        case = {
+            'name'   : f'Note to markdown corpus :: {kind}/{rel_path}',
+            'output' : read(corpus_paths[f'expected_{kind}'].joinpath(rel_path)),
+        }
+        check_test_result(case, outputs.get((kind, rel_path), ''))
+
+
+if __name__ == "__main__":
+    os.environ["TESTS_FAILED"] = "0"
+
+    run_tests(update=('--update' in sys.argv))
+
+    if (os.environ["TESTS_FAILED"] == '1'):
+        sys.exit(1)
@@ -0,0 +1,50 @@
+import os
+import sys
+from termcolor import colored
+
+""" Functions shared by all unit tests. These don't need a picknick basket, unlike the ones in unit_test_init.py. """
+
+# set color output
+is_windows = hasattr(sys, 'getwindowsversion')
+if is_windows:
+    os.system('color')
+
+
+def check_test_result(case, output):
+    def show_whitespace(s):
+        return s.replace(' ', '·').replace('\n', '↲\n')
+    if output != case['output']:
+        print_fail(case)
+        print(f"Expected:\n{show_whitespace(case['output'])}")
+        print(f"Got:\n{show_whitespace(output)}")
+        os.environ["TESTS_FAILED"] = "1"
+    else:
+        print_succes(case)
+
+
+def test(case):
+    # run function
+    if 'set' in case:
+        function_input, expected_output = case['set']
+        output = case['function'](*function_input)
+    else:
+        raise Exception('not implemented')
+
+    if output != expected_output:
+        print_fail(case)
+        print(f"    - Expected:\n{expected_output}")
+        print(f"    - Got:\n{output}")
+        os.environ["TESTS_FAILED"] = "1"
+    else:
+        print_succes(case)
+
+def print_succes(case):
+    print(colored(f"✓  {case['name']}", 'green'))
+
+def print_fail(case):
+    print(colored(f"X  {case['name']}", 'red'))
+
+def get_input_as_str(paths, foldername, input_file_name='input.md'):
+    path = paths['unit_test_input_output_folder'].joinpath(foldername).joinpath(input_file_name)
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
\ No newline at end of file
@@ -119,6 +119,10 @@ def recurseTagList(tagtree, tagpath, pb, level):
 
     md += f"\n> [View all tags]({html_url_prefix}/obs.html/tags/index.html)"
 
+    # The root page is written by create_foldable_tag_lists()
+    if level == 0:
+        return rel_dst_path_as_posix
+
     # Compile html
     extension_configs = {"codehilite": {"linenums": False}, "pymdownx.arithmatex": {"generic": True}}
 
@@ -145,8 +149,7 @@ def recurseTagList(tagtree, tagpath, pb, level):
 
     # Write file
     tag_dst_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(tag_dst_path_posix, "w", encoding="utf-8") as f:
-        f.write(html)
+    pb.output.write(tag_dst_path_posix, html)
 
     # Return link of this page, to be used by caller for building its page
     return rel_dst_path_as_posix
@@ -239,5 +242,4 @@ def create_foldable_tag_lists(pb):
     html = html.replace("{left_pane}", "").replace("{right_pane}", "")
 
     # write to destination
-    with open(tag_dst_path_posix, "w", encoding="utf-8") as f:
-        f.write(html)
+    pb.output.write(tag_dst_path_posix, html)
@@ -0,0 +1,114 @@
+import json
+import hashlib
+
+import regex as re
+
+try:
+    import rjsmin
+except ImportError:  # optional, js files are written as is without it
+    rjsmin = None
+
+"""
+The css/js files that every page includes are written to obs.html/static under a name that contains a hash of their contents
+(master.css --> master.3f2a9c1b7d.css), so that browsers can cache them indefinitely: a new version of a file gets a new name.
+The names are kept in obs.html/static/manifest.json, and the templates link to these names via static_url() (see compiler/Templating.py).
+
+Fingerprinted files that already exist are not written again. The files of the previous manifest are kept, so that pages that are still
+cached by browsers keep working, older versions are removed. The files are also written under their plain name (only when their contents
+changed), for custom templates and files that refer to them by that name.
+"""
+
+HASH_LENGTH = 10
+
+# strings are matched first, so that comments/whitespace inside of them are left alone
+CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|\s*([{};,>])\s*|(\s+)""", re.DOTALL)
+# characters of names and numbers, which would form one token when the comment between them was removed (an empty comment is kept there)
+CSS_NAME_CHAR_RE = re.compile(r"[\w\-\\]|[^\x00-\x7f]")
+
+
+def get_content_hash(contents):
+    return hashlib.sha1(contents.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+def get_fingerprinted_name(file_name, content_hash):
+    stem, _, suffix = file_name.rpartition(".")
+    return f"{stem}.{content_hash}.{suffix}"
+
+
+def get_fingerprinted_name_re(file_name):
+    stem, _, suffix = file_name.rpartition(".")
+    return re.compile(re.escape(stem) + r"\.[0-9a-f]{" + str(HASH_LENGTH) + r"}\." + re.escape(suffix))
+
+
+def minify_css(css):
+    def replace(match):
+        string, comment, punctuation, whitespace = match.groups()
+        if string is not None:
+            return string
+        if comment is not None:
+            before = css[match.start() - 1 : match.start()]
+            after = css[match.end() : match.end() + 1]
+            if CSS_NAME_CHAR_RE.match(before) and CSS_NAME_CHAR_RE.match(after):
+                return "/**/"
+            return ""
+        if punctuation is not None:
+            return punctuation
+        return " "
+
+    return CSS_TOKEN_RE.sub(replace, css).strip()
+
+
+def minify_js(js):
+    if rjsmin is None:
+        return js
+    return rjsmin.jsmin(js)
+
+
+class StaticAssets:
+    def __init__(self, pb, static_folder):
+        self.output = pb.output
+        self.static_folder = static_folder
+        self.manifest_path = static_folder.joinpath("manifest.json")
+
+        self.fingerprint = pb.gc("toggles/features/static_assets/fingerprint", cached=True)
+        self.minify = pb.gc("toggles/features/static_assets/minify", cached=True)
+
+        # plain name --> fingerprinted name
+        self.manifest = {}
+        self.previous = self.load_manifest()
+
+    def add(self, file_name, contents):
+        if self.minify:
+            if file_name.endswith(".css"):
+                contents = minify_css(contents)
+            elif file_name.endswith(".js"):
+                contents = minify_js(contents)
+
+        self.output.write(self.static_folder.joinpath(file_name), contents)
+        if not self.fingerprint:
+            return
+
+        fingerprinted_name = get_fingerprinted_name(file_name, get_content_hash(contents))
+        self.output.write(self.static_folder.joinpath(fingerprinted_name), contents)
+        self.manifest[file_name] = fingerprinted_name
+
+    def get_name(self, file_name):
+        return self.manifest.get(file_name, file_name)
+
+    def save(self):
+        self.remove_old_versions()
+        self.output.write(self.manifest_path, json.dumps(self.manifest, indent=2, sort_keys=True))
+
+    def remove_old_versions(self):
+        keep = set(self.manifest.values()) | set(self.previous.values())
+        for file_name in set(self.manifest.keys()) | set(self.previous.keys()):
+            name_re = get_fingerprinted_name_re(file_name)
+            for path in self.static_folder.glob("*"):
+                if path.name not in keep and name_re.fullmatch(path.name):
+                    path.unlink()
+
+    def load_manifest(self):
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.loads(f.read())
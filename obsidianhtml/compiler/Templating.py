@@ -1,10 +1,25 @@
+import regex as re
+
 from ..lib import CreateStaticFilesFolders, OpenIncludedFile, OpenIncludedFileBinary, get_html_url_prefix
 from ..features.SidePane import get_side_pane_id_by_content_selector, get_content_name_by_pane_id
-
-
-def ExportStaticFiles(pb):
-    (obsfolder, static_folder, data_folder, rss_folder) = CreateStaticFilesFolders(pb.paths["html_output_folder"])
-
+from .StaticAssets import StaticAssets
+
+# Files that are included by every page, these are written under fingerprinted names (see compiler/StaticAssets.py).
+# (obsidian_core.js is left out, because it contains the hash of the search data, which changes whenever a note changes)
+FINGERPRINTED_FILES = (
+    "master.css",
+    "encoding.js",
+    "smiles.js",
+    "pako.js",
+    "search.js",
+    "dirtree.js",
+    "load_dirtree_footer.js",
+    "obsidian_tabs_footer.js",
+)
+
+
+def get_static_file_list(pb):
+    """Returns [file_record, file_name] of the files that are written to the static folder"""
     # define files to be copied over (standard copy, static_folder)
     copy_file_list = [
         ["svgs/external.svg", "external.svg"],
@@ -45,7 +60,6 @@ def ExportStaticFiles(pb):
         copy_file_list.append(["search/pako.js", "pako.js"])
         copy_file_list.append(["search/search.js", "search.js"])
         css_files_list.append(["search/search.css", "search.css"])
-        copy_file_list.append(["imported/flexsearch.v0.7.2.bundle.js", "flexsearch.bundle.js"])
 
     # if pb.ConfigManager.feature_is_enabled('math_latex', cached=True):
     #     copy_file_list.append(['latex/load_mathjax.js', 'load_mathjax.js'])
@@ -72,75 +86,101 @@ def ExportStaticFiles(pb):
 
     copy_file_list.append([{"type": "contents", "contents": css}, "master.css"])
 
-    # copy static files over to the static folder
-    for file in copy_file_list:
-        file_record = file[0]
-        file_name = file[1]
-        contents = ""
-
-        # Get file contents
-        if isinstance(file_record, dict):
-            # ... from absolute path
-            if file_record["type"] == "absolute_path_str":
-                with open(file_record["path"], "r", encoding="utf-8") as f:
-                    contents = f.read()
-            # ... from file_record itself
-            elif file_record["type"] == "contents":
-                contents = file_record["contents"]
-            else:
-                raise Exception("ERROR: file_record type in unknown")
+    return copy_file_list
+
+
+def get_static_file_contents(pb, static_folder, file_record, file_name):
+    # Get file contents
+    if isinstance(file_record, dict):
+        # ... from absolute path
+        if file_record["type"] == "absolute_path_str":
+            with open(file_record["path"], "r", encoding="utf-8") as f:
+                contents = f.read()
+        # ... from file_record itself
+        elif file_record["type"] == "contents":
+            contents = file_record["contents"]
         else:
-            # ... from package
-            contents = OpenIncludedFile(file_record)
+            raise Exception("ERROR: file_record type in unknown")
+    else:
+        # ... from package
+        contents = OpenIncludedFile(file_record)
 
-        # Define dest path and html_url_prefix
-        dst_path = static_folder.joinpath(file_name)
-        html_url_prefix = get_html_url_prefix(pb, abs_path_str=dst_path)
+    # Define dest path and html_url_prefix
+    dst_path = static_folder.joinpath(file_name)
+    html_url_prefix = get_html_url_prefix(pb, abs_path_str=dst_path)
 
-        # Set pane divs
-        toc_pane_div = get_side_pane_id_by_content_selector(pb, "toc")
-        dir_index_pane_div = get_side_pane_id_by_content_selector(pb, "dir_index")
-
-        # Templating
-        if file_name in ("master.css", "main.css", "global_main.css", "obsidian_core.js", "search.js", "search.css"):
-            url_mode = "absolute"
-            if pb.gc("toggles/relative_path_html"):
-                url_mode = "relative"
-
-            contents = (
-                contents.replace("{html_url_prefix}", html_url_prefix)
-                .replace("{configured_html_url_prefix}", pb.configured_html_prefix)
-                .replace("{no_tabs}", str(int(pb.gc("toggles/no_tabs", cached=True))))
-                .replace("{only_show_for_multiple_headers}", str(int(pb.gc("toggles/features/table_of_contents/only_show_for_multiple_headers", cached=True))))
-                .replace("{close_right_pane_if_empty}", str(int(pb.gc("toggles/features/side_pane/right_pane/close_if_empty", cached=True))))
-                .replace("{close_left_pane_if_empty}", str(int(pb.gc("toggles/features/side_pane/left_pane/close_if_empty", cached=True))))
-                .replace("{relative_paths}", str(int(pb.gc("toggles/relative_path_html"))))
-                .replace("{documentation_mode}", str(int(pb.gc("toggles/features/styling/layout") == "documentation")))
-                .replace("{mermaid_enabled}", str(int(pb.gc("toggles/features/mermaid_diagrams/enabled"))))
-                .replace("{toc_pane_div}", toc_pane_div)
-                .replace("{dir_index_pane_div}", dir_index_pane_div)
-                .replace("{gzip_hash}", pb.gzip_hash)
-                .replace("{url_mode}", url_mode)
-                .replace("{try_preload}", str(int(pb.gc("toggles/features/search/try_preload"))))
-            )
-            contents = (
-                contents.replace("__accent_color__", pb.gc("toggles/features/styling/accent_color", cached=True))
-                .replace("__loading_bg_color__", pb.gc("toggles/features/styling/loading_bg_color", cached=True))
-                .replace("__max_note_width__", pb.gc("toggles/features/styling/max_note_width", cached=True))
-                .replace("__left_pane_active_width__", pb.gc("toggles/features/side_pane/left_pane/width", cached=True))
-                .replace("__right_pane_active_width__", pb.gc("toggles/features/side_pane/right_pane/width", cached=True))
-            )
+    # Set pane divs
+    toc_pane_div = get_side_pane_id_by_content_selector(pb, "toc")
+    dir_index_pane_div = get_side_pane_id_by_content_selector(pb, "dir_index")
 
-        if file_name in ("smiles.js",):
-            contents = (
-                contents.replace("{smiles_theme}", pb.gc("toggles/features/smiles/theme", cached=True))
-                .replace("{smiles_width}", pb.gc("toggles/features/smiles/width", cached=True))
-                .replace("{smiles_height}", pb.gc("toggles/features/smiles/height", cached=True))
-            )
+    # Templating
+    if file_name in ("master.css", "main.css", "global_main.css", "obsidian_core.js", "search.js", "search.css"):
+        url_mode = "absolute"
+        if pb.gc("toggles/relative_path_html"):
+            url_mode = "relative"
+
+        contents = (
+            contents.replace("{html_url_prefix}", html_url_prefix)
+            .replace("{configured_html_url_prefix}", pb.configured_html_prefix)
+            .replace("{no_tabs}", str(int(pb.gc("toggles/no_tabs", cached=True))))
+            .replace("{only_show_for_multiple_headers}", str(int(pb.gc("toggles/features/table_of_contents/only_show_for_multiple_headers", cached=True))))
+            .replace("{close_right_pane_if_empty}", str(int(pb.gc("toggles/features/side_pane/right_pane/close_if_empty", cached=True))))
+            .replace("{close_left_pane_if_empty}", str(int(pb.gc("toggles/features/side_pane/left_pane/close_if_empty", cached=True))))
+            .replace("{relative_paths}", str(int(pb.gc("toggles/relative_path_html"))))
+            .replace("{documentation_mode}", str(int(pb.gc("toggles/features/styling/layout") == "documentation")))
+            .replace("{mermaid_enabled}", str(int(pb.gc("toggles/features/mermaid_diagrams/enabled"))))
+            .replace("{toc_pane_div}", toc_pane_div)
+            .replace("{dir_index_pane_div}", dir_index_pane_div)
+            .replace("{gzip_hash}", pb.gzip_hash)
+            .replace("{url_mode}", url_mode)
+            .replace("{try_preload}", str(int(pb.gc("toggles/features/search/try_preload"))))
+        )
+        contents = (
+            contents.replace("__accent_color__", pb.gc("toggles/features/styling/accent_color", cached=True))
+            .replace("__loading_bg_color__", pb.gc("toggles/features/styling/loading_bg_color", cached=True))
+            .replace("__max_note_width__", pb.gc("toggles/features/styling/max_note_width", cached=True))
+            .replace("__left_pane_active_width__", pb.gc("toggles/features/side_pane/left_pane/width", cached=True))
+            .replace("__right_pane_active_width__", pb.gc("toggles/features/side_pane/right_pane/width", cached=True))
+        )
 
-        # Write to dest
-        with open(dst_path, "w", encoding="utf-8") as f:
-            f.write(contents)
+    if file_name in ("smiles.js",):
+        contents = (
+            contents.replace("{smiles_theme}", pb.gc("toggles/features/smiles/theme", cached=True))
+            .replace("{smiles_width}", pb.gc("toggles/features/smiles/width", cached=True))
+            .replace("{smiles_height}", pb.gc("toggles/features/smiles/height", cached=True))
+        )
+
+    return contents
+
+
+def ExportStaticBundles(pb):
+    """Writes the files in FINGERPRINTED_FILES, and keeps their fingerprinted names in pb.static_assets.
+    Should be called before the first page is rendered, so that the templates link to the fingerprinted names."""
+    (obsfolder, static_folder, data_folder, rss_folder) = CreateStaticFilesFolders(pb.paths["html_output_folder"])
+
+    pb.static_assets = StaticAssets(pb, static_folder)
+    for file_record, file_name in get_static_file_list(pb):
+        if file_name in FINGERPRINTED_FILES and file_name not in pb.static_assets.manifest:
+            pb.static_assets.add(file_name, get_static_file_contents(pb, static_folder, file_record, file_name))
+    pb.static_assets.save()
+
+
+def static_url(pb, file_name):
+    """Returns the url (without html_url_prefix) of a file in the static folder, under its fingerprinted name if it has one"""
+    if pb.static_assets is not None:
+        file_name = pb.static_assets.get_name(file_name)
+    return "/obs.html/static/" + file_name
+
+
+def ExportStaticFiles(pb):
+    (obsfolder, static_folder, data_folder, rss_folder) = CreateStaticFilesFolders(pb.paths["html_output_folder"])
+
+    # copy static files over to the static folder (files that are unchanged since the previous run are not written again)
+    for file_record, file_name in get_static_file_list(pb):
+        if pb.static_assets is not None and file_name in pb.static_assets.manifest:
+            # (written by ExportStaticBundles())
+            continue
+        pb.output.write(static_folder.joinpath(file_name), get_static_file_contents(pb, static_folder, file_record, file_name))
 
     # copy binary files to dst (byte copy, static_folder)
     copy_file_list_byte = [
@@ -148,23 +188,18 @@ def ExportStaticFiles(pb):
         ["html/fonts/Roboto-Regular.ttf", "Roboto-Regular.ttf"],
     ]
     for file_name in copy_file_list_byte:
-        c = OpenIncludedFileBinary(file_name[0])
-        with open(static_folder.joinpath(file_name[1]), "wb") as f:
-            f.write(c)
+        pb.output.write(static_folder.joinpath(file_name[1]), OpenIncludedFileBinary(file_name[0]))
 
     # Custom copy
     c = OpenIncludedFile("html/templates/not_created.html")
     dst_path = pb.paths["html_output_folder"].joinpath("not_created.html")
     html_url_prefix = get_html_url_prefix(pb, abs_path_str=dst_path)
 
-    with open(dst_path, "w", encoding="utf-8") as f:
-        html = PopulateTemplate(pb, "none", pb.dynamic_inclusions, pb.html_template, content=c, dynamic_includes="")
-        html = html.replace("{html_url_prefix}", html_url_prefix).replace("{left_pane_content}", "").replace("{right_pane_content}", "")
-        f.write(html)
+    html = PopulateTemplate(pb, "none", pb.dynamic_inclusions, pb.html_template, content=c, dynamic_includes="")
+    html = html.replace("{html_url_prefix}", html_url_prefix).replace("{left_pane_content}", "").replace("{right_pane_content}", "")
+    pb.output.write(dst_path, html)
 
-    c = OpenIncludedFileBinary("html/favicon.ico")
-    with open(pb.paths["html_output_folder"].joinpath("favicon.ico"), "wb") as f:
-        f.write(c)
+    pb.output.write(pb.paths["html_output_folder"].joinpath("favicon.ico"), OpenIncludedFileBinary("html/favicon.ico"))
 
     if pb.gc("toggles/features/graph/enabled", cached=True):
         # create grapher files
@@ -178,8 +213,7 @@ def ExportStaticFiles(pb):
         for grapher in pb.graphers:
             # save file in graphers folder
             dst_path = graph_folder.joinpath(f'{grapher["id"]}.js')
-            with open(dst_path, "w", encoding="utf-8") as f:
-                f.write(grapher["contents"])
+            pb.output.write(dst_path, grapher["contents"])
 
             # add to dynamic imports in grapher.js
             dynamic_imports += f"import * as grapher_{grapher['id']} from './graphers/{grapher['id']}.js';\n"
@@ -213,24 +247,73 @@ def ExportStaticFiles(pb):
         )
         graph_js = dynamic_imports + grapher_list + grapher_hash + graph_js
 
-        with open(dst_path, "w", encoding="utf-8") as f:
-            f.write(graph_js)
+        pb.output.write(dst_path, graph_js)
 
 
-def PopulateTemplate(
-    pb,
-    node_id,
-    dynamic_inclusions,
-    template,
-    content,
-    html_url_prefix=None,
-    title="",
-    dynamic_includes=None,
-    container_wrapper_class_list=None,
-):
-    # Cache
-    if html_url_prefix is None:
-        html_url_prefix = pb.gc("html_url_prefix")
+# Placeholders that are filled in per page after the template has been populated, see md2html.render_markdown_page_to_html()
+PAGE_TEMPLATE_SLOTS = ("node_name", "pinnedNode", "html_url_prefix", "page_depth")
+
+# Slots are marked with characters that cannot occur in html, so that placeholders that are only introduced by a replacement value later on are left as-is
+SLOT_MARKER_RE = re.compile(r"\x00(\w+)\x00")
+
+
+def slot_marker(name):
+    return f"\x00{name}\x00"
+
+
+class CompiledTemplate:
+    """
+    Template that has been split up into static segments and named slots, see CompileTemplate().
+    Rendering a page is a single join of the segments and the values of the slots.
+    """
+
+    def __init__(self, template):
+        # even indices are static segments, odd indices are slot names
+        self.parts = SLOT_MARKER_RE.split(template)
+
+    def render(self, **values):
+        parts = self.parts.copy()
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            parts[i] = values[name] if name in values else "{" + name + "}"
+        return "".join(parts)
+
+    def populate(self, pb, node_id, content, html_url_prefix=None, title="", container_wrapper_class_list=None, **values):
+        if html_url_prefix is None:
+            html_url_prefix = pb.gc("html_url_prefix")
+
+        if title == "":
+            title = pb.gc("site_name", cached=True)
+
+        if container_wrapper_class_list is None:
+            container_wrapper_class_list = []
+        if pb.gc("toggles/no_tabs", cached=True):
+            container_wrapper_class_list.append("single_tab_page")
+
+        return self.render(
+            node_id=node_id,
+            title=title,
+            html_url_prefix=html_url_prefix,
+            container_wrapper_class_list=" ".join(container_wrapper_class_list),
+            pinnedNode=node_id,
+            content=content,
+            **values,
+        )
+
+
+def CompileTemplate(pb, dynamic_inclusions, template, dynamic_includes=None, page=False):
+    """
+    Fills in everything in the template that is the same for every page of this run. The placeholders that differ per call to PopulateTemplate()
+    (node_id, title, html_url_prefix, container_wrapper_class_list, pinnedNode, content) are left as slots.
+    When page is True, the placeholders in PAGE_TEMPLATE_SLOTS are turned into slots as well.
+    Compiled templates are cached on the picknick basket.
+    """
+    key = (template, dynamic_inclusions, dynamic_includes, page, tuple(pb.navbar_links))
+    if key in pb.compiled_templates:
+        return pb.compiled_templates[key]
+
+    # the html_url_prefix differs per page when relative_path_html is enabled, so it is filled in when the template is rendered
+    html_url_prefix = "{html_url_prefix}"
 
     # Major components
     # header
@@ -244,14 +327,14 @@ def PopulateTemplate(
     # make sure passed in inclusions are last in the list
     dynamic_inclusions_tail = dynamic_inclusions
     dynamic_inclusions = ""
-    dynamic_inclusions += '<script src="' + html_url_prefix + '/obs.html/static/obsidian_core.js"></script>' + "\n"
-    dynamic_inclusions += '<script src="' + html_url_prefix + '/obs.html/static/encoding.js"></script>' + "\n"
-    dynamic_inclusions += '<link rel="stylesheet" href="' + html_url_prefix + '/obs.html/static/master.css" />' + "\n"
+    dynamic_inclusions += '<script src="' + html_url_prefix + static_url(pb, "obsidian_core.js") + '"></script>' + "\n"
+    dynamic_inclusions += '<script src="' + html_url_prefix + static_url(pb, "encoding.js") + '"></script>' + "\n"
+    dynamic_inclusions += '<link rel="stylesheet" href="' + html_url_prefix + static_url(pb, "master.css") + '" />' + "\n"
 
 
     if pb.ConfigManager.feature_is_enabled("smiles", cached=True):
         dynamic_inclusions += '<script src="https://unpkg.com/smiles-drawer@2.0.3/dist/smiles-drawer.min.js"></script>'
-        dynamic_inclusions += '<script src="' + html_url_prefix + '/obs.html/static/smiles.js"></script>' + "\n"
+        dynamic_inclusions += '<script src="' + html_url_prefix + static_url(pb, "smiles.js") + '"></script>' + "\n"
 
     if pb.ConfigManager.feature_is_enabled("callouts", cached=True):
         pass
@@ -277,13 +360,12 @@ def PopulateTemplate(
         # dynamic_inclusions += '<script src="https://polyfill.io/v3/polyfill.min.js?features=es6"></script>' + "\n"
 
     if pb.ConfigManager.feature_is_enabled("search", cached=True):
-        dynamic_inclusions += '<script src="' + html_url_prefix + '/obs.html/static/flexsearch.bundle.js"></script>' + "\n"
-        dynamic_inclusions += '<script src="' + html_url_prefix + '/obs.html/static/pako.js"></script>' + "\n"
-        dynamic_inclusions += '<script src="' + html_url_prefix + '/obs.html/static/search.js"></script>' + "\n"
+        dynamic_inclusions += '<script src="' + html_url_prefix + static_url(pb, "pako.js") + '"></script>' + "\n"
+        dynamic_inclusions += '<script src="' + html_url_prefix + static_url(pb, "search.js") + '"></script>' + "\n"
         # dynamic_inclusions += '<link rel="stylesheet" href="'+html_url_prefix+'/obs.html/static/search.css" />' + "\n"
 
     if pb.capabilities_needed["directory_tree"]:
-        dynamic_inclusions += '<script src="' + html_url_prefix + '/obs.html/static/dirtree.js"></script>' + "\n"
+        dynamic_inclusions += '<script src="' + html_url_prefix + static_url(pb, "dirtree.js") + '"></script>' + "\n"
 
     dynamic_inclusions += dynamic_inclusions_tail + '\n'
 
@@ -295,12 +377,12 @@ def PopulateTemplate(
 
     if pb.gc("toggles/features/styling/layout", cached=True) == "documentation":
         footer_js_inclusions += (
-            f'<script src="{html_url_prefix}/obs.html/static/load_dirtree_footer.js" type="text/javascript"></script>' + "\n"
+            f'<script src="{html_url_prefix}{static_url(pb, "load_dirtree_footer.js")}" type="text/javascript"></script>' + "\n"
         )
 
     if pb.gc("toggles/features/styling/layout", cached=True) == "tabs":
         footer_js_inclusions += (
-            f'<script src="{html_url_prefix}/obs.html/static/obsidian_tabs_footer.js" type="text/javascript"></script>' + "\n"
+            f'<script src="{html_url_prefix}{static_url(pb, "obsidian_tabs_footer.js")}" type="text/javascript"></script>' + "\n"
         )
 
     # Include toggled components
@@ -355,31 +437,46 @@ def PopulateTemplate(
     else:
         template = template.replace("{search_html}", "")
 
-    # Misc
-    if title == "":
-        title = pb.gc("site_name", cached=True)
-
-    if container_wrapper_class_list is None:
-        container_wrapper_class_list = []
-    if pb.gc("toggles/no_tabs", cached=True):
-        container_wrapper_class_list.append("single_tab_page")
-
     # Replace placeholders
     template = (
-        template.replace("{node_id}", node_id)
-        .replace("{title}", title)
+        template.replace("{node_id}", slot_marker("node_id"))
+        .replace("{title}", slot_marker("title"))
         .replace("{dynamic_includes}", dynamic_inclusions)
         .replace("{dynamic_footer_includes}", pb.dynamic_footer_inclusions)
         .replace("{footer_js_inclusions}", footer_js_inclusions)
-        .replace("{html_url_prefix}", html_url_prefix)
+        .replace("{html_url_prefix}", slot_marker("html_url_prefix"))
         .replace("{configured_html_url_prefix}", pb.configured_html_prefix)
-        .replace("{container_wrapper_class_list}", " ".join(container_wrapper_class_list))
+        .replace("{container_wrapper_class_list}", slot_marker("container_wrapper_class_list"))
         .replace("{no_tabs}", str(int(pb.gc("toggles/no_tabs", cached=True))))
-        .replace("{pinnedNode}", node_id)
+        .replace("{pinnedNode}", slot_marker("pinnedNode"))
         .replace("{{navbar_links}}", "\n".join(pb.navbar_links))
-        .replace("{content}", content)
+        .replace("{content}", slot_marker("content"))
     )
 
-    return template
+    if page:
+        for name in PAGE_TEMPLATE_SLOTS:
+            template = template.replace("{" + name + "}", slot_marker(name))
+        template = template.replace("{{navbar_links}}", "\n".join(pb.navbar_links))
+
+    compiled = CompiledTemplate(template)
+    pb.compiled_templates[key] = compiled
+    return compiled
+
+
+def PopulateTemplate(
+    pb,
+    node_id,
+    dynamic_inclusions,
+    template,
+    content,
+    html_url_prefix=None,
+    title="",
+    dynamic_includes=None,
+    container_wrapper_class_list=None,
+):
+    compiled = CompileTemplate(pb, dynamic_inclusions, template, dynamic_includes=dynamic_includes)
+    return compiled.populate(
+        pb, node_id, content, html_url_prefix=html_url_prefix, title=title, container_wrapper_class_list=container_wrapper_class_list
+    )
     # Adding value replacement in content should be done in crawl_markdown_notes_and_convert_to_html,
     # Between the md.StripCodeSections() and md.RestoreCodeSections() statements, otherwise codeblocks can be altered.
@@ -1,36 +1,49 @@
 import sys
 import frontmatter
-import gzip
 import yaml
 
+from pathlib import Path
+
 import regex as re  # regex string finding/replacing
 
 from .. import md2html
 
-from ..lib import CreateStaticFilesFolders, WriteFileLog, simpleHash, get_html_url_prefix, retain_reference
+from ..lib import CreateStaticFilesFolders, WriteFileLog, get_html_url_prefix, retain_reference, get_job_count, get_forked_process_pool
+from ..lib import get_arguments_dict
 
 from ..compiler.Templating import PopulateTemplate
 from ..core.PicknickBasket import PicknickBasket
 from ..core.FileObject import FileObject
 from ..core.Index import Index
+from ..core.IncrementalBuild import IncrementalBuild
+from ..core.PageStore import PageStore
+from ..core.DocumentCache import DocumentCache
+from ..core.OutputWriter import OutputWriter
+from ..core.Profiler import Profiler
 
 from ..features.RssFeed import RssFeed
 from ..features.CreateIndexFromTags import CreateIndexFromTags
 from ..features.EmbeddedSearch import EmbeddedSearch
+from ..features.Precompression import Precompression
 from ..features.SidePane import get_side_pane_html
 from ..features import post_processing
 
 from ..compiler.HTML import compile_navbar_links, create_folder_navigation_view, create_foldable_tag_lists, recurseTagList
-from ..compiler.Templating import ExportStaticFiles
+from ..compiler.Templating import ExportStaticFiles, ExportStaticBundles
 
 from ..modules import controller as module_controller
 
 
-def ConvertVault(config_yaml_location=""):
+def ConvertVault(config_yaml_location="", documents=None):
+    """Converts the vault, and returns the picknick basket.
+    documents: DocumentCache of a previous conversion in this process (serve --watch), so that unchanged notes are not read again."""
     # Set config
     # ---------------------------------------------------------
     pb = PicknickBasket()
 
+    # (--profile <path> writes a report of where the time is spent to <path>, see core/Profiler.py)
+    pb.profiler = Profiler(get_arguments_dict().get("profile"))
+
     # Bootstrap module system
     # ----------------------------------------------------------
     module_result, setup_module = module_controller.run_module_setup(pb=pb)
@@ -80,15 +93,42 @@ def ConvertVault(config_yaml_location=""):
 
     # Load input files into file tree
     # ---------------------------------------------------------
-    Index(pb)
+    with pb.profiler.phase("index"):
+        pb.documents = documents if documents is not None else DocumentCache(pb)
+        pb.output = OutputWriter(pb)
+        Index(pb)
+
+        if pb.gc("incremental_build"):
+            pb.incremental = IncrementalBuild(pb)
 
     # Convert
     # ---------------------------------------------------------
-    convert_obsidian_notes_to_markdown(pb)
-    convert_markdown_to_html(pb)
-    compile_rss_feed(pb)
-    export_user_files(pb)
-    run_post_processing(pb)
+    with pb.profiler.phase("n2m"):
+        convert_obsidian_notes_to_markdown(pb)
+    with pb.profiler.phase("m2h"):
+        convert_markdown_to_html(pb)
+    with pb.profiler.phase("rss"):
+        compile_rss_feed(pb)
+    with pb.profiler.phase("export user files"):
+        export_user_files(pb)
+    with pb.profiler.phase("post processing"):
+        run_post_processing(pb)
+
+    if pb.incremental is not None:
+        with pb.profiler.phase("incremental build manifest"):
+            pb.incremental.save()
+
+    # (after the incremental build has removed stale output, so that the compressed copies of removed files are removed as well)
+    with pb.profiler.phase("precompression"):
+        precompress_output(pb)
+
+    pb.output.save_copies()
+
+    if pb.gc("toggles/compile_html") and pb.gc("write_output_manifest"):
+        with pb.profiler.phase("output manifest"):
+            print("> WRITING OUTPUT MANIFEST")
+            pb.output.save_manifest()
+            print("< WRITING OUTPUT MANIFEST: Done")
 
     # Wrap up
     # ---------------------------------------------------------
@@ -99,6 +139,9 @@ def ConvertVault(config_yaml_location=""):
         if pb.gc("toggles/compile_html"):
             print(f"\thtml: {pb.paths['html_output_folder']}")
 
+    pb.profiler.write_report()
+    return pb
+
 
 def convert_obsidian_notes_to_markdown(pb):
     if pb.gc("toggles/compile_md", cached=True):
@@ -121,6 +164,10 @@ def convert_obsidian_notes_to_markdown(pb):
         if pb.gc("toggles/force_filename_to_lowercase", cached=True):
             rel_entry_path_str = rel_entry_path_str.lower()
 
+        jobs = get_job_count(pb)
+        if jobs > 1 and convert_obsidian_notes_to_markdown_in_parallel(pb, rel_entry_path_str, jobs):
+            return
+
         # Start conversion
         entrypoint_file_object = pb.index.files[rel_entry_path_str]
         pb.init_state(
@@ -158,6 +205,141 @@ def convert_obsidian_notes_to_markdown(pb):
             print("\t< FEATURE: PROCESS ALL: Done")
 
 
+# Set in the parent process right before the worker processes are forked, so that every worker inherits the fully loaded picknick basket
+_worker_pb = None
+_worker_file_objects = None
+_worker_file_object_indices = None
+
+
+def _convert_note_in_worker(fo_index):
+    pb = _worker_pb
+    fo = _worker_file_objects[fo_index]
+
+    # hand copies back to the main process instead of doing them here
+    pb.FileCopier.start_recording()
+    if pb.incremental is not None:
+        pb.FileFinder.start_recording()
+    with pb.profiler.note(fo.path["note"]["file_relative_path"].as_posix()):
+        md = convert_obsidian_note_to_markdown_and_export(fo, pb)
+    copies = pb.FileCopier.stop_recording()
+    lookups = pb.FileFinder.stop_recording() if pb.incremental is not None else None
+
+    # (forked processes share the object ids of the parent process)
+    def get_indices(file_objects):
+        indices = []
+        for link_fo in file_objects:
+            if link_fo is False:
+                continue
+            if id(link_fo) not in _worker_file_object_indices:
+                raise Exception(f"Link to {link_fo.path['note']['file_absolute_path']} in {fo.path['note']['file_absolute_path']} is not present in the index.")
+            indices.append(_worker_file_object_indices[id(link_fo)])
+        return indices
+
+    return (get_indices(md.links), is_leaf_note(md), get_indices(md.inclusions), copies, lookups, pb.profiler.drain())
+
+
+def convert_obsidian_notes_to_markdown_in_parallel(pb, rel_entry_path_str, jobs):
+    """
+    Parallel version of the crawl through the obsidian notes. The notes are converted in waves: every wave converts all the notes that were
+    found in the previous wave in the worker processes, after which the links that are returned are used to compile the next wave.
+    Copies of linked files are handed back to the main process and done there.
+
+    Because the notes are visited breadth first, max_note_depth is the shortest amount of links between the entrypoint and a note.
+    Returns False when no worker processes can be started.
+    """
+    global _worker_pb, _worker_file_objects, _worker_file_object_indices
+
+    max_note_depth = pb.gc("max_note_depth")
+
+    # Every file object gets an index, so that workers can refer to them
+    file_objects = []
+    seen = set()
+    for fo in list(pb.index.files.values()) + list(pb.index.aliased_files.values()):
+        if id(fo) not in seen:
+            seen.add(id(fo))
+            file_objects.append(fo)
+    fo_indices = {id(fo): i for i, fo in enumerate(file_objects)}
+
+    def crawl(executor, frontier, log_level=1):
+        # frontier is a list of (file object, depth)
+        while len(frontier) > 0:
+            for fo, _ in frontier:
+                fo.processed_ntm = True
+
+            frontier = [(fo, depth) for fo, depth in frontier if fo.metadata["is_parsable_note"]]
+
+            # notes that are unchanged since the previous (incremental) build are not converted again
+            convert = [fo for fo, _ in frontier if pb.incremental is None or not pb.incremental.note_is_clean(fo)]
+            to_convert = set([id(fo) for fo in convert])
+
+            chunksize = max(1, len(convert) // (jobs * 4))
+            results = executor.map(_convert_note_in_worker, [fo_indices[id(fo)] for fo in convert], chunksize=chunksize)
+
+            next_frontier = []
+            for fo, depth in frontier:
+                if id(fo) not in to_convert:
+                    links, leaf_note = pb.incremental.reuse_note(fo)
+                else:
+                    links, leaf_note, inclusions, copies, lookups, timed_notes = next(results)
+                    pb.profiler.merge(timed_notes)
+                    links = [file_objects[i] for i in links]
+                    for src_file_path, dst_file_path in copies:
+                        pb.FileCopier.copy(src_file_path, dst_file_path)
+                    if pb.incremental is not None:
+                        pb.incremental.record_note(fo, links, leaf_note, [file_objects[i] for i in inclusions], copies, lookups)
+
+                # Don't follow links if this would exceed max note depth, or when the user tells us not to
+                if (max_note_depth > -1 and depth + 1 > max_note_depth) or leaf_note:
+                    continue
+
+                for link_fo in links:
+                    if link_fo.processed_ntm is True:
+                        continue
+                    link_fo.processed_ntm = True
+
+                    if pb.gc("toggles/verbose_printout", cached=True):
+                        print(
+                            "\t" * log_level,
+                            f"found link {link_fo.path['note']['file_absolute_path']} (through parent {fo.path['note']['file_absolute_path']})",
+                        )
+                    next_frontier.append((link_fo, depth + 1))
+
+            frontier = next_frontier
+
+    # The workers need the state of the parent process (index, config), so these need to be set before forking.
+    _worker_pb = pb
+    _worker_file_objects = file_objects
+    _worker_file_object_indices = fo_indices
+    try:
+        executor = get_forked_process_pool(jobs)
+        if executor is None:
+            return False
+
+        with executor:
+            pb.init_state(action="n2m", loop_type="note", current_fo=None, subroutine="convert_obsidian_notes_to_markdown_in_parallel")
+
+            # Start conversion with entrypoint.
+            crawl(executor, [(pb.index.files[rel_entry_path_str], 0)])
+
+            # also do the tags page if it is not the index, otherwise this page will never be hit
+            if pb.gc("toggles/features/create_index_from_tags/enabled") and not pb.gc("toggles/features/create_index_from_tags/use_as_homepage"):
+                crawl(executor, [(pb.index.files[pb.gc("toggles/features/create_index_from_tags/rel_output_path")], 0)])
+
+            # Keep going until all other files are processed
+            if pb.gc("toggles/process_all", cached=True):
+                print("\t> FEATURE: PROCESS ALL")
+                crawl(executor, [(fo, 0) for fo in pb.index.files.values() if fo.processed_ntm is False], log_level=2)
+                print("\t< FEATURE: PROCESS ALL: Done")
+
+            pb.reset_state()
+    finally:
+        _worker_pb = None
+        _worker_file_objects = None
+        _worker_file_object_indices = None
+
+    return True
+
+
 def convert_markdown_to_html(pb):
     if not pb.gc("toggles/compile_html", cached=True):
         return
@@ -167,11 +349,36 @@ def convert_markdown_to_html(pb):
     # Prepare reusable blocks
     compile_navbar_links(pb)
 
+    # The pages link to the fingerprinted names of the css/js files, so these are written first
+    with pb.profiler.phase("static bundles"):
+        ExportStaticBundles(pb)
+
+    # Rendered pages are kept here until they are finalized
+    pb.pages = PageStore(pb)
+
+    # The values that the rss feed needs of the notes are collected while the pages are rendered
+    if pb.gc("toggles/features/rss/enabled"):
+        pb.rss_feed = RssFeed(pb)
+
+    # The search data is written while the pages are crawled
+    if pb.capabilities_needed["search_data"]:
+        index_path = None
+        if pb.ConfigManager.feature_is_enabled("search", cached=True):
+            index_path = pb.paths["html_output_folder"].joinpath("obs.html/data/search_index.json.gzip")
+        pb.search.open(pb.paths["html_output_folder"].joinpath("obs.html/data/search.json.gzip"), pb.output, index_path=index_path)
+
     # Force search to lowercase
     rel_entry_path_str = pb.paths["rel_md_entrypoint_path"].as_posix()
     if pb.gc("toggles/force_filename_to_lowercase", cached=True):
         rel_entry_path_str = rel_entry_path_str.lower()
 
+    # When running with multiple jobs, or when building incrementally, the crawl below only discovers the pages and the link graph,
+    # and queues the pages for rendering.
+    jobs = get_job_count(pb)
+    render_queue = None
+    if jobs > 1 or pb.incremental is not None:
+        render_queue = []
+
     # Conversion: md -> html
     # -----------------------------------------------------------
     # Start conversion from the entrypoint
@@ -179,7 +386,7 @@ def convert_markdown_to_html(pb):
     pb.init_state(
         action="m2h", loop_type="md_note", current_fo=entrypoint_file_object, subroutine="crawl_markdown_notes_and_convert_to_html"
     )
-    crawl_markdown_notes_and_convert_to_html(entrypoint_file_object, pb)
+    crawl_markdown_notes_and_convert_to_html(entrypoint_file_object, pb, render_queue=render_queue)
     pb.reset_state()
 
     # also do the tags page if it is not the index, otherwise this page will never be hit
@@ -188,7 +395,7 @@ def convert_markdown_to_html(pb):
         pb.init_state(
             action="m2h", loop_type="md_note", current_fo=entrypoint_file_object, subroutine="crawl_markdown_notes_and_convert_to_html"
         )
-        crawl_markdown_notes_and_convert_to_html(entrypoint_file_object, pb, capture_in_jar="tags_page_html")
+        crawl_markdown_notes_and_convert_to_html(entrypoint_file_object, pb, capture_in_jar="tags_page_html", render_queue=render_queue)
         pb.reset_state()
 
     # Keep going until all other files are processed
@@ -205,16 +412,71 @@ def convert_markdown_to_html(pb):
             pb.init_state(
                 action="m2h_process_all", loop_type="md_note", current_fo=fo, subroutine="crawl_markdown_notes_and_convert_to_html"
             )
-            crawl_markdown_notes_and_convert_to_html(fo, pb, log_level=2)
+            crawl_markdown_notes_and_convert_to_html(fo, pb, log_level=2, render_queue=render_queue)
             pb.reset_state()
 
         print("\t< FEATURE: PROCESS ALL: Done")
 
-    # [??] Second pass
+    # Render queued pages
+    if render_queue is not None:
+        if pb.incremental is not None:
+            render_queue = pb.incremental.filter_render_queue(render_queue)
+        print(f"\t> RENDERING {len(render_queue)} PAGES ({jobs} JOBS)")
+        with pb.profiler.phase("render"):
+            md2html.render_queued_pages(pb, render_queue, jobs)
+        print(f"\t< RENDERING {len(render_queue)} PAGES ({jobs} JOBS): Done")
+
+    # All pages have been added to the search data at this point
+    if pb.capabilities_needed["search_data"]:
+        pb.gzip_hash = pb.search.close()
+
+    # [??] Finalize pages
     # ------------------------------------------
-    # Some code can only be generated when all the notes have already been created.
-    # These steps are done in this block.
+    # Some code can only be generated when all the notes are known. The rendered pages are kept in pb.pages, with named slots for
+    # this content (see md2html.PAGE_SLOTS). These are filled in here, after which every page is written exactly once.
+    with pb.profiler.phase("finalize"):
+        finalize_html_pages(pb)
+
+    # Create system pages
+    # -----------------------------------------------------------
+    # Create tag pages
+    with pb.profiler.phase("tag pages"):
+        recurseTagList(pb.tagtree, "", pb, level=0)
+        create_foldable_tag_lists(pb)
+
+        # the tag pages are created again on every run, remove the pages of tags that are no longer in use
+        # (only the pages that changed are written, so that their modified time only changes when their contents do)
+        if pb.incremental is not None:
+            pb.output.remove_unwritten(pb.paths["html_output_folder"].joinpath("obs.html/tags"), suffixes=(".html",))
+
+    # Create graph fullpage
+    if pb.gc("toggles/features/graph/enabled", cached=True):
+        # compile graph
+        html = PopulateTemplate(pb, "null", pb.dynamic_inclusions, pb.graph_full_page_template, content="")
+        html = html.replace("{{navbar_links}}", "\n".join(pb.navbar_links)).replace("{page_depth}", "2")
+
+        op = pb.paths["html_output_folder"].joinpath("obs.html/graph/index.html")
+        op.parent.mkdir(parents=True, exist_ok=True)
+
+        pb.output.write(op, html)
 
+    if pb.capabilities_needed["graph_data"]:
+        # add crosslinks to graph data
+        pb.index.network_tree.AddCrosslinks()
+
+        # Write node json to static folder
+        CreateStaticFilesFolders(pb.paths["html_output_folder"])
+        pb.output.write(pb.paths["html_output_folder"].joinpath("obs.html").joinpath("data/graph.json"), pb.index.network_tree.OutputJson())
+
+    # Add Extra stuff to the output directories
+    with pb.profiler.phase("static files"):
+        ExportStaticFiles(pb)
+
+    print("< COMPILING HTML FROM MARKDOWN CODE: Done")
+
+
+def finalize_html_pages(pb):
+    """Fills in the slots of all the rendered pages in pb.pages, and writes them to the output folder."""
     # Create reusable blocks
     create_folder_navigation_view(pb)
 
@@ -226,217 +488,178 @@ def convert_markdown_to_html(pb):
 
     esearch = None
     if pb.gc("toggles/features/embedded_search/enabled", cached=True):
-        esearch = EmbeddedSearch(json_data=pb.search.OutputJson())
+        esearch = EmbeddedSearch(search_data=pb.search.load(), index_dir=Path(pb.module_data_folder).joinpath("cache/embedded_search"))
 
-    print("\t> SECOND PASS HTML")
+    print("\t> FINALIZING HTML PAGES")
 
     for fo in pb.index.files.values():
         if not fo.metadata["is_note"]:
             continue
 
-        # get paths / html prefix
+        # pages that have not been rendered in this run (e.g. unchanged pages in an incremental build) are left as is
         dst_abs_path = fo.path["html"]["file_absolute_path"]
-        dst_rel_path_str = fo.path["html"]["file_relative_path"].as_posix()
-        html_url_prefix = get_html_url_prefix(pb, rel_path_str=dst_rel_path_str)
-        page_depth = len(dst_rel_path_str.split("/")) - 1
-
-        # get html content
-        try:
-            with open(dst_abs_path, "r", encoding="utf-8") as f:
-                html = f.read()
-        except:
-            continue
-
-        # Get node_id
-        m = re.search(r"(?<=\{_obsidian_html_node_id_pattern_:)(.*?)(?=\})", html)
-        if m is None:
+        if dst_abs_path not in pb.pages:
             continue
-        node_id = m.group(0)
-        node = pb.index.network_tree.node_lookup[node_id]
-        html = re.sub("\{_obsidian_html_node_id_pattern_:" + re.escape(node_id) + "}", "", html)
-
-        # Get tags
-        tags = md2html.get_tags(node)
 
-        # Fill in side pane content
-        left_pane = get_side_pane_html(pb, "left_pane", node)
-        html = html.replace("{left_pane}", left_pane)
+        html = finalize_html_page(pb, fo, pb.pages.get(dst_abs_path), esearch)
+        pb.pages.write(dst_abs_path, html)
 
-        right_pane = get_side_pane_html(pb, "right_pane", node)
-        html = html.replace("{right_pane}", right_pane)
+    # rendered pages without a note (should not happen) are written without filling in the slots
+    for dst_abs_path in pb.pages.paths():
+        pb.pages.write(dst_abs_path, pb.pages.get(dst_abs_path))
+    pb.pages.close()
 
-        # Compile backlinks list
-        if pb.gc("toggles/features/backlinks/enabled", cached=True):
-            html = md2html.insert_backlinks(pb, html, node_id, page_depth)
+    if esearch is not None:
+        esearch.close()
 
-        # Insert tags footer
-        html = md2html.insert_tags_footer(pb, html, tags, fo.md.metadata)
+    print("\t< FINALIZING HTML PAGES: Done")
 
-        # add breadcrumbs
-        if pb.gc("toggles/features/breadcrumbs/enabled", cached=True):
-            if node["url"] == "/index.html":
-                snippet = ""
-            else:
-                html_url_prefix = pb.gc("html_url_prefix", cached=True)
-                parts = [f'<a href="{html_url_prefix}/" style="color: rgb(var(--normal-text-color));">Home</a>']
 
-                previous_url = ""
-                subpaths = node["url"].replace(".html", "").split("/")[1:]
-                match_subpaths = subpaths
+def finalize_html_page(pb, fo, html, esearch=None):
+    """Fills in the slots of a page that was rendered by md2html.render_markdown_page_to_html(), see md2html.PAGE_SLOTS."""
+    dst_rel_path_str = fo.path["html"]["file_relative_path"].as_posix()
+    get_html_url_prefix(pb, rel_path_str=dst_rel_path_str)
+    page_depth = len(dst_rel_path_str.split("/")) - 1
 
-                if pb.gc("toggles/force_filename_to_lowercase", cached=True):
-                    match_subpaths = [x.lower() for x in subpaths]
+    node_id = pb.pages.get_node_id(fo.path["html"]["file_absolute_path"])
+    node = pb.index.network_tree.node_lookup[node_id]
+    tags = md2html.get_tags(node)
 
-                if html_url_prefix:
-                    subpaths = subpaths[1:]
-                    match_subpaths = match_subpaths[1:]
+    # content of the page itself
+    html = md2html.insert_inline_tags(pb, html, tags, fo.md.metadata)
+    if pb.gc("toggles/features/embedded_search/enabled", cached=True):
+        html = insert_embedded_search_results(html, esearch)
 
-                for i, msubpath in enumerate(match_subpaths):
-                    if i == len(msubpath) - 1:
-                        if node["url"] != previous_url:
-                            parts.append(f'<a href="{node["url"]}" ___COLOR___ >{subpaths[i]}</a>')
-                        continue
-                    else:
-                        url = None
-                        if msubpath in pb.index.network_tree.node_lookup:
-                            url = pb.index.network_tree.node_lookup[msubpath]["url"]
-                        elif msubpath in pb.index.network_tree.node_lookup_slug:
-                            url = pb.index.network_tree.node_lookup_slug[msubpath]["url"]
-                        else:
-                            parts.append(f'<span style="color: #666;">{subpaths[i]}</span>')
-                            previous_url = ""
-                            continue
-                        if url != previous_url:
-                            parts.append(f'<a href="{url}" ___COLOR___>{subpaths[i]}</a>')
-                        previous_url = url
-                        continue
+    # slots
+    slots = {
+        "left_pane": get_side_pane_html(pb, "left_pane", node),
+        "right_pane": get_side_pane_html(pb, "right_pane", node),
+        "_obsidian_html_tags_footer_pattern_": md2html.compile_tags_footer_html(pb, tags, fo.md.metadata),
+    }
+    if pb.gc("toggles/features/backlinks/enabled", cached=True):
+        slots["_obsidian_html_backlinks_pattern_"] = md2html.compile_backlinks_html(pb, node_id, page_depth)
+    if pb.gc("toggles/features/breadcrumbs/enabled", cached=True):
+        slots["_obsidian_html_breadcrumbs_pattern_"] = compile_breadcrumbs_html(pb, node)
 
-                parts[-1] = parts[-1].replace("___COLOR___", "")
-                for i, link in enumerate(parts):
-                    parts[i] = link.replace("___COLOR___", 'style="color: var(--normal-text-color);"')
+    return md2html.fill_page_slots(html, slots)
 
-                snippet = " / ".join(parts)
-                snippet = f"""
-                <div style="width:100%; text-align: right;display: block;margin: 0.5rem;">
-                    <div style="flex:1;display: none;"></div>
-                    <div class="breadcrumbs" style="flex:1 ;padding: 0.5rem; width: fit-content;display: inline;border-radius: 0.2rem;">
-                        {snippet}
-                    </div>
-                </div>"""
 
-            html = re.sub("\{_obsidian_html_breadcrumbs_pattern_\}", snippet, html)
+def compile_breadcrumbs_html(pb, node):
+    if node["url"] == "/index.html":
+        return ""
 
-        # add embedded search results
-        if pb.gc("toggles/features/embedded_search/enabled", cached=True):
-            query_blocks = re.findall(r"(?<=<p>{_obsidian_html_query:)(.*?)(?=\ }</p>)", html)
-            for listing in query_blocks:
-                # split listing into qualifier and user_query
-                qual, user_query = listing.split("|-|")
+    html_url_prefix = pb.gc("html_url_prefix", cached=True)
+    parts = [f'<a href="{html_url_prefix}/" style="color: rgb(var(--normal-text-color));">Home</a>']
 
-                # found query
-                print(qual, user_query)
+    previous_url = ""
+    subpaths = node["url"].replace(".html", "").split("/")[1:]
+    match_subpaths = subpaths
 
-                # search
-                res = esearch.search(user_query)
+    if pb.gc("toggles/force_filename_to_lowercase", cached=True):
+        match_subpaths = [x.lower() for x in subpaths]
 
-                # compile html output
-                output = ""
-                if qual == "list":
-                    output = (
-                        '<div class="query"><ul>\n\t'
-                        + "\n\t".join([f'<li><a href="/{x["path"]}">{x["title"]}</a></li>' for x in res])
-                        + "\n</ul></div>"
-                    )
+    if html_url_prefix:
+        subpaths = subpaths[1:]
+        match_subpaths = match_subpaths[1:]
 
-                else:
-                    output = '<div class="query">'
-                    for doc in res:
-                        # setup doc
-                        output += f'\n\t<div class="match-document">\n\t\t<div class="match-document-title">\n\t\t\t<a href="/{doc["path"]}">{doc["title"]}</a>\n\t\t</div>\n\t\t<div class="matches">'
-
-                        # Add path matches
-                        if doc["matches"]["path"]:
-                            output += '\n\t\t\t<div class="match-row">\n\t\t\t\t' + doc["matches"]["path"] + "\n\t\t\t</div>"
-
-                        # Add content mathes
-                        for match in doc["matches"]["content"]:
-                            output += f'\n\t\t\t<div class="match-row">\n\t\t\t\t{match}\n\t\t\t</div>'
-
-                        # Add tags
-                        if len(doc["matches"]["tags"]) > 0:
-                            output += '\n\t\t\t<div class="tag-box">'
-                            for match, tag in doc["matches"]["tags"]:
-                                output += f'\n\t\t\t\t<div class="match-row tag">\n\t\t\t\t\t<a href="/obs.html/tags/{tag}/index.html">{match}</a>\n\t\t\t\t</div>'
-                            output += "\n\t\t\t</div>"
-
-                        if len(doc["matches"]["tags_keyword"]) > 0:
-                            output += '\n\t\t\t<div class="tag-box">'
-                            for match, tag in doc["matches"]["tags_keyword"]:
-                                output += f'\n\t\t\t\t<div class="match-row tag keyword">\n\t\t\t\t\t<a href="/obs.html/tags/{tag}/index.html">{match}</a>\n\t\t\t\t</div>'
-                            output += "\n\t\t\t</div>"
-
-                        # close doc divs
-                        output += "\n\t\t</div>\n\t</div>"
-                    # close query div
-                    output += "\n</div>"
-
-                # replace query block with html
-                try:
-                    safe_str = re.escape("<p>{_obsidian_html_query:" + listing + " }</p>")
-                    html = re.sub(safe_str, output, html)
-                except:
-                    print(listing)
-                    raise
-
-        # write result
-        with open(dst_abs_path, "w", encoding="utf-8") as f:
-            f.write(html)
-
-    print("\t< SECOND PASS HTML: Done")
+    for i, msubpath in enumerate(match_subpaths):
+        if i == len(msubpath) - 1:
+            if node["url"] != previous_url:
+                parts.append(f'<a href="{node["url"]}" ___COLOR___ >{subpaths[i]}</a>')
+            continue
+        else:
+            url = None
+            if msubpath in pb.index.network_tree.node_lookup:
+                url = pb.index.network_tree.node_lookup[msubpath]["url"]
+            elif msubpath in pb.index.network_tree.node_lookup_slug:
+                url = pb.index.network_tree.node_lookup_slug[msubpath]["url"]
+            else:
+                parts.append(f'<span style="color: #666;">{subpaths[i]}</span>')
+                previous_url = ""
+                continue
+            if url != previous_url:
+                parts.append(f'<a href="{url}" ___COLOR___>{subpaths[i]}</a>')
+            previous_url = url
+            continue
 
-    # Create system pages
-    # -----------------------------------------------------------
-    # Create tag pages
-    recurseTagList(pb.tagtree, "", pb, level=0)
-    create_foldable_tag_lists(pb)
+    parts[-1] = parts[-1].replace("___COLOR___", "")
+    for i, link in enumerate(parts):
+        parts[i] = link.replace("___COLOR___", 'style="color: var(--normal-text-color);"')
 
-    # Create graph fullpage
-    if pb.gc("toggles/features/graph/enabled", cached=True):
-        # compile graph
-        html = PopulateTemplate(pb, "null", pb.dynamic_inclusions, pb.graph_full_page_template, content="")
-        html = html.replace("{{navbar_links}}", "\n".join(pb.navbar_links)).replace("{page_depth}", "2")
+    snippet = " / ".join(parts)
+    snippet = f"""
+                <div style="width:100%; text-align: right;display: block;margin: 0.5rem;">
+                    <div style="flex:1;display: none;"></div>
+                    <div class="breadcrumbs" style="flex:1 ;padding: 0.5rem; width: fit-content;display: inline;border-radius: 0.2rem;">
+                        {snippet}
+                    </div>
+                </div>"""
 
-        op = pb.paths["html_output_folder"].joinpath("obs.html/graph/index.html")
-        op.parent.mkdir(parents=True, exist_ok=True)
+    return snippet
 
-        with open(op, "w", encoding="utf-8") as f:
-            f.write(html)
 
-    if pb.capabilities_needed["graph_data"]:
-        # add crosslinks to graph data
-        pb.index.network_tree.AddCrosslinks()
+def insert_embedded_search_results(html, esearch):
+    query_blocks = re.findall(r"(?<=<p>{_obsidian_html_query:)(.*?)(?=\ }</p>)", html)
+    for listing in query_blocks:
+        # split listing into qualifier and user_query
+        qual, user_query = listing.split("|-|")
 
-        # Write node json to static folder
-        CreateStaticFilesFolders(pb.paths["html_output_folder"])
-        with open(pb.paths["html_output_folder"].joinpath("obs.html").joinpath("data/graph.json"), "w", encoding="utf-8") as f:
-            f.write(pb.index.network_tree.OutputJson())
+        # found query
+        print(qual, user_query)
 
-    if pb.capabilities_needed["search_data"]:
-        # Compress search json and write to static folder
-        gzip_path = pb.paths["html_output_folder"].joinpath("obs.html").joinpath("data/search.json.gzip")
-        gzip_path.parent.mkdir(parents=True, exist_ok=True)
-        gzip_content = pb.search.OutputJson()
-        #pb.gzip_hash = simpleHash(gzip_content.decode("utf-8"))
-        pb.gzip_hash = simpleHash(gzip_content)
+        # search
+        res = esearch.search(user_query)
 
-        with gzip.open(gzip_path, "wb", compresslevel=5) as f:
-            #f.write(gzip_content)
-            f.write(gzip_content.encode("utf-8"))
+        # compile html output
+        output = ""
+        if qual == "list":
+            output = (
+                '<div class="query"><ul>\n\t'
+                + "\n\t".join([f'<li><a href="/{x["path"]}">{x["title"]}</a></li>' for x in res])
+                + "\n</ul></div>"
+            )
 
-    # Add Extra stuff to the output directories
-    ExportStaticFiles(pb)
+        else:
+            output = '<div class="query">'
+            for doc in res:
+                # setup doc
+                output += f'\n\t<div class="match-document">\n\t\t<div class="match-document-title">\n\t\t\t<a href="/{doc["path"]}">{doc["title"]}</a>\n\t\t</div>\n\t\t<div class="matches">'
+
+                # Add path matches
+                if doc["matches"]["path"]:
+                    output += '\n\t\t\t<div class="match-row">\n\t\t\t\t' + doc["matches"]["path"] + "\n\t\t\t</div>"
+
+                # Add content mathes
+                for match in doc["matches"]["content"]:
+                    output += f'\n\t\t\t<div class="match-row">\n\t\t\t\t{match}\n\t\t\t</div>'
+
+                # Add tags
+                if len(doc["matches"]["tags"]) > 0:
+                    output += '\n\t\t\t<div class="tag-box">'
+                    for match, tag in doc["matches"]["tags"]:
+                        output += f'\n\t\t\t\t<div class="match-row tag">\n\t\t\t\t\t<a href="/obs.html/tags/{tag}/index.html">{match}</a>\n\t\t\t\t</div>'
+                    output += "\n\t\t\t</div>"
+
+                if len(doc["matches"]["tags_keyword"]) > 0:
+                    output += '\n\t\t\t<div class="tag-box">'
+                    for match, tag in doc["matches"]["tags_keyword"]:
+                        output += f'\n\t\t\t\t<div class="match-row tag keyword">\n\t\t\t\t\t<a href="/obs.html/tags/{tag}/index.html">{match}</a>\n\t\t\t\t</div>'
+                    output += "\n\t\t\t</div>"
+
+                # close doc divs
+                output += "\n\t\t</div>\n\t</div>"
+            # close query div
+            output += "\n</div>"
+
+        # replace query block with html
+        try:
+            safe_str = re.escape("<p>{_obsidian_html_query:" + listing + " }</p>")
+            html = re.sub(safe_str, output, html)
+        except:
+            print(listing)
+            raise
 
-    print("< COMPILING HTML FROM MARKDOWN CODE: Done")
+    return html
 
 
 def compile_rss_feed(pb):
@@ -444,11 +667,22 @@ def compile_rss_feed(pb):
         return
 
     print("> COMPILING RSS FEED")
-    feed = RssFeed(pb)
+    feed = pb.rss_feed
+    if feed is None:
+        feed = RssFeed(pb)
     feed.Compile()
     print("< COMPILING RSS FEED: Done")
 
 
+def precompress_output(pb):
+    if not pb.gc("toggles/compile_html") or not pb.gc("toggles/features/precompression/enabled"):
+        return
+
+    print("> PRECOMPRESSING OUTPUT")
+    Precompression(pb).run()
+    print("< PRECOMPRESSING OUTPUT: Done")
+
+
 def export_user_files(pb):
     if not pb.gc("file_exports"):
         return
@@ -473,25 +707,17 @@ def export_user_files(pb):
         if encoding == "binary":
             with open(src, "rb") as f:
                 contents = f.read()
-            with open(dst, "wb") as f:
-                f.write(contents)
+            pb.output.write(dst, contents)
         else:
             with open(src, "r", encoding=encoding) as f:
                 contents = f.read()
-            with open(dst, "w", encoding=encoding) as f:
-                f.write(contents)
+            pb.output.write(dst, contents, encoding=encoding)
 
     print("< EXPORTING USER FILES: Done")
 
 
-# @extra_info()
-def crawl_obsidian_notes_and_convert_to_markdown(fo: "FileObject", pb, log_level=1, iteration=0):
-    """This functions converts an obsidian note to a markdown file and calls itself on any local note links it finds in the page."""
-
-    # Don't parse if not parsable
-    if not fo.metadata["is_parsable_note"]:
-        return
-
+def convert_obsidian_note_to_markdown_and_export(fo: "FileObject", pb):
+    """Converts a single obsidian note to a markdown file and writes it to the markdown output folder. Returns the MarkdownPage object."""
     if pb.gc("toggles/stdout_current_file", cached=True):
         print(fo.path["note"]["file_absolute_path"].as_posix().encode('cp1252', errors='ignore'))
 
@@ -514,8 +740,50 @@ def crawl_obsidian_notes_and_convert_to_markdown(fo: "FileObject", pb, log_level
     dst_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Write markdown to file
-    with open(dst_path, "w", encoding="utf-8") as f:
-        f.write(md.page)
+    pb.output.write(dst_path, md.page)
+    pb.documents.store(dst_path, md.page)
+
+    return md
+
+
+def convert_or_reuse_obsidian_note(fo: "FileObject", pb):
+    """
+    Converts the note, or, when doing an incremental build and the note is unchanged, reuses the result of the previous run.
+    Returns the linked file objects, and whether the note is a leaf note.
+    """
+    if pb.incremental is None:
+        md = convert_obsidian_note_to_markdown_and_export(fo, pb)
+        return (md.links, is_leaf_note(md))
+
+    if pb.incremental.note_is_clean(fo):
+        return pb.incremental.reuse_note(fo)
+
+    pb.FileCopier.start_recording()
+    pb.FileFinder.start_recording()
+    md = convert_obsidian_note_to_markdown_and_export(fo, pb)
+    copies = pb.FileCopier.stop_recording()
+    lookups = pb.FileFinder.stop_recording()
+    for src_file_path, dst_file_path in copies:
+        pb.FileCopier.copy(src_file_path, dst_file_path)
+
+    pb.incremental.record_note(fo, md.links, is_leaf_note(md), md.inclusions, copies, lookups)
+    return (md.links, is_leaf_note(md))
+
+
+def is_leaf_note(md):
+    return "obs.html.tags" in md.metadata.keys() and "leaf_note" in md.metadata["obs.html.tags"]
+
+
+# @extra_info()
+def crawl_obsidian_notes_and_convert_to_markdown(fo: "FileObject", pb, log_level=1, iteration=0):
+    """This functions converts an obsidian note to a markdown file and calls itself on any local note links it finds in the page."""
+
+    # Don't parse if not parsable
+    if not fo.metadata["is_parsable_note"]:
+        return
+
+    with pb.profiler.note(fo.path["note"]["file_relative_path"].as_posix()):
+        links, leaf_note = convert_or_reuse_obsidian_note(fo, pb)
 
     # Recurse for every link in the current page
     # ------------------------------------------------------------------
@@ -525,10 +793,10 @@ def crawl_obsidian_notes_and_convert_to_markdown(fo: "FileObject", pb, log_level
         return
 
     # Don't follow links when the user tells us not to
-    if "obs.html.tags" in md.metadata.keys() and "leaf_note" in md.metadata["obs.html.tags"]:
+    if leaf_note:
         return
 
-    for link_fo in md.links:
+    for link_fo in links:
         if link_fo is False or link_fo.processed_ntm is True:
             if pb.gc("toggles/verbose_printout", cached=True):
                 if link_fo is False:
@@ -553,7 +821,7 @@ def crawl_obsidian_notes_and_convert_to_markdown(fo: "FileObject", pb, log_level
 
 
 # @extra_info()
-def crawl_markdown_notes_and_convert_to_html(fo: "FileObject", pb, backlink_node=None, log_level=1, capture_in_jar=False):
+def crawl_markdown_notes_and_convert_to_html(fo: "FileObject", pb, backlink_node=None, log_level=1, capture_in_jar=False, render_queue=None):
     """This functions converts a markdown page to an html file and calls itself on any local markdown links it finds in the page."""
 
     if pb.gc("toggles/stdout_current_file", cached=True):
@@ -561,7 +829,8 @@ def crawl_markdown_notes_and_convert_to_html(fo: "FileObject", pb, backlink_node
 
     # Convert and export page, and collect links to other markdown pages found in the page.
     # ------------------------------------------------------------------
-    node, md_links = md2html.convert_markdown_page_to_html_and_export(fo, pb, backlink_node, log_level, capture_in_jar)
+    with pb.profiler.note(fo.path["markdown"]["file_relative_path"].as_posix()):
+        node, md_links = md2html.convert_markdown_page_to_html_and_export(fo, pb, backlink_node, log_level, capture_in_jar, render_queue)
 
     # Recurse for every link in the current page
     # ------------------------------------------------------------------
@@ -576,7 +845,7 @@ def crawl_markdown_notes_and_convert_to_html(fo: "FileObject", pb, backlink_node
             )
 
         pb.init_state(action="m2h", loop_type="md_note", current_fo=link_fo, subroutine="crawl_markdown_notes_and_convert_to_html")
-        crawl_markdown_notes_and_convert_to_html(link_fo, pb, backlink_node=node, log_level=log_level)
+        crawl_markdown_notes_and_convert_to_html(link_fo, pb, backlink_node=node, log_level=log_level, render_queue=render_queue)
         pb.reset_state()
 
 
@@ -1,8 +1,25 @@
+import io
 import os
 import sys
+import gzip
+import threading
 import http.server
 import socketserver
+import urllib.parse
+import email.utils
+
+import regex as re
+
+from http import HTTPStatus
 from pathlib import Path
+from collections import OrderedDict
+
+from ..compiler.StaticAssets import HASH_LENGTH
+
+try:
+    import brotli
+except ImportError:  # optional, precompressed .br files are served either way
+    brotli = None
 
 # Defer tools
 from contextlib import ExitStack
@@ -11,6 +28,7 @@ from functools import partial
 
 def ServeDir(port=8888, directory="./"):
     # Get directory/port from commandline args if provided
+    directory_given = False
     if len(sys.argv) > 2:
         if sys.argv[1] == "serve":
             for i, v in enumerate(sys.argv):
@@ -21,6 +39,7 @@ def ServeDir(port=8888, directory="./"):
                         )
                         exit(1)
                     directory = sys.argv[i + 1]
+                    directory_given = True
 
                 if v == "--port":
                     if len(sys.argv) < (i + 2):
@@ -28,13 +47,41 @@ def ServeDir(port=8888, directory="./"):
                         exit(1)
                     port = sys.argv[i + 1]
 
+    # --watch: convert the vault, serve the output, and convert again whenever a file in the vault changes
+    if "--watch" in sys.argv:
+        from .Watch import WatchVault
+
+        WatchVault(port=port, directory=(directory if directory_given else None))
+        return
+
     if not Path(directory).resolve().exists():
         print(f"Configured directory of {directory} does not exist.")
         exit(1)
 
+    # configure server
+    Handler = get_handler_class(directory)
+
+    # start server
+    print(
+        f"OBSHTML: Started webserver at http://localhost:{port}/ hosting from {Path(directory).resolve().as_posix()} (Ctrl+C to exit)",
+        flush=True,
+    )
+    httpd = ThreadingServer(("", int(port)), Handler)
+
+    with ExitStack() as stack:
+        stack.callback(partial(httpd.server_close))
+        stack.callback(partial(print, "DEFERRED: closed webserver", flush=True))
+
+        httpd.serve_forever()
+
+
+def get_handler_class(directory, live_reload=None):
+    """Returns the request handler class that serves the given directory. When a LiveReload object is passed in, html pages are served
+    with a script that reloads the page when live_reload.notify() is called (see controller/Watch.py)."""
+
     # We do this trickery so that we can set Handler.directory without having the init method overwrite our setting.
     # (Handler.init() is called somewhere out of our control)
-    class BetterHandler(http.server.SimpleHTTPRequestHandler):
+    class BetterHandler(StaticFileHandler):
         def __init__(self, *args, **kwargs):
             if self.directory is None:
                 self.directory = os.getcwd()
@@ -42,24 +89,320 @@ def ServeDir(port=8888, directory="./"):
             self.directory = os.fspath(self.directory)
             super(http.server.SimpleHTTPRequestHandler, self).__init__(*args, **kwargs)
 
-    # configure server
+        def do_GET(self):
+            if live_reload is not None:
+                if self.path.split("?")[0] == live_reload.url_path:
+                    return live_reload.stream_events(self)
+                if live_reload.serve_html_page(self):
+                    return
+            super().do_GET()
+
     Handler = BetterHandler
     Handler.directory = Path(directory).resolve().as_posix()
+    Handler.compression_cache = CompressionCache()
     Handler.extensions_map.update(
         {
             ".js": "application/javascript",
         }
     )
+    return Handler
 
-    # start server
+
+class ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    # open connections (keep-alive, event streams) should not keep the process alive
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_server_thread(port, directory, live_reload=None):
+    """Starts serving the directory in a background thread (one thread per request, so that event streams don't block other requests)"""
+    httpd = ThreadingServer(("", int(port)), get_handler_class(directory, live_reload))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
     print(
         f"OBSHTML: Started webserver at http://localhost:{port}/ hosting from {Path(directory).resolve().as_posix()} (Ctrl+C to exit)",
         flush=True,
     )
-    httpd = socketserver.TCPServer(("", int(port)), Handler)
+    return httpd
 
-    with ExitStack() as stack:
-        stack.callback(partial(httpd.server_close))
-        stack.callback(partial(print, "DEFERRED: closed webserver", flush=True))
 
-        httpd.serve_forever()
+# ----
+# Static files
+# ----
+# (types that are worth compressing, everything else (images, video, fonts) is already compressed)
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+MIN_COMPRESS_SIZE = 1024
+
+# encoding --> suffix of the precompressed file next to the original, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+STATIC_URL_PATH = "/obs.html/static/"
+# (other files are revalidated on every request, which is cheap with the ETags)
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+# files with a hash of their contents in their name never change (see compiler/StaticAssets.py)
+FINGERPRINTED_NAME_RE = re.compile(r"\.[0-9a-f]{" + str(HASH_LENGTH) + r"}\.(css|js)$")
+FINGERPRINTED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+COMPRESSION_CACHE_BUDGET = 64 * 1024 * 1024
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class StaticFileHandler(http.server.SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler, with keep-alive, gzip/brotli negotiation, ETag/Last-Modified validation and Range requests.
+
+    Compressed responses prefer a precompressed sibling of the file (e.g. mermaid.js.gz next to mermaid.js) when it is at least as new as
+    the file itself, other compressible files are compressed on the fly, and kept in the compression_cache.
+    Ranges are only served for uncompressed responses (video/audio is not compressed anyway).
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # close idle keep-alive connections, so that they don't hold on to a thread forever
+    timeout = 60
+
+    compression_cache = None
+
+    def send_head(self):
+        self.range = None
+
+        url_path = urllib.parse.urlsplit(self.path).path
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not url_path.endswith("/"):
+                # (redirect to the url with a trailing slash)
+                return super().send_head()
+            for index in ("index.html", "index.htm"):
+                if os.path.isfile(os.path.join(path, index)):
+                    path = os.path.join(path, index)
+                    break
+            else:
+                return self.list_directory(path)
+
+        # check for trailing "/" which should return 404 (see SimpleHTTPRequestHandler.send_head)
+        if path.endswith("/") or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        ctype = self.guess_type(path)
+        compressible = ctype.startswith(COMPRESSIBLE_TYPES)
+        encoding, f, size = self.open_encoded(path, stat, compressible)
+
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + encoding if encoding else ""}"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+
+        def send_headers():
+            self.send_header("Content-Type", ctype)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.send_header("Cache-Control", get_cache_control(url_path))
+            if compressible:
+                self.send_header("Vary", "Accept-Encoding")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            else:
+                self.send_header("Accept-Ranges", "bytes")
+
+        try:
+            if self.is_not_modified(etag, stat.st_mtime):
+                f.close()
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                send_headers()
+                self.end_headers()
+                return None
+
+            if encoding is None and "Range" in self.headers and self.if_range_matches(etag, stat.st_mtime):
+                byte_range = parse_range(self.headers["Range"], size)
+                if byte_range is False:
+                    f.close()
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return None
+                if byte_range is not None:
+                    start, end = byte_range
+                    f.seek(start)
+                    self.range = end - start + 1
+                    self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                    send_headers()
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                    self.send_header("Content-Length", str(self.range))
+                    self.end_headers()
+                    return f
+
+            self.send_response(HTTPStatus.OK)
+            send_headers()
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def open_encoded(self, path, stat, compressible):
+        """Returns (encoding, file object, size) of the best response body that the client accepts. Encoding is None for the file as is."""
+        accepted = get_accepted_encodings(self.headers.get("Accept-Encoding", ""))
+
+        for encoding, suffix in ENCODINGS.items():
+            if encoding not in accepted:
+                continue
+            try:
+                sibling_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            if sibling_stat.st_mtime_ns >= stat.st_mtime_ns:
+                return encoding, open(path + suffix, "rb"), sibling_stat.st_size
+
+        if compressible and stat.st_size >= MIN_COMPRESS_SIZE and self.compression_cache is not None:
+            for encoding in ENCODINGS:
+                if encoding in accepted and (encoding != "br" or brotli is not None):
+                    data = self.compression_cache.get(path, stat, encoding)
+                    return encoding, io.BytesIO(data), len(data)
+
+        return None, open(path, "rb"), stat.st_size
+
+    def is_not_modified(self, etag, mtime):
+        if "If-None-Match" in self.headers:
+            return etag_matches(self.headers["If-None-Match"], etag)
+        if "If-Modified-Since" in self.headers:
+            return not_modified_since(self.headers["If-Modified-Since"], mtime)
+        return False
+
+    def if_range_matches(self, etag, mtime):
+        """A Range request with an If-Range header only gets the range when the file has not changed"""
+        if "If-Range" not in self.headers:
+            return True
+        value = self.headers["If-Range"].strip()
+        if value.startswith(('"', "W/")):
+            return value == etag
+        return not_modified_since(value, mtime)
+
+    def copyfile(self, source, outputfile):
+        if self.range is None:
+            return super().copyfile(source, outputfile)
+
+        remaining = self.range
+        while remaining > 0:
+            chunk = source.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            remaining -= len(chunk)
+
+
+class CompressionCache:
+    """Keeps the compressed versions of files that have no precompressed sibling, the least recently used are dropped when the total size
+    exceeds COMPRESSION_CACHE_BUDGET"""
+
+    def __init__(self, budget=COMPRESSION_CACHE_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.lock = threading.Lock()
+
+        # (path, encoding) --> (stamp, compressed bytes), least recently used first
+        self.entries = OrderedDict()
+
+    def get(self, path, stat, encoding):
+        key = (path, encoding)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                return entry[1]
+
+        # (compress outside of the lock, so that other requests are not blocked)
+        with open(path, "rb") as f:
+            data = compress(f.read(), encoding)
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.used -= len(previous[1])
+            self.entries[key] = (stamp, data)
+            self.used += len(data)
+            while self.used > self.budget and len(self.entries) > 1:
+                _, (_, dropped) = self.entries.popitem(last=False)
+                self.used -= len(dropped)
+        return data
+
+
+def get_cache_control(url_path):
+    if STATIC_URL_PATH in url_path and FINGERPRINTED_NAME_RE.search(url_path):
+        return FINGERPRINTED_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def get_accepted_encodings(header):
+    """Returns the encodings in the Accept-Encoding header that are not refused with q=0"""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def etag_matches(header, etag):
+    """Weak comparison of the etags in If-None-Match"""
+    if header.strip() == "*":
+        return True
+    return any(x.strip().removeprefix("W/") == etag for x in header.split(","))
+
+
+def not_modified_since(header, mtime):
+    try:
+        since = email.utils.parsedate_to_datetime(header)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return False
+    if since is None or since.tzinfo is None:
+        return False
+    return int(mtime) <= since.timestamp()
+
+
+def parse_range(header, size):
+    """Returns (start, end) (inclusive) of a single "bytes=" range, None when the header should be ignored, and False when the range
+    can't be satisfied"""
+    unit, _, ranges = header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        # (multiple ranges are allowed to be answered with the whole file)
+        return None
+
+    start, dash, end = ranges.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if start == "":
+            # last n bytes
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
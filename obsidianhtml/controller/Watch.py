@@ -0,0 +1,402 @@
+import os
+import sys
+import time
+import json
+import errno
+import struct
+import select
+import ctypes
+import ctypes.util
+import threading
+import traceback
+
+from pathlib import Path
+
+from .ConvertVault import ConvertVault
+from .Serve import start_server_thread
+from ..modules.builtin.get_file_list import GetFileListModule, compile_glob, compile_prune_glob, walk_input_folder
+
+"""
+`obsidianhtml serve --watch -i config.yml` converts the vault, serves the html output, and converts the vault again whenever one of the
+files that get_file_list selects (include_glob/exclude_glob) changes. Open pages are reloaded in the browser once the conversion is done.
+
+- Changes are picked up with inotify (linux), or by walking the vault every POLL_INTERVAL seconds when inotify is not available.
+- A burst of changes (e.g. an editor that saves several files) results in a single conversion, which starts once no change has been seen
+  for DEBOUNCE_SECONDS.
+- The conversions run in this process, with incremental_build turned on, so that only the pages of which the input changed (and the pages
+  that depend on them) are rendered and written again. The parsed notes (see core/DocumentCache.py) are kept in memory between conversions.
+- Html pages are served with a small script that listens to LIVE_RELOAD_URL_PATH (server-sent events) and reloads the page.
+
+This is a partial implementation of a warm rebuild: every change still runs the whole conversion (ConvertVault), which loads the config,
+builds the index and the graph, and crawls every note again. The watcher does not pass on which files changed, the incremental build finds
+the affected pages by comparing the hashes of their input. So the time of a rebuild grows with the size of the vault: a one-note change in a
+vault of 1000 notes takes about 3 seconds, where a second or less was the aim. Keeping the index and the graph between conversions, and
+crawling only the changed notes and the notes that depend on them, is still to be done.
+"""
+
+DEBOUNCE_SECONDS = 0.2
+POLL_INTERVAL = 0.5
+LIVE_RELOAD_URL_PATH = "/obs.html/live-reload"
+
+
+def WatchVault(port=8888, directory=None):
+    # first conversion, this also tells us where the vault and the output are
+    pb = convert()
+    if pb is None:
+        print("OBSHTML: The first conversion failed, fix the error above and run again.")
+        exit(1)
+
+    if directory is None:
+        directory = pb.paths["html_output_folder"]
+    if not Path(directory).resolve().exists():
+        print(f"Configured directory of {directory} does not exist.")
+        exit(1)
+
+    watcher = get_watcher(pb)
+    live_reload = LiveReload()
+    httpd = start_server_thread(port, directory, live_reload)
+
+    try:
+        while True:
+            watcher.wait()
+
+            # wait until the changes stop coming in
+            while watcher.wait(timeout=DEBOUNCE_SECONDS):
+                pass
+
+            print("\nOBSHTML: Change detected, converting vault", flush=True)
+            start = time.perf_counter()
+            new_pb = convert(documents=pb.documents)
+            if new_pb is None:
+                print("OBSHTML: Conversion failed, waiting for the next change.", flush=True)
+                continue
+
+            pb = new_pb
+            live_reload.notify()
+            print(f"OBSHTML: Converted in {time.perf_counter() - start:.2f}s, reloading open pages", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        watcher.close()
+        print("DEFERRED: closed webserver", flush=True)
+
+
+def convert(documents=None):
+    """Converts the vault, returns the picknick basket of the conversion, or None when it failed (the error is printed)"""
+    try:
+        return ConvertVault(documents=documents)
+    except SystemExit:
+        # (errors in the config or the vault are reported through exit())
+        return None
+    except Exception:
+        traceback.print_exc()
+        return None
+    finally:
+        clear_run_caches()
+
+
+def clear_run_caches():
+    """Clears the caches of functions that are cached per picknick basket, these would otherwise keep every conversion in memory"""
+    from ..core.ConfigManager import Config
+    from ..core.FileFinder import FileFinder
+    from ..compiler.HTML import create_foldable_tag_lists_html
+    from ..features.SidePane import get_html_page_content
+    from ..features.add_toc_when_missing import gc_add_toc_when_missing
+    from ..features.CreateIndexFromDirStructure import CreateIndexFromDirStructure
+    from ..modules.handlers.config import get_config_cached
+    from ..modules.base_classes import ObsidianHtmlModule
+
+    for function in (
+        Config._feature_is_enabled_cached,
+        Config._get_config_cached,
+        Config.ShowIcon,
+        FileFinder._GetObsidianFilePath,
+        FileFinder._FindFile,
+        FileFinder._GetNodeId,
+        create_foldable_tag_lists_html,
+        get_html_page_content,
+        gc_add_toc_when_missing,
+        CreateIndexFromDirStructure.check_has_folder_note,
+        CreateIndexFromDirStructure.BuildProtoIndexSegments,
+        CreateIndexFromDirStructure.BuildProtoIndex,
+        get_config_cached,
+        ObsidianHtmlModule.config.fget,
+        ObsidianHtmlModule.verbosity.fget,
+    ):
+        function.cache_clear()
+
+
+# ----
+# Live reload
+# ----
+LIVE_RELOAD_SCRIPT = """
+<script>
+(function () {
+    var source = new EventSource("%s");
+    source.addEventListener("reload", function () { source.close(); location.reload(); });
+})();
+</script>
+"""
+
+
+class LiveReload:
+    """Keeps the event streams of the open pages, and tells them to reload after every conversion"""
+
+    url_path = LIVE_RELOAD_URL_PATH
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def stream_events(self, handler):
+        """Keeps the request open, and sends a reload event after the next conversion. Runs in the thread of the request."""
+        # (before the response starts, so that a conversion that finishes once the client sees the stream is not missed)
+        with self.condition:
+            generation = self.generation
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        # (the stream has no length, it ends when the connection is closed)
+        handler.send_header("Connection", "close")
+        handler.close_connection = True
+        handler.end_headers()
+
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.generation != generation, timeout=15)
+                    changed = self.generation != generation
+                if changed:
+                    handler.wfile.write(b"event: reload\ndata: \n\n")
+                    handler.wfile.flush()
+                    return
+                # (comment line, so that closed connections are noticed)
+                handler.wfile.write(b": keep-alive\n\n")
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def serve_html_page(self, handler):
+        """Serves html pages with the live reload script added. Returns False when the request is not for an html page."""
+        path = handler.translate_path(handler.path)
+        if os.path.isdir(path):
+            if not handler.path.split("?")[0].endswith("/"):
+                # (let the default handler redirect to the url with a trailing slash)
+                return False
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            return False
+
+        with open(path, "rb") as f:
+            html = f.read()
+
+        script = (LIVE_RELOAD_SCRIPT % self.url_path).encode("utf-8")
+        position = html.rfind(b"</body>")
+        if position == -1:
+            html += script
+        else:
+            html = html[:position] + script + html[position:]
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(html)))
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        handler.wfile.write(html)
+        return True
+
+
+# ----
+# Watchers
+# ----
+def get_watcher(pb):
+    """Returns a watcher for the files in the vault that get_file_list selects"""
+    with open(Path(pb.module_data_folder).joinpath("paths.json"), "r", encoding="utf-8") as f:
+        paths = json.loads(f.read())
+    folder = paths["original_input_folder"]
+
+    # the globs, as configured for get_file_list
+    module = GetFileListModule(module_data_folder=pb.module_data_folder, module_name="get_file_list")
+    module.try_load_mod_config()
+    include_globs = module.value_of("include_glob")
+    exclude_globs = module.value_of("exclude_glob")
+
+    try:
+        watcher = InotifyWatcher(folder, include_globs, exclude_globs)
+        print(f"OBSHTML: Watching {folder} for changes (inotify)", flush=True)
+    except OSError as e:
+        watcher = PollingWatcher(folder, include_globs, exclude_globs)
+        print(f"OBSHTML: Watching {folder} for changes (polling every {POLL_INTERVAL}s, inotify is not available: {e})", flush=True)
+    return watcher
+
+
+class PollingWatcher:
+    """Walks the folder every POLL_INTERVAL seconds, and compares the size and modified time of the selected files"""
+
+    def __init__(self, folder, include_globs, exclude_globs):
+        self.folder = folder
+        self.include_res = [compile_glob(x) for x in include_globs]
+        self.exclude_res = [compile_glob(x) for x in exclude_globs]
+        self.prune_res = [x for x in (compile_prune_glob(y) for y in exclude_globs) if x is not None]
+        self.stats = self.get_stats()
+
+    def get_stats(self):
+        _, _, file_stats = walk_input_folder(self.folder, self.include_res, self.exclude_res, self.prune_res)
+        return {k: v[:2] for k, v in file_stats.items()}
+
+    def wait(self, timeout=None):
+        """Returns True as soon as a change is seen, or False when the timeout passes without changes"""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(POLL_INTERVAL if end is None else max(0, min(POLL_INTERVAL, end - time.monotonic())))
+            stats = self.get_stats()
+            if stats != self.stats:
+                self.stats = stats
+                return True
+            if end is not None and time.monotonic() >= end:
+                return False
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Watches every folder of the vault (minus the excluded ones) with inotify. Raises OSError when inotify is not available."""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, folder, include_globs, exclude_globs):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on linux")
+        library = ctypes.util.find_library("c")
+        if library is None:
+            raise OSError(errno.ENOSYS, "libc not found")
+        self.libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify_init1 not found in libc")
+
+        self.folder = Path(folder).as_posix()
+        self.include_res = [compile_glob(x) for x in include_globs]
+        self.exclude_res = [compile_glob(x) for x in exclude_globs]
+        self.prune_res = [x for x in (compile_prune_glob(y) for y in exclude_globs) if x is not None]
+
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watches = {}  # watch descriptor --> relative path of the folder ("" for the root, otherwise ending in "/")
+        try:
+            self.add_watches("")
+        except OSError:
+            self.close()
+            raise
+
+    def add_watches(self, rel_dir):
+        """Watches the folder and all its subfolders, except the excluded ones"""
+        stack = [rel_dir]
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = f"{self.folder}/{rel_dir}"
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(abs_dir), self.MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    # (removed in the meantime)
+                    continue
+                raise OSError(error, f"inotify_add_watch failed for {abs_dir}")
+            self.watches[wd] = rel_dir
+
+            try:
+                with os.scandir(abs_dir) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = rel_dir + entry.name
+                if entry.is_dir(follow_symlinks=False) and not any(x.fullmatch(rel_path) for x in self.prune_res):
+                    stack.append(rel_path + "/")
+
+    def is_selected(self, rel_path):
+        if not any(x.fullmatch(rel_path) for x in self.include_res):
+            return False
+        return not any(x.fullmatch(rel_path) for x in self.exclude_res)
+
+    def wait(self, timeout=None):
+        """Returns True as soon as a change is seen, or False when the timeout passes without changes"""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if end is None else max(0, end - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if self.read_events():
+                return True
+
+    def read_events(self):
+        """Handles the events that are ready, returns whether any of these concern a selected file"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        changed = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                changed = True
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            rel_dir = self.watches.get(wd)
+            if rel_dir is None:
+                continue
+            rel_path = rel_dir + name
+
+            if mask & self.IN_ISDIR:
+                if name == "" or any(x.fullmatch(rel_path) for x in self.prune_res):
+                    continue
+                # new folders are watched as well, and folders that are moved or removed take their files with them
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self.add_watches(rel_path + "/")
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO | self.IN_MOVED_FROM | self.IN_DELETE):
+                    changed = True
+                continue
+
+            if name != "" and self.is_selected(rel_path):
+                changed = True
+
+        return changed
+
+    def close(self):
+        if self.fd is not None and self.fd >= 0:
+            os.close(self.fd)
+        self.fd = None
@@ -0,0 +1,76 @@
+import os
+import copy
+import frontmatter
+
+from pathlib import Path
+from collections import OrderedDict
+
+"""
+Notes are read by several steps of the conversion (tags index, note --> markdown, inclusions, markdown --> html, graph inclusions).
+This class keeps the parsed form of these files (frontmatter + page), so that every file is read and parsed only once per run.
+
+Every load hands out a copy of the frontmatter, so that a MarkdownPage can alter it without affecting the cached version. The page is a
+string, which cannot be altered in place, so it is shared. Files are checked against their size and modified time on every load, and
+files that obsidianhtml writes itself should be passed to store(), so that the next load does not have to read them back.
+
+The least recently used documents are dropped when the total size exceeds `document_cache_memory_budget` (in MB).
+"""
+
+
+class DocumentCache:
+    def __init__(self, pb):
+        self.memory_budget = int(pb.gc("document_cache_memory_budget", cached=True)) * 1024 * 1024
+        self.memory_used = 0
+
+        # absolute path (posix) --> {"stamp": (size, mtime_ns), "metadata": dict, "page": str, "size": int}, least recently used first
+        self.documents = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path):
+        """Returns (metadata, page) of the given file. The metadata is a copy, and can be altered freely."""
+        key = Path(path).as_posix()
+        stamp = get_stamp(key)
+
+        document = self.documents.get(key)
+        if document is not None and document["stamp"] == stamp:
+            self.documents.move_to_end(key)
+            self.hits += 1
+        else:
+            with open(key, encoding="utf-8") as f:
+                text = f.read()
+            document = self.add(key, stamp, text)
+            self.misses += 1
+
+        return copy.deepcopy(document["metadata"]), document["page"]
+
+    def store(self, path, text):
+        """Use after writing text to path, so that the file does not need to be read again on the next load"""
+        key = Path(path).as_posix()
+        self.add(key, get_stamp(key), text)
+
+    def add(self, key, stamp, text):
+        self.discard(key)
+
+        metadata, page = frontmatter.parse(text)
+        document = {"stamp": stamp, "metadata": metadata, "page": page, "size": len(text)}
+        self.documents[key] = document
+        self.memory_used += document["size"]
+
+        # drop the least recently used documents, but always keep the current one
+        while self.memory_used > self.memory_budget and len(self.documents) > 1:
+            _, dropped = self.documents.popitem(last=False)
+            self.memory_used -= dropped["size"]
+
+        return document
+
+    def discard(self, key):
+        document = self.documents.pop(key, None)
+        if document is not None:
+            self.memory_used -= document["size"]
+
+
+def get_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
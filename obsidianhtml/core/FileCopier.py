@@ -0,0 +1,62 @@
+import os
+
+
+class FileCopier:
+    """
+    Copies (or links) files to the output folders, as configured by `copy_output_file_method`.
+    Every source/destination pair is only handled once per run, no matter how many notes link to the file.
+
+    When recording, copy requests are collected instead of executed. This is used by worker processes to hand their copies back to the
+    main process, so that all copies are done by a single copier.
+    """
+
+    def __init__(self, pb):
+        self.pb = pb
+        self.handled = set()
+        self.recorded = None
+        self.skip_up_to_date = False  # set for incremental builds, see is_up_to_date()
+
+    def start_recording(self):
+        self.recorded = []
+
+    def stop_recording(self):
+        recorded = self.recorded
+        self.recorded = None
+        return recorded
+
+    def is_up_to_date(self, src_file_path, dst_file_path):
+        """Destination is considered up to date when it has the same size as the source, and is not older than the source."""
+        if not os.path.exists(dst_file_path):
+            return False
+        src_stat = os.stat(src_file_path)
+        dst_stat = os.stat(dst_file_path)
+        return src_stat.st_size == dst_stat.st_size and dst_stat.st_mtime >= src_stat.st_mtime
+
+    def copy(self, src_file_path, dst_file_path):
+        if self.recorded is not None:
+            self.recorded.append((src_file_path, dst_file_path))
+            return
+
+        key = (str(src_file_path), str(dst_file_path))
+        if key in self.handled:
+            return
+        self.handled.add(key)
+
+        if self.skip_up_to_date and self.is_up_to_date(src_file_path, dst_file_path):
+            return
+
+        link_mode = self.pb.gc("copy_output_file_method", cached=True)
+        if link_mode == "default":
+            link_mode = "copy"
+
+        dst_file_path.parent.mkdir(parents=True, exist_ok=True)
+        if link_mode == "copy":
+            self.pb.output.copy(src_file_path, dst_file_path)
+        elif link_mode == "symlink":
+            if not os.path.exists(dst_file_path):
+                os.symlink(src_file_path, dst_file_path)
+        elif link_mode == "hardlink":
+            if not os.path.exists(dst_file_path):
+                os.link(src_file_path, dst_file_path)
+        else:
+            raise Exception(f'Bad copy_output_file_method "{link_mode}", expected one of: default, copy, symlink, hardlink')
@@ -5,11 +5,34 @@ from ..lib import bisect
 
 class FileFinder:
     def __init__(self):
-        pass
+        self.files = {}
+        self.files_by_suffix = {}
+        self.recorded = None
+
+    def start_recording(self):
+        """Keeps track of the links that are looked up, and of the file each resolves to, until stop_recording() is called.
+        Used by incremental builds: a note is converted again when one of its links resolves differently (e.g. because a file was added)."""
+        self.recorded = {}
+
+    def stop_recording(self):
+        """Returns the lookups since start_recording() as a list of [method, link, rtr_path_str]"""
+        recorded = self.recorded
+        self.recorded = None
+        return [[method, link, rtr_path_str] for (method, link), rtr_path_str in recorded.items()]
+
+    def Resolve(self, method, link, pb):
+        """Repeats a lookup that was recorded, returns rtr_path_str (False when the link does not resolve)"""
+        if method == "FindFile":
+            return self.FindFile(link, pb)[0]
+        return self.GetObsidianFilePath(link, pb)["rtr_path_str"]
 
     def GetObsidianFilePath(self, link, pb):
         self.files = pb.index.files
-        return self._GetObsidianFilePath(link, pb.gc("html_url_prefix"), pb.gc("toggles/force_filename_to_lowercase", cached=True))
+        self.files_by_suffix = pb.index.files_by_suffix
+        output = self._GetObsidianFilePath(link, pb.gc("html_url_prefix"), pb.gc("toggles/force_filename_to_lowercase", cached=True))
+        if self.recorded is not None:
+            self.recorded[("GetObsidianFilePath", link)] = output["rtr_path_str"]
+        return output
 
     @cache
     def _GetObsidianFilePath(self, link, html_url_prefix, force_filename_to_lowercase):
@@ -49,7 +72,11 @@ class FileFinder:
     # will return (False, False) if not found, (str:url, fo:file_object) when found
     def FindFile(self, link, pb):
         self.files = pb.index.files
-        return self._FindFile(link, pb.gc("html_url_prefix"), pb.gc("toggles/force_filename_to_lowercase", cached=True))
+        self.files_by_suffix = pb.index.files_by_suffix
+        result = self._FindFile(link, pb.gc("html_url_prefix"), pb.gc("toggles/force_filename_to_lowercase", cached=True))
+        if self.recorded is not None:
+            self.recorded[("FindFile", link)] = result[0]
+        return result
 
     @cache
     def _FindFile(self, link, html_url_prefix, force_filename_to_lowercase):
@@ -140,44 +167,13 @@ class FileFinder:
         return result
 
     def GetMatches(self, files, link):
+        """Returns the keys of all the files whose path ends with the given link (compared per path component), in order of insertion."""
         self.files = files
-        return self._GetMatches(link)
-
-    @cache
-    def _GetMatches(self, link):
-        files = self.files
-        search = False
-        prevtrue = False
-        # if 'Test Pages/textfile.txt' in link:
-        #     search = True
-
-        # find all links that match the tail part
-        url_parts = link.split("/")
-        matches = []
-        for rel_path in files.keys():
-            parts = rel_path.split("/")
-            if len(url_parts) > len(parts):
-                continue
-
-            match = True
-            for i in range(1, len(url_parts) + 1):
-                if url_parts[-i] != parts[-i]:
-                    match = False
-
-                    if prevtrue:
-                        print("false", f'"{url_parts[-i]}" "{parts[-i]}"')
-                        prevtrue = False
-                    break
-                else:
-                    if search:
-                        print("true", parts[-i])
-                        prevtrue = True
-            if match:
-                matches.append(rel_path)
-        return matches
+        return self.files_by_suffix.get(link, [])
 
     def GetNodeId(self, pb, link):
         self.files = pb.index.files
+        self.files_by_suffix = pb.index.files_by_suffix
         return self._GetNodeId(link, pb.gc("toggles/force_filename_to_lowercase", cached=True))
 
     @cache
@@ -4,7 +4,6 @@ import datetime
 import platform
 import os
 import os.path
-import shutil  # used to remove a non-empty directory, copy files
 
 
 from pathlib import Path
@@ -96,7 +95,7 @@ class FileObject:
             self.path["markdown"]["file_relative_path"] = self.path["markdown"]["file_absolute_path"].relative_to(target_folder_path)
 
             # also add self to pb.index.files under the key 'index.md' so it is findable
-            self.pb.index.files["index.md"] = self
+            self.pb.index.set_file_object("index.md", self)
         else:
             self.path["markdown"]["file_absolute_path"] = target_folder_path.joinpath(self.path["note"]["file_relative_path"])
             self.path["markdown"]["file_relative_path"] = self.path["note"]["file_relative_path"]
@@ -160,13 +159,14 @@ class FileObject:
         # call to self.compile_metadata() should be done manually in the calling function
         self.metadata["depth"] = self._get_depth(self.path["html"]["file_relative_path"])
 
-    def compile_metadata(self, path, cached=False):
+    def compile_metadata(self, path, cached=False, stat=None):
+        """stat: [size, modified time, creation time] of the file when already known (see get_file_list), to not read these again"""
         if cached and "is_note" in self.metadata:
             return
-        self.set_times(path)
-        self.set_file_types(path)
+        self.set_times(path, stat)
+        self.set_file_types(path, exists=(True if stat is not None else None))
 
-    def set_file_types(self, path):
+    def set_file_types(self, path, exists=None):
         self.metadata["is_note"] = False
         self.metadata["is_video"] = False
         self.metadata["is_audio"] = False
@@ -187,10 +187,17 @@ class FileObject:
         if suffix in self.pb.gc("embeddable_file_suffixes", cached=True):
             self.metadata["is_embeddable"] = True
 
-        if path.exists() and self.metadata["is_note"]:
+        if exists is None:
+            exists = path.exists()
+        if exists and self.metadata["is_note"]:
             self.metadata["is_parsable_note"] = True
 
-    def set_times(self, path):
+    def set_times(self, path, stat=None):
+        if stat is not None:
+            if platform.system() == "Windows" or platform.system() == "Darwin":
+                self.metadata["creation_time"] = datetime.datetime.fromtimestamp(stat[2]).isoformat()
+            self.metadata["modified_time"] = datetime.datetime.fromtimestamp(stat[1]).isoformat()
+            return
         if platform.system() == "Windows" or platform.system() == "Darwin":
             self.metadata["creation_time"] = datetime.datetime.fromtimestamp(os.path.getctime(path)).isoformat()
             self.metadata["modified_time"] = datetime.datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
@@ -287,14 +294,4 @@ class FileObject:
         if self.pb.gc("toggles/verbose_printout", cached=True):
             print(f"{'Copy' if link_mode == 'copy' else 'Link'}ing file (mode={mode}) from {src_file_path} to {dst_file_path}")
 
-        dst_file_path.parent.mkdir(parents=True, exist_ok=True)
-        if link_mode == 'copy':
-            shutil.copyfile(src_file_path, dst_file_path)
-        elif link_mode == 'symlink':
-            if not os.path.exists(dst_file_path):
-                os.symlink(src_file_path, dst_file_path)
-        elif link_mode == 'hardlink':
-            if not os.path.exists(dst_file_path):
-                os.link(src_file_path, dst_file_path)
-        else:
-            raise Exception(f'Bad copy_output_file_method "{copy_output_file_method}", expected one of: default, copy, symlink, hardlink')
+        self.pb.FileCopier.copy(src_file_path, dst_file_path)
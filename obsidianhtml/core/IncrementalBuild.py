@@ -0,0 +1,260 @@
+import copy
+import json
+import hashlib
+import regex as re
+
+from pathlib import Path
+
+from ..lib import OpenIncludedFile
+
+"""
+This class is used when incremental_build is enabled. It keeps a manifest of what was built in the previous run, so that
+notes/pages of which the inputs have not changed are not converted again, and their previous output is left in place.
+
+The manifest contains:
+- global_hash: hash of the config, obsidianhtml version and html template. When this changes, everything is rebuilt.
+- layout_hash: hash of the names/urls of all the pages, of the tagtree, of the copied files and of the fingerprinted names of the static
+  files. These show up in every page (dir tree, breadcrumbs, tags pane, script/stylesheet links), so when this changes, all the html pages
+  are rendered again.
+- notes: per note (note --> markdown): the source hash, the source hashes of the included notes, the outgoing links, the copied files and
+  the links that were looked up with the file each resolved to. When a file is added or removed, only the notes of which a link now
+  resolves differently are converted again.
+- pages: per page (markdown --> html): the hash of all the input of the render step, and the backlinks of the page
+- copied_files: all the files that were copied to the output folders, so that these can be removed when they are no longer linked to
+"""
+
+MANIFEST_VERSION = 4
+
+# config values that only change how the output is built, not the output itself, so that changing them does not cause a full rebuild
+PERFORMANCE_CONFIG_PATHS = [
+    "jobs",
+    "page_memory_budget",
+    "copy_vault_to_tempdir_method",
+    "document_cache_memory_budget",
+    "toggles/features/precompression",
+]
+
+
+def get_manifest_path(module_data_folder):
+    return Path(module_data_folder).joinpath("cache/incremental_build.json")
+
+
+def get_hash(value):
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return hashlib.sha1(value).hexdigest()
+
+
+class IncrementalBuild:
+    def __init__(self, pb):
+        self.pb = pb
+        self.manifest_path = get_manifest_path(pb.module_data_folder)
+
+        # file objects are known under their key in pb.index.files
+        self.keys = {}
+        for key, fo in pb.index.files.items():
+            if id(fo) not in self.keys:
+                self.keys[id(fo)] = key
+
+        self.source_hashes = {}
+
+        self.previous = self.load_manifest()
+        self.current = {"version": MANIFEST_VERSION, "global_hash": self.get_global_hash(), "layout_hash": None, "notes": {}, "pages": {}, "copied_files": []}
+
+        self.full_rebuild = self.previous is None or self.previous["global_hash"] != self.current["global_hash"]
+        if self.previous is None:
+            print("\t> INCREMENTAL BUILD: No manifest of a previous run found, doing a full rebuild.")
+        elif self.full_rebuild:
+            print("\t> INCREMENTAL BUILD: Config changed since the previous run, doing a full rebuild.")
+
+        # don't copy over files that are already present in the output
+        pb.FileCopier.skip_up_to_date = True
+
+    def load_manifest(self):
+        if not self.manifest_path.exists():
+            return None
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.loads(f.read())
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        return manifest
+
+    def save(self):
+        self.remove_stale_output()
+
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.current))
+
+    def get_output_paths(self, manifest):
+        paths = [x["md_path"] for x in manifest["notes"].values()]
+        paths += [x["html_path"] for x in manifest["pages"].values()]
+        paths += manifest["copied_files"]
+        return paths
+
+    def remove_stale_output(self):
+        """Removes the output of the previous run that has not been created again in this run (e.g. because the note was removed)"""
+        self.current["copied_files"] = sorted([dst for _, dst in self.pb.FileCopier.handled])
+        if self.previous is None:
+            return
+
+        current_paths = set(self.get_output_paths(self.current))
+        for path_str in self.get_output_paths(self.previous):
+            path = Path(path_str)
+            if path_str not in current_paths and path.exists():
+                path.unlink()
+
+    # HASHES
+    # ===============================================================================================
+    def get_global_hash(self):
+        pb = self.pb
+        config = copy.deepcopy(dict(pb.config.items()))
+        for path in PERFORMANCE_CONFIG_PATHS:
+            *parents, key = path.split("/")
+            d = config
+            for parent in parents:
+                d = d.get(parent, {})
+            d.pop(key, None)
+
+        return get_hash(
+            json.dumps(
+                [config, OpenIncludedFile("version"), pb.html_template],
+                sort_keys=True,
+                default=str,
+            )
+        )
+
+    def get_source_hash(self, fo):
+        key = id(fo)
+        if key not in self.source_hashes:
+            with open(fo.path["note"]["file_absolute_path"], "rb") as f:
+                self.source_hashes[key] = get_hash(f.read())
+        return self.source_hashes[key]
+
+    def get_layout_hash(self):
+        def summarize_tagtree(tagtree):
+            return [sorted([url for _, url in tagtree["notes"]]), {k: summarize_tagtree(v) for k, v in tagtree["subtags"].items()}]
+
+        nodes = sorted([(x["id"], x["name"], x["url"]) for x in self.pb.index.network_tree.tree["nodes"]])
+        # (copied files are listed in the dir tree)
+        copied_files = sorted([dst for _, dst in self.pb.FileCopier.handled])
+        static_assets = self.pb.static_assets.manifest if self.pb.static_assets is not None else {}
+        return get_hash(json.dumps([nodes, summarize_tagtree(self.pb.tagtree), copied_files, static_assets], sort_keys=True))
+
+    def get_render_hash(self, job, metadata):
+        """Hash of everything that goes into rendering a page, see md2html.render_markdown_page_to_html()"""
+        # tags are deduplicated via a set, so their order differs between runs
+        metadata = metadata.copy()
+        if isinstance(metadata.get("tags"), list):
+            metadata["tags"] = sorted(metadata["tags"])
+
+        return get_hash(
+            json.dumps(
+                [job["page"], job["svgs"], job["html_url_prefix"], job["page_depth"], job["node"], metadata],
+                sort_keys=True,
+                default=str,
+            )
+        )
+
+    # NOTES
+    # ===============================================================================================
+    def get_keys(self, file_objects):
+        return [self.keys[id(fo)] for fo in file_objects if fo is not False and id(fo) in self.keys]
+
+    def note_is_clean(self, fo):
+        """A note is clean when the note itself and all the notes it includes are unchanged since the previous run, and its links still
+        resolve to the same files."""
+        if self.full_rebuild:
+            return False
+
+        record = self.previous["notes"].get(self.keys.get(id(fo)))
+        if record is None or not Path(record["md_path"]).exists():
+            return False
+
+        source_hashes = record["inclusions"].copy()
+        source_hashes[self.keys[id(fo)]] = record["source_hash"]
+        for key, source_hash in source_hashes.items():
+            if key not in self.pb.index.files:
+                return False
+            if self.get_source_hash(self.pb.index.files[key]) != source_hash:
+                return False
+
+        # files that were added or removed since the previous run can change what the links of the note resolve to
+        for method, link, rtr_path_str in record["lookups"]:
+            if self.pb.FileFinder.Resolve(method, link, self.pb) != rtr_path_str:
+                return False
+
+        return True
+
+    def reuse_note(self, fo):
+        """Take over the result of the previous run, returns the linked file objects and whether the note is a leaf note."""
+        key = self.keys[id(fo)]
+        record = self.previous["notes"][key]
+        self.current["notes"][key] = record
+
+        # copies are redone, as the linked files might have changed
+        for src_file_path, dst_file_path in record["copies"]:
+            self.pb.FileCopier.copy(Path(src_file_path), Path(dst_file_path))
+
+        links = [self.pb.index.files[x] for x in record["links"] if x in self.pb.index.files]
+        return (links, record["leaf_note"])
+
+    def record_note(self, fo, links, leaf_note, inclusions, copies, lookups):
+        self.current["notes"][self.keys[id(fo)]] = {
+            "source_hash": self.get_source_hash(fo),
+            "inclusions": {self.keys[id(x)]: self.get_source_hash(x) for x in inclusions if id(x) in self.keys},
+            "links": self.get_keys(links),
+            "leaf_note": leaf_note,
+            "copies": [[str(src), str(dst)] for src, dst in copies],
+            "lookups": lookups,
+            "md_path": fo.path["markdown"]["file_absolute_path"].as_posix(),
+        }
+
+    # PAGES
+    # ===============================================================================================
+    def page_always_renders(self, job):
+        # embedded search results depend on all the other pages
+        if re.search(r"^\ *\`\`\`\ *query", job["page"], re.MULTILINE):
+            return True
+        # captured html is used elsewhere
+        if job["capture_in_jar"]:
+            return True
+        # side pane that shows (part of) another page
+        for pane_id in ("left_pane", "right_pane"):
+            if self.pb.gc(f"toggles/features/side_pane/{pane_id}/enabled", cached=True) and self.pb.gc(f"toggles/features/side_pane/{pane_id}/contents", cached=True) == "html_page":
+                return True
+        return False
+
+    def filter_render_queue(self, render_queue):
+        """Should be called when all pages have been crawled. Returns the render jobs of the pages that need to be rendered again."""
+        self.current["layout_hash"] = self.get_layout_hash()
+        rerender_all = self.full_rebuild or self.previous["layout_hash"] != self.current["layout_hash"]
+
+        dirty_queue = []
+        for job in render_queue:
+            rel_path = job["rel_dst_path"].as_posix()
+            record = {
+                "render_hash": job["render_hash"],
+                "backlinks": [x["source"] for x in self.pb.index.network_tree.get_backlinks(job["node"]["id"])],
+                "html_path": job["dst_path"].as_posix(),
+            }
+
+            previous_record = None
+            if not rerender_all:
+                previous_record = self.previous["pages"].get(rel_path)
+
+            if (
+                previous_record is None
+                or previous_record != record
+                or self.page_always_renders(job)
+                or not job["dst_path"].exists()
+            ):
+                dirty_queue.append(job)
+
+            self.current["pages"][rel_path] = record
+
+        # all output has been determined at this point, remove stale output before it is picked up by e.g. the dir tree
+        self.remove_stale_output()
+
+        print(f"\t\tINCREMENTAL BUILD: {len(dirty_queue)} of {len(render_queue)} pages changed.")
+        return dirty_queue
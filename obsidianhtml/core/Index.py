@@ -27,6 +27,7 @@ class Index:
         """This method sets up everything needed for the file tree. It does not yet load the files into the file tree"""
         self.files = {}  # contains every file exactly once (currently twice in the case of the index file)
         self.aliased_files = {}  # files known under a different path_key, such as for slugged file paths
+        self.files_by_suffix = {}  # lists the keys of self.files under every tail of the key, e.g. 'b/c.md' --> ['a/b/c.md', 'b/c.md'], used by FileFinder
 
     def compile_html_relpath_lookup_table(self):
         self.fo_by_html_relpath = {}
@@ -47,6 +48,12 @@ class Index:
         with open(module_data_folder + "/index/files.json", "r") as f:
             files = json.loads(f.read())
 
+        # stats of the files, as read by get_file_list, so that these don't have to be read again
+        file_stats = {}
+        if os.path.isfile(module_data_folder + "/index/file_stats.json"):
+            with open(module_data_folder + "/index/file_stats.json", "r") as f:
+                file_stats = json.loads(f.read())
+
         # # add index.md when converting straight from md to html
         # if not pb.gc("toggles/compile_md", cached=True):
         #     print(input_folder.joinpath("index.md"))
@@ -54,7 +61,8 @@ class Index:
 
         for file in files:
             file = Path(file)
-            if file.is_dir():
+            stat = file_stats.get(file.relative_to(input_folder).as_posix()) if file.is_relative_to(input_folder) else None
+            if stat is None and file.is_dir():
                 continue
 
             fo = FileObject(pb)
@@ -63,7 +71,7 @@ class Index:
             if pb.gc("toggles/compile_md", cached=True):
                 # compile note --> markdown
                 fo.init_note_path(file)
-                fo.compile_metadata(fo.path["note"]["file_absolute_path"], cached=True)
+                fo.compile_metadata(fo.path["note"]["file_absolute_path"], cached=True, stat=stat)
 
                 if pb.gc("toggles/compile_html", cached=True):
                     # compile markdown --> html (based on the given note path)
@@ -75,7 +83,7 @@ class Index:
             else:
                 # compile markdown --> html (based on the found markdown path)
                 fo.init_markdown_path(file)
-                fo.compile_metadata(fo.path["markdown"]["file_absolute_path"], cached=True)
+                fo.compile_metadata(fo.path["markdown"]["file_absolute_path"], cached=True, stat=stat)
 
                 # Add to tree
                 self.add_file_object_to_file_tree(fo.path["markdown"]["file_relative_path"].as_posix(), fo)
@@ -84,5 +92,16 @@ class Index:
     def add_file_object_to_file_tree(self, rel_path, obj):
         if self.pb.gc("toggles/force_filename_to_lowercase", cached=True):
             rel_path = rel_path.lower()
+        self.set_file_object(rel_path, obj)
+
+    def set_file_object(self, rel_path, obj):
+        """Adds the file object under the exact given key, use this instead of setting self.files directly, so that files_by_suffix stays up to date"""
+        if rel_path not in self.files:
+            parts = rel_path.split("/")
+            for i in range(1, len(parts) + 1):
+                tail = "/".join(parts[-i:])
+                if tail not in self.files_by_suffix:
+                    self.files_by_suffix[tail] = []
+                self.files_by_suffix[tail].append(rel_path)
         self.files[rel_path] = obj
 
@@ -22,6 +22,11 @@ class NetworkTree:
         self.node_lookup = {}
         self.node_lookup_slug = {}
 
+        # indexes on self.tree, kept up to date by add_node() and AddLink()
+        self.node_by_id = {}
+        self.link_keys = set()  # (source, target)
+        self.inbound_links = {}  # node id --> links to that node, in order of insertion
+
         self.node_graph = None
         self.node_graph_lookup = None
 
@@ -72,18 +77,18 @@ class NetworkTree:
         if self.pb.verbose:
             print("Received node", node_obj)
         # Skip if already present
-        for node in self.tree["nodes"]:
-            if node["id"] == node_obj["id"]:
-                node["metadata"] = node_obj["metadata"].copy()
-                if self.pb.verbose:
-                    print("Node already present")
-                return
+        if node_obj["id"] in self.node_by_id:
+            self.node_by_id[node_obj["id"]]["metadata"] = node_obj["metadata"].copy()
+            if self.pb.verbose:
+                print("Node already present")
+            return
 
         # Add node
         self.nid_inc += 1
         node_obj["nid"] = self.nid_inc
 
         self.tree["nodes"].append(node_obj)
+        self.node_by_id[node_obj["id"]] = node_obj
         if self.pb.verbose:
             print("Node added")
 
@@ -91,17 +96,23 @@ class NetworkTree:
         if self.pb.verbose:
             print("Received link", link_obj)
         # Skip if already present
-        for link in self.tree["links"]:
-            if link["source"] == link_obj["source"] and link["target"] == link_obj["target"]:
-                if self.pb.verbose:
-                    print("Link already present")
-                return
+        key = (link_obj["source"], link_obj["target"])
+        if key in self.link_keys:
+            if self.pb.verbose:
+                print("Link already present")
+            return
 
         # Add link
         self.tree["links"].append(link_obj)
+        self.link_keys.add(key)
+        self.inbound_links.setdefault(link_obj["target"], []).append(link_obj)
         if self.pb.verbose:
             print("Link added")
 
+    def get_backlinks(self, node_id):
+        """Returns the links that point to the given node, in order of insertion"""
+        return self.inbound_links.get(node_id, [])
+
     def OutputJson(self):
         """the graph.json"""
         tree = StringifyDateRecurse(self.tree.copy())
@@ -116,8 +127,8 @@ class NetworkTree:
 
     def AddCrosslinks(self):
         for link in self.tree["links"]:
-            src = self.node_lookup[link["source"]]
-            dst = self.node_lookup[link["target"]]
+            src = self.node_by_id[link["source"]]
+            dst = self.node_by_id[link["target"]]
 
             src["links"].append(dst["id"])
             src["outward_links"].append(dst["id"])
@@ -141,13 +152,12 @@ class NetworkTree:
             note_graph.append(di)
             note_lookup[node["id"]] = di
 
+        # links are unique on (source, target), see AddLink(), so no need to deduplicate here
         for link in self.tree["links"]:
             src = note_lookup[link["source"]]
             dst = note_lookup[link["target"]]
-            if src["id"] not in dst["referencedBy"]:
-                dst["referencedBy"].append(src["id"])
-            if dst["id"] not in src["linkTo"]:
-                src["linkTo"].append(dst["id"])
+            dst["referencedBy"].append(src["id"])
+            src["linkTo"].append(dst["id"])
 
         self.node_graph = note_graph
         self.node_graph_lookup = note_lookup
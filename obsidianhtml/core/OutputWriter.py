@@ -0,0 +1,220 @@
+import os
+import json
+import shutil
+import hashlib
+
+from pathlib import Path
+
+"""
+Files in the output folders are written through this class. A file that already exists with the same contents is left untouched (its
+modified time does not change either), so that tools that sync the output folder (rsync, s3 sync) only upload the files that really changed.
+This only has effect when the output folder is kept between runs: with incremental_build, or with clean_existing of the
+prepare_output_folders module disabled.
+
+When write_output_manifest is enabled, obs.html/output_manifest.json is written at the end of the run, with the sha256 hash and size of
+every file in the html output folder. Comparing the manifests of two runs tells which files were added, changed or removed.
+The hashes of the files that were not written in this run are taken from <module_data_folder>/cache/output_hashes.json, as long as their
+size and modified time are unchanged, so that these files don't have to be read again.
+
+For copied files, the size and modified time of the source and of the destination are kept in <module_data_folder>/cache/output_copies.json.
+When these are all unchanged since the previous run, the destination is known to be the same as the source without reading either of them.
+"""
+
+MANIFEST_VERSION = 1
+MANIFEST_REL_PATH = "obs.html/output_manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_hash(path):
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def has_contents(path, data):
+    """Returns whether the file at path exists and contains exactly data"""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def files_are_identical(path_a, path_b):
+    try:
+        if os.path.getsize(path_a) != os.path.getsize(path_b):
+            return False
+        with open(path_a, "rb") as a, open(path_b, "rb") as b:
+            while True:
+                chunk_a = a.read(CHUNK_SIZE)
+                if chunk_a != b.read(CHUNK_SIZE):
+                    return False
+                if not chunk_a:
+                    return True
+    except OSError:
+        return False
+
+
+class OutputWriter:
+    def __init__(self, pb):
+        self.html_folder = Path(pb.paths["html_output_folder"])
+        self.cache_path = Path(pb.module_data_folder).joinpath("cache/output_hashes.json")
+        self.manifest_enabled = pb.gc("write_output_manifest", cached=True)
+
+        # absolute paths (posix) of the files that were written or left untouched in this run
+        self.paths = set()
+
+        # absolute path (posix) --> (size, mtime_ns, sha256) of the files that were written or left untouched in this run
+        # (only kept when the manifest is written)
+        self.hashes = {}
+
+        # absolute path (posix) of the destination --> [source path (posix), source size, source mtime_ns, size, mtime_ns] of the copied files
+        self.copies_path = Path(pb.module_data_folder).joinpath("cache/output_copies.json")
+        self.previous_copies = load_json(self.copies_path, {"files": {}})["files"]
+        self.copies = {}
+
+        self.written = 0
+        self.unchanged = 0
+
+    def write(self, path, contents, encoding="utf-8"):
+        """Writes contents (str or bytes) to path, unless the file already has these contents. Returns whether the file was written."""
+        if isinstance(contents, str):
+            if os.linesep != "\n":
+                # (same as writing in text mode)
+                contents = contents.replace("\n", os.linesep)
+            contents = contents.encode(encoding)
+
+        written = not has_contents(path, contents)
+        if written:
+            with open(path, "wb") as f:
+                f.write(contents)
+
+        self.add(path, written, lambda: hashlib.sha256(contents).hexdigest())
+        return written
+
+    def copy(self, src_path, dst_path):
+        """Copies src_path to dst_path, unless dst_path already has the same contents. Returns whether the file was written."""
+        key = Path(dst_path).as_posix()
+        src_stat = os.stat(src_path)
+        stamp = [Path(src_path).as_posix(), src_stat.st_size, src_stat.st_mtime_ns]
+
+        written = not self.is_unchanged_copy(key, stamp, src_path, dst_path)
+        if written:
+            shutil.copyfile(src_path, dst_path)
+
+        dst_stat = os.stat(dst_path)
+        self.copies[key] = stamp + [dst_stat.st_size, dst_stat.st_mtime_ns]
+        self.add(dst_path, written, lambda: get_file_hash(dst_path))
+        return written
+
+    def is_unchanged_copy(self, key, stamp, src_path, dst_path):
+        try:
+            dst_stat = os.stat(dst_path)
+        except OSError:
+            return False
+        if dst_stat.st_size != stamp[1]:
+            return False
+        # copied from the same source in a previous run, and neither has changed since
+        if self.previous_copies.get(key) == stamp + [dst_stat.st_size, dst_stat.st_mtime_ns]:
+            return True
+        return files_are_identical(src_path, dst_path)
+
+    def replace(self, src_path, dst_path):
+        """Moves a file that was written elsewhere (e.g. by a stream) to dst_path, unless dst_path already has the same contents, in which
+        case src_path is removed. Returns whether dst_path was written."""
+        written = not files_are_identical(src_path, dst_path)
+        if written:
+            os.replace(src_path, dst_path)
+        else:
+            os.unlink(src_path)
+
+        self.add(dst_path, written, lambda: get_file_hash(dst_path))
+        return written
+
+    def add(self, path, written, get_hash):
+        key = Path(path).as_posix()
+        self.paths.add(key)
+        if written:
+            self.written += 1
+        else:
+            self.unchanged += 1
+
+        if self.manifest_enabled:
+            stat = os.stat(path)
+            self.hashes[key] = (stat.st_size, stat.st_mtime_ns, get_hash())
+
+    def remove_unwritten(self, folder, suffixes):
+        """Removes the files in folder (with one of the given suffixes) that have not been written or left untouched in this run, and the
+        folders that are empty afterwards"""
+        # (compare real paths, the files might have been written via a path that is resolved differently)
+        written = {os.path.realpath(x) for x in self.paths}
+        for root, dirs, files in os.walk(os.path.realpath(folder), topdown=False):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(suffixes) and path not in written:
+                    os.unlink(path)
+            if not os.listdir(root):
+                os.rmdir(root)
+
+    def save_copies(self):
+        """Writes the stamps of the copied files to cache/output_copies.json. The stamps of files that were not copied in this run (e.g. because
+        the incremental build found them up to date) are kept as long as the file exists."""
+        copies = {k: v for k, v in self.previous_copies.items() if k not in self.copies and os.path.exists(k)}
+        copies.update(self.copies)
+
+        self.copies_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.copies_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": MANIFEST_VERSION, "files": copies}))
+
+    # MANIFEST
+    # ===============================================================================================
+    def save_manifest(self):
+        """Writes the hash and size of every file in the html output folder to obs.html/output_manifest.json, and prints what changed
+        since the previous manifest"""
+        manifest_path = self.html_folder.joinpath(MANIFEST_REL_PATH)
+        previous = load_json(manifest_path, {"files": {}})
+        cache = load_json(self.cache_path, {"files": {}})["files"]
+
+        files = {}
+        new_cache = {}
+        for root, dirs, names in os.walk(self.html_folder):
+            for name in names:
+                path = Path(root).joinpath(name)
+                rel_path = path.relative_to(self.html_folder).as_posix()
+                if rel_path == MANIFEST_REL_PATH:
+                    continue
+
+                stat = path.stat()
+                record = self.hashes.get(path.as_posix()) or cache.get(rel_path)
+                if record is None or record[0] != stat.st_size or record[1] != stat.st_mtime_ns:
+                    record = (stat.st_size, stat.st_mtime_ns, get_file_hash(path))
+
+                files[rel_path] = {"sha256": record[2], "size": record[0]}
+                new_cache[rel_path] = list(record)
+
+        manifest = {"version": MANIFEST_VERSION, "files": dict(sorted(files.items()))}
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self.write(manifest_path, json.dumps(manifest, indent=1))
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": MANIFEST_VERSION, "files": new_cache}))
+
+        added = [x for x in files if x not in previous["files"]]
+        changed = [x for x in files if x in previous["files"] and previous["files"][x] != files[x]]
+        removed = [x for x in previous["files"] if x not in files]
+        print(f"\t{len(added)} files added, {len(changed)} changed, {len(removed)} removed, {len(files) - len(added) - len(changed)} unchanged")
+
+
+def load_json(path, default):
+    if not Path(path).exists():
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.loads(f.read())
+    if data.get("version") != MANIFEST_VERSION:
+        return default
+    return data
@@ -0,0 +1,89 @@
+import zlib
+
+from pathlib import Path
+
+"""
+Rendered html pages contain named slots for content that can only be compiled once all the pages have been crawled (backlinks, side panes,
+breadcrumbs, etc), see md2html.PAGE_SLOTS. The pages are kept here until the graph is complete, after which every page is finalized and
+written to the output folder exactly once.
+
+Pages are kept in memory for as long as the total size stays within `page_memory_budget` (in MB), after that pages are compressed and
+appended to a spill file under <module_data_folder>/cache/, from which they are read back when they are finalized.
+"""
+
+
+class PageStore:
+    def __init__(self, pb):
+        self.pb = pb
+        self.memory_budget = int(pb.gc("page_memory_budget", cached=True)) * 1024 * 1024
+        self.memory_used = 0
+
+        self.pages = {}  # absolute output path (str) --> {"node_id": str, "html": str | None, "spilled": (offset, length) | None}
+
+        self.spill_path = Path(pb.module_data_folder).joinpath("cache/deferred_pages.bin")
+        self.spill_file = None
+
+    def __contains__(self, dst_path):
+        return str(dst_path) in self.pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def add(self, dst_path, node_id, html):
+        key = str(dst_path)
+        if key in self.pages:
+            self.discard(key)
+
+        # output folders are created right away, so that the folder structure is complete when the dir tree is compiled
+        Path(dst_path).parent.mkdir(parents=True, exist_ok=True)
+
+        page = {"node_id": node_id, "html": html, "spilled": None}
+        if self.memory_used + len(html) > self.memory_budget:
+            page["html"] = None
+            page["spilled"] = self.spill(html)
+        else:
+            self.memory_used += len(html)
+
+        self.pages[key] = page
+
+    def spill(self, html):
+        if self.spill_file is None:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            self.spill_file = open(self.spill_path, "w+b")
+
+        data = zlib.compress(html.encode("utf-8"), 1)
+        self.spill_file.seek(0, 2)
+        offset = self.spill_file.tell()
+        self.spill_file.write(data)
+        return (offset, len(data))
+
+    def get(self, dst_path):
+        page = self.pages[str(dst_path)]
+        if page["html"] is not None:
+            return page["html"]
+
+        offset, length = page["spilled"]
+        self.spill_file.seek(offset)
+        return zlib.decompress(self.spill_file.read(length)).decode("utf-8")
+
+    def get_node_id(self, dst_path):
+        return self.pages[str(dst_path)]["node_id"]
+
+    def discard(self, dst_path):
+        page = self.pages.pop(str(dst_path))
+        if page["html"] is not None:
+            self.memory_used -= len(page["html"])
+
+    def paths(self):
+        return [Path(x) for x in self.pages.keys()]
+
+    def write(self, dst_path, html):
+        """Writes the finalized page to the output folder and drops it from the store."""
+        self.pb.output.write(dst_path, html)
+        self.discard(dst_path)
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+            self.spill_path.unlink()
@@ -3,6 +3,8 @@ from pathlib import Path
 
 from .ConfigManager import Config, find_user_config_yaml_path
 from .FileFinder import FileFinder
+from .FileCopier import FileCopier
+from .Profiler import Profiler
 from ..features.Search import SearchHead
 from ..features.CreateIndexFromDirStructure import CreateIndexFromDirStructure
 
@@ -23,14 +25,25 @@ class PicknickBasket:
     jars = None  # dict with contents to store for later, see it as a cache
     user_config_dict = None  # fill with a dict to circumvent loading input yaml
     module_data_folder = None  # integration with new control flow based on modules
+    incremental = None  # IncrementalBuild object, set when incremental_build is enabled
+    rss_feed = None  # RssFeed object, set when the rss feature is enabled
+    pages = None  # PageStore object, keeps the rendered html pages until they are finalized
+    output = None  # OutputWriter object, all output files are written through this (see core.OutputWriter)
+    documents = None  # DocumentCache object, keeps the parsed notes so that these are read only once
+    compiled_templates = None  # see compiler.Templating.CompileTemplate()
+    static_assets = None  # see compiler.StaticAssets
+    profiler = None  # Profiler object, only records anything when running with --profile <path>
 
     def __init__(self):
         self.tagtree = {"notes": [], "subtags": {}}
         self.jars = {}
+        self.compiled_templates = {}
         # self.network_tree = NetworkTree(self.verbose)
 
         self.search = SearchHead()
         self.FileFinder = FileFinder()
+        self.FileCopier = FileCopier(self)
+        self.profiler = Profiler()
         self.ConfigManager = Config(self)
         self.plugin_settings = {"embedded_note_titles": {}}  # <- does nothing at the moment, should be factored out
 
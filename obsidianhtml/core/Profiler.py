@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+from ..lib import OpenIncludedFile
+
+"""
+This class is used when `obsidianhtml convert` is run with `--profile <path>`. It times every module run, every phase of the conversion
+and the conversion of every note, and records the peak memory use and the amount of bytes read and written.
+
+Phases are nested, e.g. "m2h;render" is the render step of the markdown to html conversion. The conversion of a note is recorded under the
+phase that was running at that time. Notes that are converted in worker processes are timed there, and handed back to the main process
+via drain() and merge().
+
+At the end of the run two files are written:
+- <path>: json report with the totals, every phase and every note (slowest first)
+- <path without suffix>.folded: collapsed stacks (self time in microseconds), which can be read by flamegraph tools
+"""
+
+
+def get_peak_rss_kb(children=False):
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # macos reports bytes, linux kilobytes
+    if sys.platform == "darwin":
+        peak = peak // 1024
+    return peak
+
+
+def get_io_counters():
+    """Returns the amount of bytes read and written by this process so far, or (None, None) when the platform does not report these."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return (int(counters["rchar"]), int(counters["wchar"]))
+    except (OSError, KeyError, ValueError):
+        return (None, None)
+
+
+def get_delta(start, end):
+    if start is None or end is None:
+        return None
+    return end - start
+
+
+class Profiler:
+    def __init__(self, report_path=None):
+        self.enabled = report_path is not None
+        self.report_path = None
+        if self.enabled:
+            self.report_path = Path(report_path).resolve()
+
+        self.start_time = time.perf_counter()
+        self.start_io = get_io_counters()
+
+        self.stack = []
+        self.phases = {}  # stack (tuple) --> {"seconds", "calls", "bytes_read", "bytes_written", "peak_rss_kb"}
+        self.notes = []  # [stack (tuple), note, seconds, pid]
+
+    def phase(self, name):
+        """Context manager that times everything that runs within it as phase `name`, nested under the phase that is currently running."""
+        if not self.enabled:
+            return nullcontext()
+        return self._measure_phase(name)
+
+    def note(self, name):
+        """Context manager that times the conversion of note `name`, under the phase that is currently running."""
+        if not self.enabled:
+            return nullcontext()
+        return self._measure_note(name)
+
+    @contextmanager
+    def _measure_phase(self, name):
+        self.stack.append(name)
+        stack = tuple(self.stack)
+        start_io = get_io_counters()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_time
+            end_io = get_io_counters()
+            self.stack.pop()
+
+            if stack not in self.phases:
+                self.phases[stack] = {"seconds": 0.0, "calls": 0, "bytes_read": None, "bytes_written": None, "peak_rss_kb": None}
+            record = self.phases[stack]
+            record["seconds"] += seconds
+            record["calls"] += 1
+            for i, key in enumerate(("bytes_read", "bytes_written")):
+                delta = get_delta(start_io[i], end_io[i])
+                if delta is not None:
+                    record[key] = (record[key] or 0) + delta
+            record["peak_rss_kb"] = get_peak_rss_kb()
+
+    @contextmanager
+    def _measure_note(self, name):
+        stack = tuple(self.stack)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.notes.append([stack, name, time.perf_counter() - start_time, os.getpid()])
+
+    def drain(self):
+        """Returns the notes that were timed in this process since the previous call, used to hand these back from worker processes."""
+        if not self.enabled:
+            return None
+        pid = os.getpid()
+        notes = [x for x in self.notes if x[3] == pid]
+        self.notes = []
+        return notes
+
+    def merge(self, notes):
+        if notes:
+            self.notes += notes
+
+    # OUTPUT
+    # ===============================================================================================
+    def compile_report(self):
+        end_io = get_io_counters()
+
+        phases = []
+        for stack, record in self.phases.items():
+            phases.append({"name": ";".join(stack), **record})
+
+        notes = []
+        for stack, name, seconds, pid in sorted(self.notes, key=lambda x: x[2], reverse=True):
+            notes.append({"phase": ";".join(stack), "note": name, "seconds": seconds, "pid": pid})
+
+        return {
+            "obsidianhtml_version": OpenIncludedFile("version"),
+            "command": sys.argv,
+            "total_seconds": time.perf_counter() - self.start_time,
+            "peak_rss_kb": get_peak_rss_kb(),
+            "peak_rss_kb_workers": get_peak_rss_kb(children=True),
+            "bytes_read": get_delta(self.start_io[0], end_io[0]),
+            "bytes_written": get_delta(self.start_io[1], end_io[1]),
+            "phases": phases,
+            "notes": notes,
+        }
+
+    def compile_collapsed_stacks(self):
+        """Returns the self time of every phase and note as `frame;frame;frame <microseconds>` lines"""
+
+        def frame(name):
+            # `;` separates frames, the last space separates the value
+            return name.replace(";", ",").replace(" ", "_")
+
+        totals = {}
+        for stack, record in self.phases.items():
+            totals[stack] = totals.get(stack, 0.0) + record["seconds"]
+        for stack, name, seconds, _ in self.notes:
+            note_stack = stack + (name,)
+            totals[note_stack] = totals.get(note_stack, 0.0) + seconds
+
+        # self time is the time that is not spent in a nested phase or note
+        self_times = totals.copy()
+        for stack, seconds in totals.items():
+            if len(stack) > 1 and stack[:-1] in self_times:
+                self_times[stack[:-1]] -= seconds
+
+        lines = []
+        for stack, seconds in self_times.items():
+            microseconds = int(seconds * 1000000)
+            # (notes converted in parallel can add up to more than the wall time of their phase)
+            if microseconds <= 0:
+                continue
+            lines.append(f"{';'.join(frame(x) for x in stack)} {microseconds}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self):
+        if not self.enabled:
+            return
+
+        self.report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.compile_report(), indent=2))
+
+        collapsed_path = self.report_path.with_suffix(".folded")
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            f.write(self.compile_collapsed_stacks())
+
+        print(f"\nProfile written to {self.report_path.as_posix()} (collapsed stacks: {collapsed_path.as_posix()})")
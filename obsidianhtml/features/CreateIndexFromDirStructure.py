@@ -1,6 +1,7 @@
 import os
 import yaml
 import glob
+import fnmatch
 
 import regex as re
 
@@ -9,6 +10,16 @@ from functools import cache
 
 from ..lib import simpleHash, pushd
 from ..compiler.Templating import PopulateTemplate
+from .Precompression import SUFFIXES as PRECOMPRESSION_SUFFIXES
+
+# Markers in the proto index that are set per page in BuildIndex(), with the value that they get when they do not apply to the page
+INDEX_MARKERS = {
+    "css-dir-active": "",
+    "css-file-active": "",
+    "css-folder-note-active": "",
+    "onclick-folder-note": "open_folder_note(this)",
+}
+INDEX_MARKER_RE = re.compile(r"``(css-dir-active|css-file-active|css-folder-note-active|onclick-folder-note)-(.*?)``")
 
 
 class CreateIndexFromDirStructure:
@@ -21,6 +32,14 @@ class CreateIndexFromDirStructure:
 
         self.exclude_subfolders = pb.gc("toggles/features/create_index_from_dir_structure/exclude_subfolders")
         self.exclude_files = pb.gc("toggles/features/create_index_from_dir_structure/exclude_files")
+
+        # pages that have been rendered, but that are not written yet (see PageStore), by folder
+        self.pending_pages = {}
+        if pb.pages is not None:
+            for page_path in pb.pages.paths():
+                page_path = page_path.resolve()
+                self.pending_pages.setdefault(page_path.parent, []).append(page_path)
+
         self.build_exclude_list()
 
         self.tree = self.get_tree(path)
@@ -61,6 +80,13 @@ class CreateIndexFromDirStructure:
         exclude_files = []
         for line in self.exclude_files:
             exclude_files += glob.glob(line, recursive=True)
+
+        # pending pages are not on disk yet, so these are matched separately
+        for pending_paths in self.pending_pages.values():
+            for page_path in pending_paths:
+                rel_path_str = page_path.relative_to(self.root).as_posix()
+                if any(fnmatch.fnmatch(rel_path_str, line) for line in self.exclude_files):
+                    exclude_files.append(rel_path_str)
         self.exclude_files_str = list(set(exclude_files))
 
         # print results
@@ -81,7 +107,17 @@ class CreateIndexFromDirStructure:
     def build_tree_recurse(self, tree):
         verbose = self.verbose
 
-        for path in Path(tree["path"]).resolve().glob("*"):
+        folder_path = Path(tree["path"]).resolve()
+        paths = list(folder_path.glob("*"))
+        on_disk = set(paths)
+        paths += [x for x in self.pending_pages.get(folder_path, []) if x not in on_disk]
+        listed = set(paths)
+
+        for path in paths:
+            # skip the compressed copies of the previous run (see features/Precompression.py) when the output folder is kept between runs
+            if path.suffix in PRECOMPRESSION_SUFFIXES.values() and path.with_suffix("") in listed:
+                continue
+
             # Exclude configured subfolders
             _continue = False
             for folder in self.exclude_subfolders_str:
@@ -182,7 +218,7 @@ class CreateIndexFromDirStructure:
             name = f"{settings['naming']}.html"
 
         abs_path = note_folder_abs_path.joinpath(name)
-        return (abs_path.exists(), abs_path)
+        return (abs_path.exists() or abs_path in self.pending_pages.get(abs_path.parent, []), abs_path)
 
     def check_is_folder_note(self, note_abs_path):
         settings = self.pb.gc("toggles/features/folder_notes", cached=True)
@@ -215,9 +251,13 @@ class CreateIndexFromDirStructure:
         return f"{self.html_url_prefix}/{rel_path}"
 
     def BuildIndex(self, current_page="/"):
-        # Get basic html that we will then edit to make it applicable for the current page.
-        proto = self.BuildProtoIndex("/")
+        # Get the basic html, split up into segments, of which only the markers that apply to the current page need to be set.
+        segments, markers = self.BuildProtoIndexSegments()
+        segments = segments.copy()
 
+        def activate(marker, value, active_value):
+            for i in markers.get((marker, value), []):
+                segments[i] = active_value
 
         # folder of the current page
         dir_path = self.get_dir(current_page)
@@ -225,40 +265,38 @@ class CreateIndexFromDirStructure:
         # -- set current folders to be opened
         dirs = dir_path.split("/")
         while dirs and dirs[-1]:
-            cdp = "/".join(dirs)
+            activate("css-dir-active", "/".join(dirs), "active")
             dirs.pop()
-            dir_css_active = f"``css-dir-active-{cdp}``"
-            proto = proto.replace(dir_css_active, "active")
-
-        # remove unused tags
-        safe_str = r"``css-dir-active-.*?``"
-        proto = re.sub(safe_str, "", proto)
 
         # -- set active file
-        file_css_active = f"``css-file-active-{current_page}``"
-        proto = proto.replace(file_css_active, "active current_page_dirtree")
-
-        safe_str = r"``css-file-active-.*?``"
-        proto = re.sub(safe_str, "", proto)
+        activate("css-file-active", current_page, "active current_page_dirtree")
 
         # -- set folder-note-active
-        folder_note_active = f"``css-folder-note-active-{current_page}``"
-        proto = proto.replace(folder_note_active, "active current_page_dirtree")
-
-        safe_str = r"``css-folder-note-active-.*?``"
-        proto = re.sub(safe_str, "", proto)
-
-
+        activate("css-folder-note-active", current_page, "active current_page_dirtree")
 
         # -- set folder-note-onclick active
-        onclick_active = f"``onclick-folder-note-{current_page}``"
-        proto = proto.replace(onclick_active, "toggle_dir(this.id)")
+        activate("onclick-folder-note", current_page, "toggle_dir(this.id)")
 
-        # -- set folder-note-onclick inactive
-        safe_str = r"``onclick-folder-note-.*?``"
-        proto = re.sub(safe_str, "open_folder_note(this)", proto)
+        return "".join(segments)
 
-        return proto
+    @cache
+    def BuildProtoIndexSegments(self):
+        """
+        Splits the proto index up at the markers that BuildIndex() sets per page. Returns the segments, with every marker filled in with its
+        inactive value, and a lookup of (marker, value) --> the indices of the segments that hold that marker.
+        """
+        parts = INDEX_MARKER_RE.split(self.BuildProtoIndex("/"))
+
+        segments = []
+        markers = {}
+        for i in range(0, len(parts), 3):
+            segments.append(parts[i])
+            if i + 1 < len(parts):
+                marker, value = parts[i + 1], parts[i + 2]
+                markers.setdefault((marker, value), []).append(len(segments))
+                segments.append(INDEX_MARKERS[marker])
+
+        return (segments, markers)
 
     @cache
     def BuildProtoIndex(self, current_page="/"):
@@ -401,5 +439,4 @@ class CreateIndexFromDirStructure:
             .replace("{page_depth}", str(page_depth))
         )
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(html)
+        pb.output.write(output_path, html)
@@ -259,14 +259,14 @@ def CreateIndexFromTags(pb):
 
     # write content to markdown file
     index_dst_path.parent.mkdir(exist_ok=True)
-    with open(index_dst_path, "w", encoding="utf-8") as f:
-        f.write(md_content)
+    pb.output.write(index_dst_path, md_content)
+    pb.documents.store(index_dst_path, md_content)
 
     # add file to file tree
     fo_index_dst_path = FileObject(pb)
     fo_index_dst_path.init_note_path(index_dst_path)
     fo_index_dst_path.init_markdown_path()
-    pb.index.files[rel_path] = fo_index_dst_path
+    pb.index.set_file_object(rel_path, fo_index_dst_path)
 
     # [17] Build graph node/links
     if pb.gc("toggles/features/create_index_from_tags/add_links_in_graph_tree", cached=True):
@@ -1,8 +1,8 @@
-import os
 import sys
 import json
 import gzip
 import shutil
+import hashlib
 
 from pathlib import Path
 
@@ -13,9 +13,12 @@ from whoosh import fields
 from ..lib import print_global_help_and_exit, get_obshtml_appdir_folder_path
 
 
-def InitWhoosh(index_dir):
-    schema = fields.Schema(
-        id=fields.ID(stored=True),
+SEARCH_FIELDS = ["content", "title", "path", "file", "tags", "tags_keyword"]
+
+
+def GetSchema():
+    return fields.Schema(
+        key=fields.ID(stored=True, unique=True),
         path=fields.TEXT(stored=True),
         file=fields.TEXT(stored=True),
         title=fields.TEXT(stored=True),
@@ -24,21 +27,41 @@ def InitWhoosh(index_dir):
         tags_keyword=fields.KEYWORD(stored=True),
     )
 
-    if not os.path.exists(index_dir):
-        Path(index_dir).resolve().mkdir(parents=True, exist_ok=True)
-
-    ix = index.create_in(index_dir, schema)
-    ix = index.open_dir(index_dir)
-    writer = ix.writer()
-
-    return (ix, schema, writer)
 
-
-def LoadSearchDataIntoWhoosh(writer, search_data):
-    # add data to whoosh
-    for i, doc in enumerate(search_data):
+def InitWhoosh(index_dir):
+    """Opens the index in index_dir, or creates it when it does not exist yet (or has a different schema).
+    Returns the index, and the hashes of the documents in it (see LoadSearchDataIntoWhoosh)."""
+    schema = GetSchema()
+    index_dir = Path(index_dir).resolve()
+    hashes_path = index_dir.joinpath("document_hashes.json")
+
+    if index.exists_in(index_dir.as_posix()) and hashes_path.exists():
+        try:
+            ix = index.open_dir(index_dir.as_posix())
+            with open(hashes_path, "r", encoding="utf-8") as f:
+                hashes = json.loads(f.read())
+            if sorted(ix.schema.names()) == sorted(schema.names()):
+                return (ix, hashes)
+            ix.close()
+        except (OSError, ValueError, index.IndexError):
+            pass
+
+    if index_dir.exists():
+        shutil.rmtree(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    ix = index.create_in(index_dir.as_posix(), schema)
+
+    return (ix, {})
+
+
+def LoadSearchDataIntoWhoosh(ix, hashes, search_data, hashes_path):
+    """Updates the index to contain exactly the documents in search_data. Documents are identified by their path, and only (re)written
+    when their hash differs from the one in hashes. Returns the new hashes, which are also written to hashes_path."""
+    new_hashes = {}
+    changed = []
+    for doc in search_data:
         subset = {
-            "id": str(i),
+            "key": doc["path"],
             "path": doc["path"],
             "file": doc["file"],
             "title": doc["title"],
@@ -46,10 +69,27 @@ def LoadSearchDataIntoWhoosh(writer, search_data):
             "tags": doc["tags"],
             "tags_keyword": doc["tags"],
         }
-        writer.add_document(**subset)
-    writer.commit()
+        doc_hash = hashlib.sha1(json.dumps(subset, sort_keys=True).encode("utf-8")).hexdigest()
+        new_hashes[subset["key"]] = doc_hash
+        if hashes.get(subset["key"]) != doc_hash:
+            changed.append(subset)
+
+    removed = [key for key in hashes.keys() if key not in new_hashes]
+
+    if len(changed) > 0 or len(removed) > 0:
+        writer = ix.writer()
+        for key in removed:
+            writer.delete_by_term("key", key)
+        for subset in changed:
+            writer.update_document(**subset)
+        writer.commit()
+
+    with open(hashes_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(new_hashes))
 
-    return search_data
+    print(f"\t\tEmbedded search index: {len(changed)} documents written, {len(removed)} removed, {len(new_hashes) - len(changed)} unchanged.")
+
+    return new_hashes
 
 
 def GetSearchData(path_str):
@@ -128,9 +168,14 @@ def PostProcessParse(qp, obj, normalize=True, debug=False):
 
 
 class EmbeddedSearch:
-    def __init__(self, json_data=None, search_data_path=None):
-        index_dir = "/tmp/obs/index"
-        search_data = None
+    """
+    Whoosh index of the search data, used to fill in the query blocks. The index is kept in index_dir, and updated on every run with only the
+    documents that changed. Use one instance per run: the query parser and searcher are shared, and the results of every query are cached.
+    """
+
+    def __init__(self, json_data=None, search_data_path=None, search_data=None, index_dir=None):
+        if index_dir is None:
+            index_dir = get_obshtml_appdir_folder_path().joinpath("embedded_search_index")
 
         if search_data_path is not None:
             search_data_unzipped_path_str = search_data_path.resolve().as_posix()
@@ -138,53 +183,67 @@ class EmbeddedSearch:
         if json_data is not None:
             search_data = json.loads(json_data)
 
-        # create setup whoosh search
-        self.ix, self.schema, self.writer = InitWhoosh(index_dir)
+        # open (or create) the whoosh index, and bring it up to date
+        self.ix, hashes = InitWhoosh(index_dir)
+        LoadSearchDataIntoWhoosh(self.ix, hashes, search_data, Path(index_dir).resolve().joinpath("document_hashes.json"))
+
+        # the id of a document is its position in the search data
+        self.ids = {doc["path"]: str(i) for i, doc in enumerate(search_data)}
 
-        # load docs
-        LoadSearchDataIntoWhoosh(self.writer, search_data)
+        self.qp = MultifieldParser(SEARCH_FIELDS, schema=self.ix.schema, group=OrGroup)
+        self.searcher = None
+        self.results = {}
+
+    def close(self):
+        if self.searcher is not None:
+            self.searcher.close()
+            self.searcher = None
+        self.ix.close()
 
     def search(self, user_query):
+        if user_query in self.results:
+            return self.results[user_query]
+
         output = []
 
         # convert user query to a format that we can use
         clean_query = ConvertObsidianQueryToWhooshQuery(user_query)
 
-        # create query parser
-        fields = ["content", "title", "path", "file", "tags", "tags_keyword"]
-        qp = MultifieldParser(fields, schema=self.ix.schema, group=OrGroup)
-
         # parse query into query object
-        qo = RemoveKeywordPhrasesFromCleanQuery(qp, clean_query)
+        qo = RemoveKeywordPhrasesFromCleanQuery(self.qp, clean_query)
 
         if qo is None:
             # parse function expectedly failed, don't return any search results
-            return []
-
-        with self.ix.searcher() as searcher:
-            results = searcher.search(qo, limit=20)
-            print("-" * 35, len(results), "-" * 35)
-
-            for doc in results:
-                output.append(
-                    {
-                        "id": doc["id"],
-                        "title": doc["title"],
-                        "path": doc["path"],
-                        "file": doc["file"],
-                        "content": doc["content"],
-                        "tags": doc["tags"],
-                        "matches": {
-                            "content": [x for x in doc.highlights("content", top=5).split("...") if x != ""],
-                            "tags": SplitTags(doc.highlights("tags", top=10)),
-                            "tags_keyword": SplitTags(doc.highlights("tags_keyword", top=10)),
-                            "path": doc.highlights("path"),
-                        },
-                    }
-                )
-
+            self.results[user_query] = output
             return output
 
+        if self.searcher is None:
+            self.searcher = self.ix.searcher()
+
+        results = self.searcher.search(qo, limit=20)
+        print("-" * 35, len(results), "-" * 35)
+
+        for doc in results:
+            output.append(
+                {
+                    "id": self.ids[doc["key"]],
+                    "title": doc["title"],
+                    "path": doc["path"],
+                    "file": doc["file"],
+                    "content": doc["content"],
+                    "tags": doc["tags"],
+                    "matches": {
+                        "content": [x for x in doc.highlights("content", top=5).split("...") if x != ""],
+                        "tags": SplitTags(doc.highlights("tags", top=10)),
+                        "tags_keyword": SplitTags(doc.highlights("tags_keyword", top=10)),
+                        "path": doc.highlights("path"),
+                    },
+                }
+            )
+
+        self.results[user_query] = output
+        return output
+
 
 def SplitTags(tags_string):
     # has nothing to do with obsidian tags, this means to split the html tags.
@@ -272,7 +331,7 @@ def CliEmbeddedSearch():
         print_global_help_and_exit(1)
 
     # Init search
-    esearch = EmbeddedSearch(search_data_path)
+    esearch = EmbeddedSearch(search_data_path=search_data_path)
 
     # Search
     print(f"Query: '{query_string}'")
@@ -0,0 +1,161 @@
+import os
+import gzip
+import json
+import hashlib
+
+from pathlib import Path
+
+from ..lib import get_job_count, get_forked_process_pool
+from ..core.OutputWriter import MANIFEST_REL_PATH
+
+try:
+    import brotli
+except ImportError:  # optional, only the .gz files are written without it
+    brotli = None
+
+"""
+Writes compressed copies of the text files in the html output folder next to the originals (page.html --> page.html.gz, page.html.br),
+so that static hosts (e.g. nginx with gzip_static) and `obsidianhtml serve` can serve these without compressing on the fly.
+The .br files are only written when the brotli package is installed.
+
+The content hash of every file is kept in <module_data_folder>/cache/precompression.json. Files that are untouched since the previous run
+are skipped without being read, files that have been written again with the same content are not compressed again. Compressed copies of
+files that are no longer in the output are removed.
+"""
+
+MANIFEST_VERSION = 1
+
+# encoding --> suffix of the compressed file
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+MIN_FILES_PER_WORKER = 20
+
+
+def get_manifest_path(module_data_folder):
+    return Path(module_data_folder).joinpath("cache/precompression.json")
+
+
+class Precompression:
+    def __init__(self, pb):
+        self.pb = pb
+        self.html_folder = Path(pb.paths["html_output_folder"])
+        self.manifest_path = get_manifest_path(pb.module_data_folder)
+
+        self.extensions = tuple(x.lower() for x in pb.gc("toggles/features/precompression/extensions"))
+        self.levels = {
+            "gzip": int(pb.gc("toggles/features/precompression/gzip_level")),
+            "br": int(pb.gc("toggles/features/precompression/brotli_quality")),
+        }
+
+        self.encodings = []
+        for encoding in pb.gc("toggles/features/precompression/encodings"):
+            if encoding not in SUFFIXES:
+                raise Exception(f"Unknown encoding of {encoding} in toggles/features/precompression/encodings, choose from {list(SUFFIXES.keys())}")
+            if encoding == "br" and brotli is None:
+                print("\tThe brotli package is not installed, skipping .br files. (pip install brotli)")
+                continue
+            self.encodings.append(encoding)
+
+    def run(self):
+        previous = self.load_manifest()
+        current = {"version": MANIFEST_VERSION, "encodings": self.encodings, "levels": self.levels, "files": {}}
+        suffixes = [SUFFIXES[x] for x in self.encodings]
+
+        # all files are compressed again when the compression levels change
+        records = previous["files"] if previous.get("levels") == self.levels else {}
+
+        # files of which the size and modified time have changed since the previous run (or that are new)
+        queue = []
+        for path in self.list_files():
+            rel_path = path.relative_to(self.html_folder).as_posix()
+            stat = path.stat()
+            stamp = [stat.st_size, stat.st_mtime_ns]
+
+            record = records.get(rel_path)
+            if record is not None and record["stamp"] == stamp and all(os.path.exists(f"{path}{x}") for x in suffixes):
+                current["files"][rel_path] = record
+                continue
+
+            queue.append((rel_path, stamp, (path.as_posix(), self.encodings, self.levels, record["hash"] if record else None)))
+
+        compressed = 0
+        for (rel_path, stamp, _), (content_hash, written) in zip(queue, self.compress_all([x[2] for x in queue])):
+            current["files"][rel_path] = {"stamp": stamp, "hash": content_hash}
+            compressed += written
+
+        self.remove_stale_files(previous, current)
+        self.save_manifest(current)
+
+        print(f"\t{compressed} files compressed, {len(current['files']) - compressed} unchanged ({', '.join(self.encodings)})")
+
+    def list_files(self):
+        manifest_path = self.html_folder.joinpath(MANIFEST_REL_PATH)
+        for root, dirs, files in os.walk(self.html_folder):
+            for name in files:
+                path = Path(root).joinpath(name)
+                # (the output manifest is written after this stage, and lists the compressed files)
+                if name.lower().endswith(self.extensions) and path != manifest_path:
+                    yield path
+
+    def compress_all(self, jobs):
+        workers = min(get_job_count(self.pb), len(jobs) // MIN_FILES_PER_WORKER)
+        if workers > 1:
+            executor = get_forked_process_pool(workers)
+            if executor is not None:
+                with executor:
+                    return list(executor.map(compress_file, *zip(*jobs), chunksize=max(1, len(jobs) // (workers * 4))))
+        return [compress_file(*x) for x in jobs]
+
+    def remove_stale_files(self, previous, current):
+        """Removes the compressed files of files that are no longer in the output, or of encodings that are no longer configured"""
+        for rel_path in previous["files"]:
+            for encoding in previous["encodings"]:
+                if rel_path in current["files"] and encoding in current["encodings"]:
+                    continue
+                path = self.html_folder.joinpath(rel_path + SUFFIXES[encoding])
+                if path.exists():
+                    path.unlink()
+
+    def load_manifest(self):
+        empty = {"version": MANIFEST_VERSION, "encodings": [], "files": {}}
+        if not self.manifest_path.exists():
+            return empty
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.loads(f.read())
+        if manifest.get("version") != MANIFEST_VERSION:
+            return empty
+        return manifest
+
+    def save_manifest(self, manifest):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(manifest))
+
+
+def compress_file(path, encodings, levels, previous_hash):
+    """Writes the compressed files of the given file, unless its content is the same as in the previous run.
+    Returns (content hash, whether the files were written). Runs in the worker processes."""
+    with open(path, "rb") as f:
+        data = f.read()
+    content_hash = hashlib.sha1(data).hexdigest()
+
+    targets = [path + SUFFIXES[x] for x in encodings]
+    if content_hash == previous_hash and all(os.path.exists(x) for x in targets):
+        # the file was written again, with the same content. Update the modified time of the compressed files, so that they are not
+        # mistaken for outdated versions (obsidianhtml serve only uses compressed files that are at least as new as the original).
+        for target in targets:
+            os.utime(target)
+        return content_hash, False
+
+    for encoding, target in zip(encodings, targets):
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=levels["br"])
+        else:
+            compressed = gzip.compress(data, compresslevel=levels["gzip"], mtime=0)
+
+        # (write to a temporary file first, so that a server never picks up a half written file)
+        with open(target + ".tmp", "wb") as f:
+            f.write(compressed)
+        os.replace(target + ".tmp", target)
+
+    return content_hash, True
@@ -1,12 +1,23 @@
+import os
 import time
 import json
 
+from pathlib import Path
 from datetime import datetime
 from bs4 import BeautifulSoup
 from html import escape
 
 from ..lib import OpenIncludedFile
 
+"""
+The feed items are compiled from the html pages in the output folder. For the notes, the values that the selectors need (first paragraphs,
+first header of each level) are collected while the markdown is converted (see markdown_extensions/PageValuesExtension.py and capture()),
+only the other html files are read and parsed again when the feed is compiled.
+
+When building incrementally, the captured values are kept in <module_data_folder>/cache/rss_pages.json, for the pages that are not
+rendered again.
+"""
+
 
 def ConvertDateToRssFormat(datetime_object):
     return datetime_object.strftime("%a, %d %b %Y %H:%M:%S ") + time.tzname[0]
@@ -23,12 +34,14 @@ class RssFeed:
     feed_path = None
     host = None
 
-    graph = None
-    node_lut = None
-
     excluded_folders = None
     excluded_files = None
     include_subfolders = None
+    included_folders = None
+
+    number_of_paragraphs = None
+    header_levels = None
+    pages = None
 
     item_match_keys_selector = None
     item_exclude_keys_selector = None
@@ -56,33 +69,21 @@ class RssFeed:
             host += "/"
         self.host = host
 
-        # get graph.json data and convert to python dict
-        graph_path = self.html_folder.joinpath("obs.html/data/graph.json").resolve()
-        with open(graph_path, "r", encoding="utf-8") as f:
-            self.graph = json.loads(f.read())
-
-        # Create lookup table to quickly get node information
-        node_lut = {}
-        for node in self.graph["nodes"]:
-            node_lut[node["id"]] = node
-        self.node_lut = node_lut
-
-        # define excluded folders
+        # define excluded folders, as prefixes of the absolute (posix) paths
         excluded_folders = []
         for ef in pb.gc("toggles/features/rss/items/selector/exclude_subfolders"):
-            if ef[-1] != "/":
-                ef += "/"
-            excluded_folders.append(self.html_folder.joinpath(ef).resolve())
-        self.excluded_folders = excluded_folders
+            excluded_folders.append(self.html_folder.joinpath(ef).resolve().as_posix() + "/")
+        self.excluded_folders = tuple(excluded_folders)
 
         # define excluded files
-        excluded_files = []
+        excluded_files = set()
         for ef in pb.gc("toggles/features/rss/items/selector/exclude_files"):
-            excluded_files.append(self.html_folder.joinpath(ef).resolve())
+            excluded_files.add(self.html_folder.joinpath(ef).resolve().as_posix())
         self.excluded_files = excluded_files
 
         # define include_subfolders
         self.include_subfolders = pb.gc("toggles/features/rss/items/selector/include_subfolders")
+        self.included_folders = tuple(self.html_folder.joinpath(x).resolve().as_posix() + "/" for x in self.include_subfolders)
 
         # define item selectors
         self.item_match_keys_selector = pb.gc("toggles/features/rss/items/selector/match_keys")
@@ -91,6 +92,62 @@ class RssFeed:
         self.title_selectors = pb.gc("toggles/features/rss/items/title/selectors")
         self.publish_date_selectors = pb.gc("toggles/features/rss/items/publish_date/selectors")
 
+        # determine which values need to be captured from the pages
+        self.number_of_paragraphs, self.header_levels = get_page_values_needed(pb)
+
+        # rel path --> {"node_id", "paragraphs", "headers"}
+        self.pages = {}
+
+    def is_excluded(self, path_str):
+        return path_str.startswith(self.excluded_folders) or path_str in self.excluded_files
+
+    def capture(self, dst_path, rel_dst_path, node_id, page_values):
+        """Keeps the values that the selectors need of a rendered note page, as collected by the PageValuesExtension."""
+        path_str = dst_path.as_posix()
+        if self.is_excluded(path_str):
+            return
+        if len(self.included_folders) > 0 and not path_str.startswith(self.included_folders):
+            return
+
+        self.pages[rel_dst_path.as_posix()] = {"node_id": node_id, **page_values}
+
+    def load_pages_of_previous_run(self):
+        """When building incrementally, adds the captured values of the pages that have not been rendered again in this run."""
+        cache_path = Path(self.pb.module_data_folder).joinpath("cache/rss_pages.json")
+        pages_of_run = self.pb.incremental.current["pages"]
+
+        if cache_path.exists():
+            with open(cache_path, "r", encoding="utf-8") as f:
+                previous = json.loads(f.read())
+            if previous["selectors"] == [self.number_of_paragraphs, sorted(self.header_levels)]:
+                for rel_path_str, page in previous["pages"].items():
+                    if rel_path_str not in self.pages and rel_path_str in pages_of_run:
+                        self.pages[rel_path_str] = page
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"selectors": [self.number_of_paragraphs, sorted(self.header_levels)], "pages": self.pages}))
+
+    def read_page(self, path):
+        """Fallback for html files that are not captured, e.g. html files in the vault that are copied to the output"""
+        with open(path, "r", encoding="utf-8") as f:
+            soup = BeautifulSoup(f.read(), "html5lib")
+
+        node_el = soup.find("meta", attrs={"name": "node_id"})
+        if node_el is None:
+            raise Exception(
+                'RSS Feed: Meta tag with node_id was not found. If you are using a custom template, make sure that <meta name="node_id" content="{node_id}"> is present in the html header to use this feature.'
+            )
+
+        paragraphs = [x.text for x in soup.body.find_all("p", limit=self.number_of_paragraphs)] if self.number_of_paragraphs > 0 else []
+        headers = {}
+        for level in self.header_levels:
+            header = soup.body.find("h" + level)
+            if header is not None:
+                headers[level] = header.text
+
+        return {"node_id": node_el["content"], "paragraphs": paragraphs, "headers": headers}
+
     def Compile(self):
         # Setup
         # ----------------------------------------------------------------------
@@ -101,6 +158,9 @@ class RssFeed:
         # keep track of most recent item
         most_recent_publish_date = datetime.min
 
+        if self.pb.incremental is not None:
+            self.load_pages_of_previous_run()
+
         # add items
         items = ""
 
@@ -130,49 +190,22 @@ class RssFeed:
             rss_channel = rss_channel.replace("{" + key + "}", value)
 
         # Write to output
-        with open(self.feed_path, "w", encoding="utf-8") as f:
-            f.write(rss_channel)
+        self.pb.output.write(self.feed_path, rss_channel)
 
     def get_items(self, entry_folder, most_recent_publish_date):
         pb = self.pb
         items = ""
-        for path in entry_folder.rglob("*"):
-            # don't handle dirs
-            if path.is_dir():
-                continue
-
-            # don't handle anything in excluded folders
-            # don't handle excluded files
-            excluded = False
-            for ef in self.excluded_folders:
-                if path.is_relative_to(ef):
-                    excluded = True
-                    break
-            for ef in self.excluded_files:
-                if path == ef:
-                    excluded = True
-                    break
-            if excluded:
-                continue
-
-            # only handle files that end in .html
-            if path.as_posix()[-5:-1] != ".htm":
-                continue
-
-            # get html
-            with open(path, "r", encoding="utf-8") as f:
-                soup = BeautifulSoup(f.read(), "html5lib")
+        for path in self.walk_html_files(entry_folder):
+            rel_path_str = path.relative_to(self.html_folder).as_posix()
+            page = self.pages.get(rel_path_str)
+            if page is None:
+                page = self.read_page(path)
 
             # get metadata
-            node_el = soup.find("meta", attrs={"name": "node_id"})
-            if node_el is None:
-                raise Exception(
-                    'RSS Feed: Meta tag with node_id was not found. If you are using a custom template, make sure that <meta name="node_id" content="{node_id}"> is present in the html header to use this feature.'
-                )
-            node_id = node_el["content"]
+            node_id = page["node_id"]
             metadata = None
             if node_id != "none":
-                metadata = self.node_lut[node_id]["metadata"]
+                metadata = self.pb.index.network_tree.node_lookup[node_id]["metadata"]
 
             # exclude: match note on key
             selector = self.item_exclude_keys_selector
@@ -205,12 +238,12 @@ class RssFeed:
                 raise Exception(f"RSS Feed: get_items(): Selector function {selector[0]} not implemented for note selection.")
 
             # compile description
-            description = self.select_value(metadata, soup, path, self.description_selectors)
+            description = self.select_value(metadata, page, path, self.description_selectors)
             if not description:
                 print(f"RSS Feed: warning: no description found for note {path}")
 
             # get title
-            title = self.select_value(metadata, soup, path, self.title_selectors)
+            title = self.select_value(metadata, page, path, self.title_selectors)
             if not title:
                 print(f"RSS Feed: warning: no title found for note {path}")
 
@@ -225,7 +258,7 @@ class RssFeed:
                 publish_date_str = publish_date_default_value
 
             # get publish date
-            publish_date = self.select_value(metadata, soup, path, self.publish_date_selectors)
+            publish_date = self.select_value(metadata, page, path, self.publish_date_selectors)
             if not publish_date or publish_date == "":
                 print(f"RSS Feed: warning: no publish_date found for note {path}")
             else:
@@ -269,17 +302,34 @@ class RssFeed:
 
         return [items, most_recent_publish_date]
 
-    def select_value(self, metadata, soup, path, selector_list):
+    def walk_html_files(self, entry_folder):
+        """Yields the html files in entry_folder that are not excluded (in the same order as entry_folder.rglob("*") would)"""
+        for dir_path, dir_names, file_names in os.walk(entry_folder):
+            dir_path_str = Path(dir_path).as_posix()
+            if (dir_path_str + "/").startswith(self.excluded_folders):
+                dir_names.clear()
+                continue
+
+            for file_name in file_names:
+                # only handle files that end in .html
+                if file_name[-5:-1] != ".htm":
+                    continue
+                path_str = dir_path_str + "/" + file_name
+                if path_str in self.excluded_files:
+                    continue
+                yield Path(path_str)
+
+    def select_value(self, metadata, page, path, selector_list):
         value = ""
 
         for selector in selector_list:
             selector_function = selector[0]
 
             if selector_function == "first-paragraphs":
-                value = selector_first_paragraphs(soup, number_of_paragraphs=selector[1], delimiter=selector[2])
+                value = selector_first_paragraphs(page, number_of_paragraphs=selector[1], delimiter=selector[2])
 
             elif selector_function == "first-header":
-                value = selector_first_header(soup, header_level=selector[1])
+                value = selector_first_header(page, header_level=selector[1])
 
             elif selector[0] == "yaml" or selector[0] == "yaml_strip":
                 selector_key = selector[1]
@@ -306,6 +356,19 @@ class RssFeed:
         return ""
 
 
+def get_page_values_needed(pb):
+    """Returns the number of paragraphs and the header levels (as strings) that the selectors of the feed read from the pages"""
+    number_of_paragraphs = 0
+    header_levels = set()
+    for key in ("description", "title", "publish_date"):
+        for selector in pb.gc(f"toggles/features/rss/items/{key}/selectors"):
+            if selector[0] == "first-paragraphs":
+                number_of_paragraphs = max(number_of_paragraphs, selector[1])
+            elif selector[0] == "first-header":
+                header_levels.add(str(selector[1]))
+    return number_of_paragraphs, header_levels
+
+
 def yaml_selector(metadata, key, list_item_prefixes=None, strip_prefix=False):
     """searches the metadata for the key, and returns the value
     + if the key is not found in the metadata, an empty string is returned
@@ -355,22 +418,16 @@ def yaml_selector(metadata, key, list_item_prefixes=None, strip_prefix=False):
     return ""
 
 
-def selector_first_paragraphs(soup, number_of_paragraphs, delimiter):
+def selector_first_paragraphs(page, number_of_paragraphs, delimiter):
     value = ""
-    paragraphs = soup.body.find_all("p")
-    len_paragraphs = len(paragraphs)
-    for i in range(number_of_paragraphs):
-        if i < len_paragraphs:
-            value += paragraphs[i].text + str(delimiter)
+    for paragraph in page["paragraphs"][:number_of_paragraphs]:
+        value += paragraph + str(delimiter)
 
     return value
 
 
-def selector_first_header(soup, header_level):
-    header = soup.body.find("h" + str(header_level))
-    if header is None:
-        return ""
-    return header.text
+def selector_first_header(page, header_level):
+    return page["headers"].get(str(header_level), "")
 
 
 def selector_path(path, args):
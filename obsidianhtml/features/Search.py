@@ -1,10 +1,91 @@
+import io
 import json
+import gzip
+import hashlib
 import re
+import regex
+
+# Same split as the latin:default encoder of FlexSearch, which search.js used to build its index with
+# (should be the same as TERM_SEPARATOR in search.js, see ci/unit_tests/tests_features/search_tokenizer.py)
+TERM_SEPARATOR_RE = regex.compile(r"[\p{Z}\p{S}\p{P}\p{C}]+")
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_INDEX_FIELDS = ("title", "content")
 
 
 class SearchHead:
+    """
+    Writes the search data (search.json.gzip) while the pages are added: every entry is json encoded and written to the gzip stream
+    right away, so that the contents of the notes are not kept in memory. The resulting json is the list of all the entries.
+
+    The stream is written next to path, and only moved in place when its contents differ from the existing file (see core/OutputWriter.py).
+    The gzip header does not contain a timestamp, so that the same search data always results in the same file.
+    """
+
     def __init__(self):
-        self.data = []
+        self.path = None
+        self.output = None
+        self.raw_file = None
+        self.file = None
+        self.count = 0
+        self.hash = hashlib.sha1()
+        self.added_files = set()
+        self.index = None
+
+    def open(self, path, output, index_path=None):
+        """Starts the gzip stream for path, should be called before any pages are added.
+        When index_path is given, the search index (see SearchIndex) is built from the same entries and written there on close()."""
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.output = output
+        self.raw_file = open(self.get_temp_path(), "wb")
+        self.file = io.TextIOWrapper(gzip.GzipFile(filename="", mode="wb", compresslevel=5, fileobj=self.raw_file, mtime=0), encoding="utf-8")
+        self.count = 0
+        self.hash = hashlib.sha1()
+        self.added_files = set()
+        self.index = None
+        if index_path is not None:
+            self.index = SearchIndex(index_path, output)
+        self.write("[")
+
+    def get_temp_path(self):
+        return self.path.with_name(self.path.name + ".tmp")
+
+    def write(self, text):
+        self.file.write(text)
+        self.hash.update(text.encode("utf-8"))
+
+    def add(self, p):
+        # (same separator as json.dumps uses for lists)
+        if self.count > 0:
+            self.write(", ")
+        self.write(json.dumps(p))
+        if self.index is not None:
+            self.index.add(self.count, p)
+        self.count += 1
+
+    def close(self):
+        """Ends the json list and closes the gzip stream. Returns the hash of the search json, used to check whether cached search data is stale."""
+        if self.file is None:
+            return self.hash.hexdigest()
+        self.write("]")
+        self.file.close()
+        self.file = None
+        self.raw_file.close()
+        self.raw_file = None
+        self.output.replace(self.get_temp_path(), self.path)
+
+        # the browser caches the index together with the search data, so it is part of the hash as well
+        if self.index is not None:
+            self.hash.update(self.index.write().encode("utf-8"))
+            self.index = None
+
+        return self.hash.hexdigest()
+
+    def load(self):
+        """Reads the search data back in, should be called after close()"""
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            return json.load(f)
 
     def AddPage(self, url, rtr_url, filename, title, content, metadata):
         p = {
@@ -17,7 +98,7 @@ class SearchHead:
             "content": SanatizeText(content),
             "tags": GetTags(metadata),
         }
-        self.data.append(p)
+        self.add(p)
 
     def AddFile(self, gc, fo):
         """Used to be able to find files as well as notes"""
@@ -36,13 +117,59 @@ class SearchHead:
             "content": filename,
             "tags": filename,
         }
-        if p not in self.data:
-            self.data.append(p)
-
-    def OutputJson(self):
-        """the search.json"""
-        #return json.dumps(self.data, ensure_ascii=False).encode('utf8')
-        return json.dumps(self.data)
+        key = tuple(p.values())
+        if key not in self.added_files:
+            self.added_files.add(key)
+            self.add(p)
+
+
+class SearchIndex:
+    """
+    Inverted index of the search data, built while the entries are added, so that the browser only has to load it instead of indexing
+    all the notes on every page load. The json that is written (gzipped) to path looks like:
+
+        {"version": 1, "fields": ["title", "content"], "terms": [<term>, ...], "postings": [[<title ids>, <content ids>], ...]}
+
+    The terms are sorted (in the order javascript compares strings), so that search.js can find all the terms that start with a query
+    word with a binary search. The ids are the positions of the entries in search.json, stored as the difference with the previous id.
+    """
+
+    def __init__(self, path, output):
+        self.path = path
+        self.output = output
+        self.postings = {}  # term --> [[title ids], [content ids]]
+
+    def add(self, id, entry):
+        for i, field in enumerate(SEARCH_INDEX_FIELDS):
+            for term in set(Tokenize(entry[field])):
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = [[] for _ in SEARCH_INDEX_FIELDS]
+                    self.postings[term] = postings
+                postings[i].append(id)
+
+    def compile(self):
+        terms = sorted(self.postings.keys(), key=lambda x: x.encode("utf-16-be"))
+        postings = []
+        for term in terms:
+            postings.append([DeltaEncode(ids) for ids in self.postings[term]])
+        return {"version": SEARCH_INDEX_VERSION, "fields": list(SEARCH_INDEX_FIELDS), "terms": terms, "postings": postings}
+
+    def write(self):
+        """Writes the index to path, and returns the json that was written"""
+        data = json.dumps(self.compile(), separators=(",", ":"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.output.write(self.path, gzip.compress(data.encode("utf-8"), compresslevel=9, mtime=0))
+        return data
+
+
+def Tokenize(text):
+    return [x for x in TERM_SEPARATOR_RE.split(text.lower()) if x]
+
+
+def DeltaEncode(ids):
+    # ids are added in increasing order
+    return [x - (ids[i - 1] if i > 0 else 0) for i, x in enumerate(ids)]
 
 
 def SanatizeText(text):
@@ -61,8 +61,11 @@ def get_html_page_content(pb, pane_id):
     # get file and convert to soup
     fo = pb.index.fo_by_html_relpath[file_rtr]
     dst_abs_path = fo.path["html"]["file_absolute_path"]
-    with open(dst_abs_path, "r", encoding="utf-8") as f:
-        html = f.read()
+    if pb.pages is not None and dst_abs_path in pb.pages:
+        html = pb.pages.get(dst_abs_path)
+    else:
+        with open(dst_abs_path, "r", encoding="utf-8") as f:
+            html = f.read()
 
     soup = BeautifulSoup(html, features="html5lib")
 
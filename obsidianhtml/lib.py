@@ -3,6 +3,7 @@ import sys
 import re  # regex string finding/replacing
 import yaml
 import json
+import hashlib
 import unicodedata
 
 from pathlib import Path  #
@@ -10,6 +11,8 @@ from string import ascii_letters, digits
 from functools import cache
 from subprocess import Popen, PIPE
 from appdirs import AppDirs
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 # Open source files in the package
 import importlib.util
@@ -17,6 +20,10 @@ import importlib.util
 # from . import src
 
 
+# The C implementation of the yaml loader is a lot faster, but is not available when pyyaml is installed without libyaml
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
 class DuplicateFileNameInRoot(Exception):
     pass
 
@@ -74,10 +81,8 @@ def WriteFileLog(files, log_file_name, include_processed=False):
 
 
 def simpleHash(text: str):
-    hash = 0
-    for ch in text:
-        hash = (hash * 281 ^ ord(ch) * 997) & 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF
-    return str(hash)
+    """Hash of text that is the same in every run (hexadecimal), used in the ids of the graph elements"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
 
 def ConvertTitleToMarkdownId(title):
@@ -246,6 +251,26 @@ def get_html_url_prefix(pb, rel_path_str=None, abs_path_str=None):
     return html_url_prefix
 
 
+def get_job_count(pb):
+    """Returns the amount of processes to use for the conversion steps, as configured by `jobs` (0 means a process per cpu core).
+    Takes the picknick basket, or a module."""
+    jobs = int(pb.gc("jobs", cached=True))
+    if jobs < 1:
+        jobs = os.cpu_count() or 1
+    return jobs
+
+
+def get_forked_process_pool(workers):
+    """
+    Returns a process pool of which the workers are forked from the current process, so that they inherit all the state that has been
+    loaded so far (index, config, templates). Returns None when forking is not supported on this platform.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        print("\t\tProcess forking is not supported on this platform, falling back to a single process.")
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+
+
 def retain_reference(*args):
     """Goal of this function is to trick people and linters into thinking that the reference is "used".
     This is necessary for e.g. tempdir references, where if we don't catch the returned value in
@@ -376,11 +401,16 @@ def get_arguments_dict():
         return literals
 
     def collect_dynamic_arguments(arguments):
+        # options that don't take a value
+        flags = ["watch"]
         for i, v in enumerate(sys.argv):
             if v.startswith("--"):
                 key = v[2:]
                 if key in arguments.keys():
                     raise Exception(f'400: Trying to set existing {key} in arguments dict (value provided through "{v}"). This is not allowed.')
+                if key in flags:
+                    arguments[key] = True
+                    continue
                 if len(sys.argv) >= (i + 2):
                     value = sys.argv[i + 1]
                     if value.startswith("--"):
@@ -27,6 +27,13 @@ class DataviewExtension(Extension):
         md.preprocessors.register(DataviewPreprocessor(self, md), "dataview", 35)
         md.registerExtension(self)
 
+    def reset(self):
+        """Called by md.reset() before every note, the dataview elements are loaded per note (see note_path)."""
+        global GLOBAL_DATAVIEW_ELEMENTS
+        GLOBAL_DATAVIEW_ELEMENTS = None
+        GLOBAL_COUNTERS["line"] = 0
+        GLOBAL_COUNTERS["table"] = 0
+
 
 def makeExtension(**kwargs):
     return DataviewExtension(**kwargs)
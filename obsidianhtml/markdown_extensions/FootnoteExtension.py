@@ -46,8 +46,6 @@ class FootnoteExtension(Extension):
         self.unique_prefix = 0
         self.found_refs = {}
         self.used_refs = set()
-        self.inc = 0
-        self.replacement_inc = 0
 
         self.reset()
 
@@ -89,6 +87,8 @@ class FootnoteExtension(Extension):
         self.used_refs = set()
         self.codeblocks = {}
         self.codelines = {}
+        self.inc = 0
+        self.replacement_inc = 0
 
     def unique_ref(self, reference, found=False):
         """Get a unique reference if there are duplicates."""
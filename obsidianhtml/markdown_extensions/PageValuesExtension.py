@@ -0,0 +1,65 @@
+"""
+Collects the text of the first paragraphs and of the first header of each level while a page is converted, for the first-paragraphs and
+first-header selectors of the rss feed (see features/RssFeed.py). This saves the feed from parsing the html pages again.
+
+After a conversion the values are set on the markdown instance: md.page_values = {"paragraphs": [text, ...], "headers": {level: text}}
+"""
+
+import html
+
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import HTML_PLACEHOLDER_RE, AtomicString
+
+from .CustomTocExtension import stashedHTML2text, unescape
+
+HEADER_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+
+class PageValuesTreeprocessor(Treeprocessor):
+    def __init__(self, md, config):
+        super().__init__(md)
+        self.number_of_paragraphs = config["number_of_paragraphs"]
+        self.header_levels = config["header_levels"]
+
+    def get_text(self, el):
+        """Same as get_name() of the toc extension, without stripping the text, and with the stashed inline html reduced to its text"""
+        text = "".join(html.unescape(x) if isinstance(x, AtomicString) else x for x in el.itertext())
+        # (entities are stashed as raw html as well)
+        return html.unescape(unescape(stashedHTML2text(text, self.md, strip_entities=False)))
+
+    def run(self, doc):
+        paragraphs = []
+        headers = {}
+        for el in doc.iter():
+            if el.tag == "p":
+                if len(paragraphs) >= self.number_of_paragraphs:
+                    continue
+                # raw html blocks (also code blocks) are stashed in a paragraph of their own, which is replaced by the raw html
+                if len(el) == 0 and el.text is not None and HTML_PLACEHOLDER_RE.fullmatch(el.text.strip()):
+                    continue
+                paragraphs.append(self.get_text(el))
+
+            elif el.tag in HEADER_TAGS and el.tag[1] in self.header_levels and el.tag[1] not in headers:
+                headers[el.tag[1]] = self.get_text(el)
+
+        self.md.page_values = {"paragraphs": paragraphs, "headers": headers}
+
+
+class PageValuesExtension(Extension):
+    def __init__(self, **kwargs):
+        self.config = {
+            "number_of_paragraphs": [0, "Number of paragraphs to collect"],
+            "header_levels": [set(), "Levels of the headers to collect, as strings ('1' to '6')"],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        self.md = md
+        self.reset()
+        # after the inline patterns (20) and the toc (5), so that the text of the elements is final
+        md.treeprocessors.register(PageValuesTreeprocessor(md, self.getConfigs()), "page_values", 4)
+
+    def reset(self):
+        self.md.page_values = {"paragraphs": [], "headers": {}}
@@ -11,16 +11,29 @@ from ..parser.HeaderTree import convert_markdown_to_header_tree
 from ..parser.MarkdownLink import MarkdownLink
 
 from ..core.FileObject import FileObject
-from ..lib import simpleHash, get_rel_html_url_prefix
+from ..parser.MarkdownPage import restore_svgs, SVG_PLACEHOLDER_RE
+from ..lib import simpleHash, get_rel_html_url_prefix, get_forked_process_pool
 
-from ..compiler.Templating import PopulateTemplate
+from ..compiler.Templating import CompileTemplate
 
 
-def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node=None, log_level=1, capture_in_jar=False):
+def replace_literal(page, old, new):
+    """Same as re.sub(re.escape(old), new, page), without compiling a pattern for every link"""
+    if "\\" in new:
+        # (backslashes in the replacement are processed by re.sub)
+        return re.sub(re.escape(old), new, page)
+    return page.replace(old, new)
+
+
+def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node=None, log_level=1, capture_in_jar=False, render_queue=None):
     """
     Takes a file object, opens the markdown file, edits the contents to prepare for conversion to html, copies images and other resources over to the
     output location, converts the md to html, writes the html content to the output directory, returns all the links to other markdown pages found
     in the page.
+
+    The rendered page is not written here, but kept in pb.pages until all pages are known, see finalize_html_page().
+    When a render_queue list is passed in, the conversion to html is not done here either, but a render job is appended
+    to the queue instead, see render_markdown_page_to_html().
     """
 
     # Unpack picknick basket so we don't have to type too much.
@@ -158,8 +171,7 @@ def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node
             new_link = f']({urllib.parse.quote(link.fo.get_link("html", origin=fo, encode_special=False))}{query_part})'
 
         # Update link
-        safe_link = re.escape("](" + ol + ")")
-        md.page = re.sub(safe_link, new_link, md.page)
+        md.page = replace_literal(md.page, "](" + ol + ")", new_link)
 
 
     # [?] Handle local source tag-links (copy them over to output)
@@ -181,8 +193,7 @@ def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node
 
         # [11.2] Adjust video link in page to new dst folder (when the link is to a file in our root folder)
         new_link = '<source src="' + urllib.parse.quote(lo.get_link("html", origin=fo, encode_special=False)) + '"'
-        safe_link = r'<source src="' + re.escape(link) + r'"'
-        md.page = re.sub(safe_link, new_link, md.page)
+        md.page = replace_literal(md.page, '<source src="' + link + '"', new_link)
 
     # [?] Handle local img tag-links (copy them over to output)
     # ------------------------------------------------------------------
@@ -214,8 +225,7 @@ def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node
 
         # [11.2] Adjust video link in page to new dst folder (when the link is to a file in our root folder)
         new_link = template.replace("{link}", urllib.parse.quote(lo.get_link("html", origin=fo, encode_special=False)))
-        safe_link = re.escape(tag)
-        md.page = re.sub(safe_link, new_link, md.page)
+        md.page = replace_literal(md.page, tag, new_link)
 
     # [?] Handle local embeddable tag-links (copy them over to output)
     # ------------------------------------------------------------------
@@ -236,8 +246,7 @@ def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node
 
         # [11.2] Adjust video link in page to new dst folder (when the link is to a file in our root folder)
         new_link = '<embed src="' + urllib.parse.quote(lo.get_link("html", origin=fo, encode_special=False)) + '"'
-        safe_link = r'<embed src="' + re.escape(link) + r'"'
-        md.page = re.sub(safe_link, new_link, md.page)
+        md.page = replace_literal(md.page, '<embed src="' + link + '"', new_link)
 
     # [?] Documentation styling: Table of Contents
     # ------------------------------------------------------------------
@@ -265,18 +274,69 @@ def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node
     # ------------------------------------------------------------------
     md.RestoreCodeSections()
 
+    # Add page to the tagtree
+    # ------------------------------------------------------------------
+    md.AddToTagtree(pb.tagtree, fo.path["html"]["file_relative_path"].as_posix())
+
+    # Compile render job
+    # ------------------------------------------------------------------
+    # Everything below only depends on the job and (read-only) on pb, so that it can be done out of order, in another process.
+    job = {
+        "page": md.page,
+        "svgs": svgs,
+        "rel_dst_path": rel_dst_path,
+        "dst_path": fo.path["html"]["file_absolute_path"],
+        "html_url_prefix": html_url_prefix,
+        "page_depth": page_depth,
+        "node": {"id": node["id"], "nid": node["nid"], "name": node["name"]},
+        "capture_in_jar": capture_in_jar,
+    }
+    if pb.incremental is not None:
+        job["render_hash"] = pb.incremental.get_render_hash(job, md.metadata)
+
+    if render_queue is not None:
+        render_queue.append(job)
+    else:
+        html, html_body, page_values = render_markdown_page_to_html(pb, job)
+        pb.pages.add(job["dst_path"], node["id"], html)
+        if pb.rss_feed is not None:
+            pb.rss_feed.capture(job["dst_path"], rel_dst_path, node["id"], page_values)
+        if capture_in_jar:
+            pb.jars[capture_in_jar] = html_body
+
+    # Return links to crawl through linked notes
+    # ------------------------------------------------------------------
+    return (backlink_node, md.links)
+
+
+def render_markdown_page_to_html(pb, job):
+    """
+    Takes a render job as compiled by convert_markdown_page_to_html_and_export(), converts the prepared markdown to html and wraps it in the html template.
+    Returns the html page, which still contains the slots listed in PAGE_SLOTS, the html body (used for capture_in_jar), and the values that
+    the rss feed needs of the page (None when the feed is disabled).
+    """
+    rel_dst_path = job["rel_dst_path"]
+    html_url_prefix = job["html_url_prefix"]
+    page_depth = job["page_depth"]
+    node = job["node"]
+
     # [11] Convert markdown to html
     # ------------------------------------------------------------------
-    html_body = md2html.pythonmarkdown_convert_md_to_html(pb, md.page, rel_dst_path)
+    html_body = md2html.pythonmarkdown_convert_md_to_html(pb, job["page"], rel_dst_path)
     html_body = f'<div class="content">{html_body}</div>'
 
+    # values collected by the PageValuesExtension during the conversion, without the svg placeholders
+    page_values = None
+    if pb.rss_feed is not None:
+        values = get_markdown_converter(pb)[0].page_values
+        page_values = {
+            "paragraphs": [SVG_PLACEHOLDER_RE.sub("", x) for x in values["paragraphs"]],
+            "headers": {level: SVG_PLACEHOLDER_RE.sub("", x) for level, x in values["headers"].items()},
+        }
+
     # restore svg, as python-markdown corrupts these
     # ------------------------------------------------------------------
-    for i, v in enumerate(svgs):
-        html_body = html_body.replace("---obsidian_html_svg_block_"+str(i), v)
-
-    if capture_in_jar:
-        pb.jars[capture_in_jar] = html_body
+    html_body = restore_svgs(html_body, job["svgs"])
 
     # HTML Tweaks
     # [??] Embedded note titles integration
@@ -375,40 +435,111 @@ def convert_markdown_page_to_html_and_export(fo: "FileObject", pb, backlink_node
         )
         html_body += f"\n{graph_template}\n"
 
-    # Add node_id to page so that we can fetch this in the second-pass
-    html_body += "{_obsidian_html_node_id_pattern_:" + node["id"] + "}\n"
-
     # [16] Wrap body html in valid html structure from template
     # ------------------------------------------------------------------
-    html = PopulateTemplate(pb, node["id"], pb.dynamic_inclusions, pb.html_template, content=html_body)
-
-    html = html.replace("{node_name}", node["name"])
-    html = html.replace("{pinnedNode}", node["id"]).replace("{html_url_prefix}", html_url_prefix).replace("{page_depth}", str(page_depth))
+    # Placeholders in the page content itself are filled in as well
+    content = html_body.replace("{node_name}", node["name"])
+    content = content.replace("{pinnedNode}", node["id"]).replace("{html_url_prefix}", html_url_prefix).replace("{page_depth}", str(page_depth))
     # [?] Documentation styling: Navbar
     # ------------------------------------------------------------------
-    html = html.replace("{{navbar_links}}", "\n".join(pb.navbar_links))
+    content = content.replace("{{navbar_links}}", "\n".join(pb.navbar_links))
 
-    # Save file
-    # ------------------------------------------------------------------
-    fo.path["html"]["file_absolute_path"].parent.mkdir(parents=True, exist_ok=True)
-    html_dst_path_posix = fo.path["html"]["file_absolute_path"].as_posix()
+    page_template = CompileTemplate(pb, pb.dynamic_inclusions, pb.html_template, page=True)
+    html = page_template.populate(pb, node["id"], content, html_url_prefix=html_url_prefix, node_name=node["name"], page_depth=str(page_depth))
 
-    md.AddToTagtree(pb.tagtree, fo.path["html"]["file_relative_path"].as_posix())
+    return (html, html_body, page_values)
 
-    # Write html
-    with open(html_dst_path_posix, "w", encoding="utf-8") as f:
-        f.write(html)
 
-    # Return links to crawl through linked notes
-    # ------------------------------------------------------------------
-    return (backlink_node, md.links)
+# Set in the parent process right before the worker processes are forked, so that every worker inherits the fully loaded picknick basket
+_worker_pb = None
 
 
-def pythonmarkdown_convert_md_to_html(pb, page, rel_dst_path):
+def _render_job_in_worker(job):
+    if _worker_pb.gc("toggles/relative_path_html", cached=True):
+        _worker_pb.sc(path="html_url_prefix", value=job["html_url_prefix"])
+    html, html_body, page_values = render_job(_worker_pb, job)
+    return (html, html_body, page_values, _worker_pb.profiler.drain())
+
+
+def render_job(pb, job):
+    with pb.profiler.note(job["rel_dst_path"].as_posix()):
+        return render_markdown_page_to_html(pb, job)
+
+
+def render_queued_pages(pb, render_queue, jobs):
+    """
+    Renders all the render jobs in the queue over a pool of worker processes. The results are merged back in queue order,
+    so the output is identical to rendering the pages one by one.
+    """
+    global _worker_pb
+
+    if len(render_queue) == 0:
+        return
+
+    workers = min(jobs, len(render_queue))
+
+    # The workers need the state of the parent process (index, config, templates), so _worker_pb needs to be set before forking.
+    _worker_pb = pb
+    try:
+        executor = None
+        if workers > 1:
+            executor = get_forked_process_pool(workers)
+        if executor is None:
+            results = [render_job(pb, job) + (None,) for job in render_queue]
+        else:
+            chunksize = max(1, len(render_queue) // (workers * 4))
+            with executor:
+                results = list(executor.map(_render_job_in_worker, render_queue, chunksize=chunksize))
+    finally:
+        _worker_pb = None
+
+    # Merge results
+    for job, (html, html_body, page_values, timed_notes) in zip(render_queue, results):
+        pb.profiler.merge(timed_notes)
+        pb.pages.add(job["dst_path"], job["node"]["id"], html)
+        if pb.rss_feed is not None:
+            pb.rss_feed.capture(job["dst_path"], job["rel_dst_path"], job["node"]["id"], page_values)
+        if job["capture_in_jar"]:
+            pb.jars[job["capture_in_jar"]] = html_body
+
+
+# Setting up a markdown converter with all its extensions is expensive, so converters are created once per process and set of enabled
+# features, and are reused for every page (see get_markdown_converter()).
+_markdown_converters = {}
+
+
+def get_markdown_converter_key(pb):
+    """Returns the config values that determine which extensions are loaded, and how."""
+    key = [
+        pb.gc("toggles/features/footnote_md_extension/enabled", cached=True),
+        pb.gc("toggles/features/mermaid_diagrams/enabled", cached=True),
+        pb.gc("toggles/features/dataview/enabled", cached=True),
+        pb.gc("toggles/features/eraser/enabled", cached=True),
+        pb.gc("toggles/features/embedded_search/enabled", cached=True),
+        pb.rss_feed is not None,
+    ]
+    if pb.gc("toggles/features/mermaid_diagrams/enabled", cached=True):
+        key.append(pb.gc("toggles/features/mermaid_diagrams/strip_special_chars", cached=True))
+    if pb.gc("toggles/features/dataview/enabled", cached=True):
+        key.append(str(pb.paths["dataview_export_folder"]))
+    if pb.rss_feed is not None:
+        key.append((pb.rss_feed.number_of_paragraphs, tuple(sorted(pb.rss_feed.header_levels))))
+    return tuple(key)
+
+
+def get_markdown_converter(pb):
+    """
+    Returns a (markdown.Markdown, DataviewExtension | None) tuple for the current config. The converter is reused between pages, so reset() should be
+    called on it before every conversion. The dataview extension needs to know which note is converted, this is passed in via its note_path config.
+    """
+    key = get_markdown_converter_key(pb)
+    if key in _markdown_converters:
+        return _markdown_converters[key]
+
     import markdown
     from ..markdown_extensions.CallOutExtension import CallOutExtension
 
-    # from ..markdown_extensions.DataviewExtension import DataviewExtension
+    from ..markdown_extensions.DataviewExtension import DataviewExtension
     from ..markdown_extensions.MermaidExtension import MermaidExtension
     from ..markdown_extensions.CustomTocExtension import CustomTocExtension
     from ..markdown_extensions.EraserExtension import EraserExtension
@@ -418,6 +549,7 @@ def pythonmarkdown_convert_md_to_html(pb, page, rel_dst_path):
     from ..markdown_extensions.CodeWrapperExtension import CodeWrapperExtension
     from ..markdown_extensions.AdmonitionExtension import AdmonitionExtension
     from ..markdown_extensions.BlockLinkExtension import BlockLinkExtension
+    from ..markdown_extensions.PageValuesExtension import PageValuesExtension
 
     extensions = [
         "abbr",
@@ -435,33 +567,63 @@ def pythonmarkdown_convert_md_to_html(pb, page, rel_dst_path):
 
     extension_configs = {"codehilite": {"linenums": False}, "pymdownx.arithmatex": {"generic": True}}
 
-    if pb.gc("toggles/features/footnote_md_extension/enabled"):
+    if pb.gc("toggles/features/footnote_md_extension/enabled", cached=True):
         extensions.append(FootnoteExtension())
 
-    if pb.gc("toggles/features/mermaid_diagrams/enabled"):
-        strip_special_chars = pb.gc("toggles/features/mermaid_diagrams/strip_special_chars")
+    if pb.gc("toggles/features/mermaid_diagrams/enabled", cached=True):
+        strip_special_chars = pb.gc("toggles/features/mermaid_diagrams/strip_special_chars", cached=True)
         extensions.append(MermaidExtension(strip_special_chars=strip_special_chars))
 
-    if pb.gc("toggles/features/dataview/enabled"):
-        extensions.append("dataview")
-        extension_configs["dataview"] = {"note_path": rel_dst_path, "dataview_export_folder": pb.paths["dataview_export_folder"]}
+    dataview_extension = None
+    if pb.gc("toggles/features/dataview/enabled", cached=True):
+        dataview_extension = DataviewExtension(dataview_export_folder=pb.paths["dataview_export_folder"])
+        extensions.append(dataview_extension)
 
-    if pb.gc("toggles/features/eraser/enabled"):
+    if pb.gc("toggles/features/eraser/enabled", cached=True):
         extensions.append(EraserExtension())
 
-    if pb.gc("toggles/features/embedded_search/enabled"):
+    if pb.gc("toggles/features/embedded_search/enabled", cached=True):
         extensions.append(EmbeddedSearchExtension())
 
     extensions.append(CodeWrapperExtension())
     extensions.append(AdmonitionExtension())
     extensions.append(BlockLinkExtension())
 
-    html_body = markdown.markdown(page, extensions=extensions, extension_configs=extension_configs)
+    if pb.rss_feed is not None:
+        extensions.append(PageValuesExtension(number_of_paragraphs=pb.rss_feed.number_of_paragraphs, header_levels=pb.rss_feed.header_levels))
+
+    converter = markdown.Markdown(extensions=extensions, extension_configs=extension_configs)
+    _markdown_converters[key] = (converter, dataview_extension)
+    return _markdown_converters[key]
+
+
+def pythonmarkdown_convert_md_to_html(pb, page, rel_dst_path):
+    converter, dataview_extension = get_markdown_converter(pb)
+    if dataview_extension is not None:
+        dataview_extension.setConfig("note_path", rel_dst_path)
+
+    html_body = converter.reset().convert(page)
     return html_body
 
 
-def insert_backlinks(pb, html, node_id, page_depth):
-    backlinks = [x for x in pb.index.network_tree.tree["links"] if x["target"] == node_id]
+# Named slots in a rendered page, for content that can only be compiled once all the pages are known. Filled in by fill_page_slots().
+PAGE_SLOTS = (
+    "left_pane",
+    "right_pane",
+    "_obsidian_html_breadcrumbs_pattern_",
+    "_obsidian_html_backlinks_pattern_",
+    "_obsidian_html_tags_footer_pattern_",
+)
+PAGE_SLOTS_RE = re.compile(r"\{(" + "|".join(PAGE_SLOTS) + r")\}")
+
+
+def fill_page_slots(html, slots):
+    """Fills in all the slots in a single pass over the page, slots that are not passed in are left as is."""
+    return PAGE_SLOTS_RE.sub(lambda m: slots.get(m.group(1), m.group(0)), html)
+
+
+def compile_backlinks_html(pb, node_id, page_depth):
+    backlinks = pb.index.network_tree.get_backlinks(node_id)
     snippet = ""
     if len(backlinks) > 0:
         snippet = "<h2>Backlinks</h2>\n<ul>\n"
@@ -478,8 +640,7 @@ def insert_backlinks(pb, html, node_id, page_depth):
     else:
         snippet = '<div class="backlinks" style="display:none"></div>\n'
 
-    # replace placeholder with list & write output
-    return re.sub("\{_obsidian_html_backlinks_pattern_\}", snippet, html)
+    return snippet
 
 
 def get_tags(node):
@@ -488,21 +649,31 @@ def get_tags(node):
     return []
 
 
-def insert_tags_footer(pb, html, tags, md_metadata):
-    # remove placeholder
-    if bool(tags) is False or ("obs.html.tags" in md_metadata.keys() and "no_tag_footer" in md_metadata["obs.html.tags"]):
-        return re.sub(r"\{_obsidian_html_tags_footer_pattern_\}", "", html)
+def has_tags_footer(tags, md_metadata):
+    return bool(tags) and not ("obs.html.tags" in md_metadata.keys() and "no_tag_footer" in md_metadata["obs.html.tags"])
+
+
+def compile_tags_footer_html(pb, tags, md_metadata):
+    if not has_tags_footer(tags, md_metadata):
+        return ""
 
     snippet = "<h2>Tags</h2>\n<ul>\n"
     for tag in tags:
         url = f'{pb.gc("html_url_prefix")}/obs.html/tags/{tag}/index.html'
         snippet += f'\t<li><a class="backlink" href="{url}">{tag}</a></li>\n'
-
-        if pb.gc("toggles/preserve_inline_tags", cached=True):
-            placeholder = re.escape("<code>{_obsidian_pattern_tag_" + tag + "}</code>")
-            inline_tag = f'<a class="inline-tag" href="{url}">{tag}</a>'
-            html = re.sub(placeholder, inline_tag, html)
     snippet += "</ul>"
 
-    # replace placeholder with list & write output
-    return re.sub(r"\{_obsidian_html_tags_footer_pattern_\}", snippet, html)
+    return snippet
+
+
+def insert_inline_tags(pb, html, tags, md_metadata):
+    if not has_tags_footer(tags, md_metadata) or not pb.gc("toggles/preserve_inline_tags", cached=True):
+        return html
+
+    for tag in tags:
+        url = f'{pb.gc("html_url_prefix")}/obs.html/tags/{tag}/index.html'
+        placeholder = re.escape("<code>{_obsidian_pattern_tag_" + tag + "}</code>")
+        inline_tag = f'<a class="inline-tag" href="{url}">{tag}</a>'
+        html = re.sub(placeholder, inline_tag, html)
+
+    return html
@@ -1,15 +1,29 @@
 import yaml
 import shutil
 import os
+import sys
+import json
 import glob
+import errno
 import tempfile
 
 from subprocess import Popen, PIPE
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # not available on windows
+    fcntl = None
 
 from ..base_classes import ObsidianHtmlModule
 from ...lib import is_installed, pushd, should_ignore
 
+# ioctl request to clone a file on linux filesystems that support reflinks (btrfs, xfs, ...), see `man ioctl_ficlone`
+FICLONE = 0x40049409
+
+SNAPSHOT_METHODS = ("default", "reflink", "hardlink", "copy")
+
 
 class VaultCopyModule(ObsidianHtmlModule):
     """Creates a temporary folder and copies the user's vault to that folder.
@@ -61,9 +75,13 @@ class VaultCopyModule(ObsidianHtmlModule):
         for key, value in paths.items():
             paths[key] = Path(value)
 
-        # Remove tmpdir if exists, then recreate tmpdir
+        # The tmpdir is kept between runs, so that only changed files need to be copied again.
+        # It is created again when it was made from another vault, or with another method.
+        method = get_snapshot_method(self.gc("copy_vault_to_tempdir_method"))
         tmpdir = paths["appdir"].joinpath("tmpdir/input/").resolve()
-        if tmpdir.exists():
+        state_path = tmpdir.parent.joinpath("snapshot.json")
+        state = {"source": paths["obsidian_folder"].resolve().as_posix(), "method": method}
+        if tmpdir.exists() and read_snapshot_state(state_path) != state:
             shutil.rmtree(tmpdir)
         tmpdir.mkdir(parents=True, exist_ok=True)
 
@@ -87,25 +105,31 @@ class VaultCopyModule(ObsidianHtmlModule):
         # Copy vault from original location to new location
         files = self.modfile("index/files.json").read().from_json()
         new_files = []
-        source_folder_path=paths["original_obsidian_folder"]
-        target_folder_path=paths["obsidian_folder"]
+        copy_jobs = []
+        source_folder_path = paths["original_obsidian_folder"]
+        target_folder_path = paths["obsidian_folder"]
         for file in files:
             src_path = Path(file)
             rel_path = src_path.relative_to(source_folder_path)
             dst_path = target_folder_path.joinpath(rel_path)
 
             new_files.append(dst_path)
-            self.copy_file(src_path, dst_path)
+            if not snapshot_is_up_to_date(src_path, dst_path, method):
+                copy_jobs.append((src_path, dst_path))
+
+        # the copying is mostly waiting on the disk, so threads are used
+        with ThreadPoolExecutor() as executor:
+            for src_path in executor.map(lambda x: snapshot_file(x[0], x[1], method), copy_jobs):
+                if self.gc("copy_vault_to_tempdir_follow_copy"):
+                    self.print("INFO", f"copy: {src_path.as_posix()}")
+
+        removed = remove_stale_files(target_folder_path, set(x.as_posix() for x in new_files))
+        write_snapshot_state(state_path, state)
+        self.print("INFO", f"Vault snapshot ({method}): {len(copy_jobs)} files copied, {len(files) - len(copy_jobs)} up to date, {removed} removed")
 
         # update index/files.json
         self.modfile("index/files.json", new_files).to_json().write()
 
-    def copy_file(self, src_path, dst_path):
-        dst_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(src_path, "rb") as r:
-            with open(dst_path, "wb") as w:
-                w.write(r.read())
-
     # def copy_vault_to_tmpdir(self):
     #     paths = self.retrieve("paths")
     #     source_folder_path=paths["original_obsidian_folder"]
@@ -307,3 +331,115 @@ class VaultCopyModule(ObsidianHtmlModule):
     #     # Fail if any errors were found
     #     if errors:
     #         raise EnvironmentError(errors)
+
+
+def get_snapshot_method(method):
+    # rsync, shutil and shutil_walk are methods of a previous implementation, these are plain copies now
+    if method in ("rsync", "shutil", "shutil_walk"):
+        return "copy"
+    if method not in SNAPSHOT_METHODS:
+        raise Exception(f"copy_vault_to_tempdir_method should be one of {', '.join(SNAPSHOT_METHODS)}, got '{method}'")
+    return method
+
+
+def read_snapshot_state(state_path):
+    if not state_path.exists():
+        return None
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot_state(state_path, state):
+    with open(state_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(state))
+
+
+def snapshot_is_up_to_date(src_path, dst_path, method):
+    """Files in the snapshot are up to date when they are the same file (hardlinks), or have the same size and modification time"""
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src_path)
+
+    same_file = src_stat.st_ino == dst_stat.st_ino and src_stat.st_dev == dst_stat.st_dev
+    if method == "hardlink":
+        return same_file
+    return not same_file and src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def snapshot_file(src_path, dst_path, method):
+    """Copies src_path to dst_path using the given method, falling back to a plain copy when the method is not supported here"""
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # never write into the existing file, it could be a hardlink to the file in the vault
+    if os.path.lexists(dst_path):
+        os.unlink(dst_path)
+
+    if method == "hardlink":
+        try:
+            os.link(src_path, dst_path)
+            return src_path
+        except OSError:
+            pass
+
+    copied = False
+    if method in ("default", "reflink"):
+        try:
+            reflink_file(src_path, dst_path)
+            copied = True
+        except OSError:
+            pass
+    if not copied:
+        copy_file_contents(src_path, dst_path)
+
+    # the modification time is used to see whether the file needs to be copied again in the next run
+    src_stat = os.stat(src_path)
+    os.utime(dst_path, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    return src_path
+
+
+def reflink_file(src_path, dst_path):
+    """Creates dst_path as a copy-on-write clone of src_path. Raises OSError when this is not supported by the platform or filesystem."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform")
+    with open(src_path, "rb") as r:
+        with open(dst_path, "wb") as w:
+            fcntl.ioctl(w.fileno(), FICLONE, r.fileno())
+
+
+def copy_file_contents(src_path, dst_path):
+    """Copies the file within the kernel where possible: copy_file_range, or sendfile (which shutil.copyfile uses on linux)"""
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src_path, "rb") as r:
+                with open(dst_path, "wb") as w:
+                    remaining = os.fstat(r.fileno()).st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(r.fileno(), w.fileno(), remaining)
+                        if copied == 0:
+                            break
+                        remaining -= copied
+            if remaining == 0:
+                return
+        except OSError:
+            pass
+    shutil.copyfile(src_path, dst_path)
+
+
+def remove_stale_files(folder_path, keep):
+    """Removes the files in folder_path of which the (posix) path is not in keep, and the folders that are left empty. Returns the amount of removed files."""
+    removed = 0
+    for dir_path, dir_names, file_names in os.walk(folder_path, topdown=False):
+        dir_path_str = Path(dir_path).as_posix()
+        for file_name in file_names:
+            path_str = dir_path_str + "/" + file_name
+            if path_str not in keep:
+                os.unlink(path_str)
+                removed += 1
+        if dir_path_str != Path(folder_path).as_posix() and len(os.listdir(dir_path)) == 0:
+            os.rmdir(dir_path)
+    return removed
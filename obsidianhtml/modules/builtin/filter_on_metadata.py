@@ -132,19 +132,20 @@ class FilterOnMetadataModule(ObsidianHtmlModule):
                 exclude_list.append(file)
 
         # remove duplicates
-        exclude_list = list(set(exclude_list))
+        exclude_set = set(exclude_list)
+        exclude_list = sorted(exclude_set)
 
         # check that the entrypoint file is not being filtered out
-        if paths["entrypoint"] in exclude_list:
+        if paths["entrypoint"] in exclude_set:
            self.print('ERROR', f'You have configured {self.nametag} to filter out {paths["entrypoint"]}, which is your entrypoint. Correct this and run again.')
            exit(1)
         
         # update file lists
-        new_md_files = [x for x in md_files if x not in exclude_list]
+        new_md_files = [x for x in md_files if x not in exclude_set]
         self.modfile("index/markdown_files.json", new_md_files).to_json().write()
             
         files = self.modfile("index/files.json").read().from_json()
-        new_files = [x for x in files if (x not in exclude_list)]
+        new_files = [x for x in files if (x not in exclude_set)]
         self.modfile("index/files.json", new_files).to_json().write()
 
         # record the files that were excluded
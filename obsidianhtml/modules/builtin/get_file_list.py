@@ -1,4 +1,5 @@
 import os
+import re
 import yaml
 
 from pathlib import Path
@@ -17,6 +18,10 @@ class GetFileListModule(ObsidianHtmlModule):
     This module will create the index/files.json file, which lists all the files in the source folder (vault or md folder).
     If included_folders is defined, it will limit itself to those sub(!)folders.
     Once that list exists, the exluded file (by excluded_glob) will be filtered out.
+
+    The globs are matched against the path relative to the input folder while walking it once. Folders that are excluded as a whole
+    (e.g. ".git/**/*") are not walked at all. The size and times of the selected files are written to index/file_stats.json, so
+    that these do not have to be read again when the index is built.
     """
 
     @staticmethod
@@ -25,7 +30,7 @@ class GetFileListModule(ObsidianHtmlModule):
 
     @staticmethod
     def provides():
-        return tuple(["index/files.json", "index/excluded_files.json", "index/markdown_files.json"])
+        return tuple(["index/files.json", "index/excluded_files.json", "index/markdown_files.json", "index/file_stats.json"])
 
     @staticmethod
     def alters():
@@ -57,54 +62,26 @@ class GetFileListModule(ObsidianHtmlModule):
         """This function is run before run(), if it returns False, then the module run is skipped entirely. Any other value will be accepted"""
         return
         
-    def glob_find(self, folder, glob_list):
-        # ensure folder is a Path object
-        folder = Path(folder)
-
-        # find files
-        found_files = []
-        for glob_line in glob_list:
-            # rglob does not support specific file matching. we fix this by allowing the "/file.md" syntax.
-            # in this case we use glob instead of rglob
-            if glob_line[0] == '/':
-                glob_line = glob_line[1:]
-                found_files = found_files + [x.as_posix() for x in folder.glob(glob_line)]
-            else:
-                found_files = found_files + [x.as_posix() for x in folder.rglob(glob_line)]
-        
-        # make unique & sort
-        found_files = list(set(found_files))
-        found_files.sort()
-        
-        return found_files
-
-
     def run(self):
         # get paths
         paths = self.modfile("paths.json").read().from_json()
         for key, value in paths.items():
             paths[key] = Path(value)
 
-        # get all included files from input_folder
-        included_files = self.glob_find(paths["input_folder"], self.value_of("include_glob"))
-        
-        # get all excluded files
-        excluded_files = self.glob_find(paths["input_folder"], self.value_of("exclude_glob"))
-
-        # get all included files minus excluded files
-        selected_files = [x for x in included_files if x not in excluded_files]
-        selected_files.sort()
-
-        # remove dirs
-        selected_files = [x for x in selected_files if Path(x).is_dir() == False]
+        # walk the input folder once, skipping excluded folders entirely
+        include_res = [compile_glob(x) for x in self.value_of("include_glob")]
+        exclude_res = [compile_glob(x) for x in self.value_of("exclude_glob")]
+        prune_res = [x for x in (compile_prune_glob(y) for y in self.value_of("exclude_glob")) if x is not None]
+        selected_files, excluded_files, file_stats = walk_input_folder(paths["input_folder"], include_res, exclude_res, prune_res)
 
         # check that the entrypoint file is not being filtered out
-        if paths["entrypoint"].as_posix() not in selected_files:
+        if paths["entrypoint"].as_posix() not in set(selected_files):
             self.print('ERROR', f'You have configured {self.nametag} to filter out {paths["entrypoint"]}, which is your entrypoint. Correct this and run again.')
             exit(1)
 
         self.modfile("index/excluded_files.json", excluded_files).to_json().write()
         self.modfile("index/files.json", selected_files).to_json().write()
+        self.modfile("index/file_stats.json", file_stats).to_json().write()
 
         # get markdown files
         markdown_files = [x for x in selected_files if x[-3:] == '.md']
@@ -117,4 +94,125 @@ class GetFileListModule(ObsidianHtmlModule):
 
     def integrate_save(self, pb):
         """Used to integrate a module with the current flow, to become deprecated when all elements use modular structure"""
-        pass
\ No newline at end of file
+        pass
+
+
+# ----
+# Glob matching
+# ----
+# The globs follow the rules of pathlib's rglob (or glob, when the line starts with "/"), but are translated to one regex each so
+# that every path only has to be matched once, instead of walking the input folder again for every glob.
+GLOB_FLAGS = re.IGNORECASE if os.name == "nt" else 0
+
+
+def translate_glob_part(part):
+    """Translates one path component of a glob to a regex, "*" and "?" never match "/"."""
+    regex = ""
+    i = 0
+    while i < len(part):
+        c = part[i]
+        i += 1
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            j = i
+            if j < len(part) and part[j] == "!":
+                j += 1
+            if j < len(part) and part[j] == "]":
+                j += 1
+            j = part.find("]", j)
+            if j == -1:
+                regex += re.escape(c)
+                continue
+            chars = part[i:j].replace("\\", "\\\\")
+            if chars[:1] == "!":
+                chars = "^" + chars[1:]
+            elif chars[:1] == "^":
+                chars = "\\" + chars
+            regex += f"[{chars}]"
+            i = j + 1
+        else:
+            regex += re.escape(c)
+    return regex
+
+
+def translate_glob(glob_line):
+    """Returns the regex (without anchors) that matches the relative posix paths that the glob line selects."""
+    if glob_line[:1] == "/":
+        # "/file.md" syntax: only match from the root of the folder
+        parts = glob_line[1:].split("/")
+    else:
+        # rglob: match in any folder
+        parts = ["**"] + glob_line.split("/")
+
+    regex = ""
+    for i, part in enumerate(parts):
+        if part == "**":
+            # zero or more folders. a trailing "**" only selects folders, which never match, because only files are listed
+            regex += "(?:[^/]+/)*"
+            continue
+        regex += translate_glob_part(part)
+        if i < len(parts) - 1:
+            regex += "/"
+    return regex
+
+
+def compile_glob(glob_line):
+    return re.compile(translate_glob(glob_line), GLOB_FLAGS)
+
+
+def compile_prune_glob(glob_line):
+    """If the glob line selects everything under the folders that it matches (e.g. ".git/**/*"), returns a regex that matches those
+    folders, so that they don't have to be walked at all. Returns None otherwise."""
+    if glob_line == "**/*" or glob_line == "/**/*":
+        return re.compile("(?:[^/]+/)*[^/]+", GLOB_FLAGS)
+    if not glob_line.endswith("/**/*") or len(glob_line) == len("/**/*"):
+        return None
+    regex = translate_glob(glob_line[: -len("/**/*")])
+    return re.compile(regex, GLOB_FLAGS)
+
+
+def walk_input_folder(folder, include_res, exclude_res, prune_res):
+    """Walks the folder once, and returns the selected files (absolute posix paths, sorted), the excluded files and folders,
+    and the stats of the selected files as {relative posix path: [size, modified time, creation time]}.
+    Symlinked folders are not walked into, like with rglob."""
+    folder = Path(folder).as_posix()
+
+    selected_files = []
+    excluded_files = []
+    file_stats = {}
+
+    stack = [(folder, "")]
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        with os.scandir(abs_dir) as it:
+            entries = list(it)
+
+        for entry in entries:
+            rel_path = rel_dir + entry.name
+            abs_path = f"{folder}/{rel_path}"
+
+            if entry.is_dir(follow_symlinks=False):
+                if any(x.fullmatch(rel_path) for x in prune_res):
+                    excluded_files.append(abs_path)
+                    continue
+                stack.append((abs_path, rel_path + "/"))
+                continue
+
+            if not entry.is_file():
+                continue
+            if not any(x.fullmatch(rel_path) for x in include_res):
+                continue
+            if any(x.fullmatch(rel_path) for x in exclude_res):
+                excluded_files.append(abs_path)
+                continue
+
+            stat = entry.stat()
+            selected_files.append(abs_path)
+            file_stats[rel_path] = [stat.st_size, stat.st_mtime, stat.st_ctime]
+
+    selected_files.sort()
+    excluded_files.sort()
+    return selected_files, excluded_files, file_stats
@@ -1,25 +1,32 @@
 import os
+import json
 import yaml
 import frontmatter
 import regex as re
 
 from pathlib import Path
+from frontmatter.default_handlers import YAMLHandler
 
 from ...core.FileObject import FileObject
 from ...parser.MarkdownPage import MarkdownPage
+from ...lib import OpenIncludedFile, get_forked_process_pool, get_job_count, YamlLoader
 
 from ..base_classes import ObsidianHtmlModule
+from ..handlers.file import to_json_encoder
 
 
 class ParseMetadataModule(ObsidianHtmlModule):
     """
     This module will load all the files in index/markdown_files.json and load the metadata and inline tags, which are combined
     and the result is written to index/metadata.json
+
+    The metadata of every file is kept in <module_data_folder>/cache/metadata.json, under the size and modified time of the file,
+    so that only new and changed files are parsed. These are parsed in worker processes when `jobs` is set higher than 1.
     """
 
     @staticmethod
     def requires():
-        return tuple(["paths.json", "index/markdown_files.json"])
+        return tuple(["config.yml", "paths.json", "index/markdown_files.json", "index/file_stats.json"])
 
     @staticmethod
     def provides():
@@ -34,51 +41,59 @@ class ParseMetadataModule(ObsidianHtmlModule):
         return
 
     def sanatize_frontmatter(self, metadata):
-        # imitate obsidian shenannigans
-        if "tags" in metadata.keys():
-            tags = metadata["tags"]
-            if isinstance(tags, str):
-                if " " in tags.strip() or "," in tags:
-                    metadata["tags"] = [x.rstrip(",") for x in tags.replace(",", " ").split(" ") if x != ""]
-                elif tags.strip() == "":
-                    metadata["tags"] = []
-                else:
-                    metadata["tags"] = [tags,]
-            elif tags is None:
-                metadata["tags"] = []
-        else:
-            metadata["tags"] = []
-        return metadata
+        return sanatize_frontmatter(metadata)
 
     def get_frontmatter(self, file_path):
         with open(file_path, encoding="utf-8") as f:
-            metadata, page = frontmatter.parse(f.read())
+            metadata, page = parse_frontmatter(f.read())
         return self.sanatize_frontmatter(metadata), page
 
     def get_inline_tags(self, page):
-        return [x[1:].replace(".", "") for x in re.findall(r"(?<!\S)#[\w/\-]*[a-zA-Z\-_/][\w/\-]*", page)]
+        return get_inline_tags(page)
 
     def run(self):
         # get input
         files = self.modfile("index/markdown_files.json").read().from_json()
         paths = self.modfile("paths.json").read().from_json()
+        file_stats = self.modfile("index/file_stats.json").read().from_json()
 
-        # handle files
+        # metadata of files that have not changed since the previous run is taken from the cache
+        cache = MetadataCache(self.module_data_folder)
         output = {}
+        misses = []
         for file in files:
             rel_path = Path(file).relative_to(paths["input_folder"]).as_posix()
-            metadata = {}
-            metadata["tags"] = []
-            try:
-                metadata, page = self.get_frontmatter(file)
-                inline_tags = self.get_inline_tags(page)
-                metadata["tags"] = list(set(metadata["tags"] + inline_tags))
-            except Exception as e:
-                og_path = Path(paths["original_input_folder"]).joinpath(rel_path).as_posix()
-                self.print('ERROR', f'failed to parse metadata in file: {og_path}.\nError: {e}. \n(Ignoring this error is not supported as metadata will be read elsewhere. Review yaml frontmatter and edit it to resolve the issue).')
-                exit(1)
+            stat = file_stats[rel_path] if rel_path in file_stats else get_file_stat(file)
+            metadata = cache.get(rel_path, stat)
+            if metadata is None:
+                misses.append((file, rel_path, stat))
             output[rel_path] = metadata
 
+        # parse the other files, in worker processes when there are enough of them
+        workers = get_job_count(self)
+        pool = None
+        if workers > 1 and len(misses) >= MIN_FILES_PER_WORKER * 2:
+            pool = get_forked_process_pool(min(workers, len(misses) // MIN_FILES_PER_WORKER))
+
+        if pool is None:
+            results = map(parse_metadata_file, (x[0] for x in misses))
+        else:
+            results = pool.map(parse_metadata_file, (x[0] for x in misses), chunksize=MIN_FILES_PER_WORKER)
+
+        try:
+            for (file, rel_path, stat), (metadata, error) in zip(misses, results):
+                if error is not None:
+                    og_path = Path(paths["original_input_folder"]).joinpath(rel_path).as_posix()
+                    self.print('ERROR', f'failed to parse metadata in file: {og_path}.\nError: {error}. \n(Ignoring this error is not supported as metadata will be read elsewhere. Review yaml frontmatter and edit it to resolve the issue).')
+                    exit(1)
+                output[rel_path] = cache.set(rel_path, stat, metadata)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.print("INFO", f"Metadata: {len(misses)} files parsed, {len(files) - len(misses)} taken from the cache")
+        cache.write(output.keys())
+
         self.modfile("index/metadata.json", output).to_json().write()
 
 
@@ -88,4 +103,106 @@ class ParseMetadataModule(ObsidianHtmlModule):
 
     def integrate_save(self, pb):
         """Used to integrate a module with the current flow, to become deprecated when all elements use modular structure"""
-        pass
\ No newline at end of file
+        pass
+
+
+# ----
+# Parsing
+# ----
+# parsing a file takes less than a millisecond, so worker processes are only worth it when each gets a decent amount of files
+MIN_FILES_PER_WORKER = 50
+
+
+class FastYAMLHandler(YAMLHandler):
+    def load(self, fm, **kwargs):
+        kwargs.setdefault("Loader", YamlLoader)
+        return yaml.load(fm, **kwargs)
+
+
+def parse_frontmatter(text):
+    """Same as frontmatter.parse(), but uses the faster yaml loader for yaml frontmatter"""
+    handler = frontmatter.detect_format(text.strip(), frontmatter.handlers)
+    if isinstance(handler, YAMLHandler):
+        handler = FastYAMLHandler()
+    return frontmatter.parse(text, handler=handler)
+
+
+def sanatize_frontmatter(metadata):
+    # imitate obsidian shenannigans
+    if "tags" in metadata.keys():
+        tags = metadata["tags"]
+        if isinstance(tags, str):
+            if " " in tags.strip() or "," in tags:
+                metadata["tags"] = [x.rstrip(",") for x in tags.replace(",", " ").split(" ") if x != ""]
+            elif tags.strip() == "":
+                metadata["tags"] = []
+            else:
+                metadata["tags"] = [tags,]
+        elif tags is None:
+            metadata["tags"] = []
+    else:
+        metadata["tags"] = []
+    return metadata
+
+
+def get_inline_tags(page):
+    return [x[1:].replace(".", "") for x in re.findall(r"(?<!\S)#[\w/\-]*[a-zA-Z\-_/][\w/\-]*", page)]
+
+
+def parse_metadata_file(file_path):
+    """Returns (metadata, None), or (None, error message) when the file could not be parsed. Runs in the worker processes."""
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            metadata, page = parse_frontmatter(f.read())
+        metadata = sanatize_frontmatter(metadata)
+        metadata["tags"] = list(set(metadata["tags"] + get_inline_tags(page)))
+    except Exception as e:
+        return None, str(e)
+    return metadata, None
+
+
+def get_file_stat(file_path):
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime, stat.st_ctime]
+
+
+# ----
+# Cache
+# ----
+METADATA_CACHE_VERSION = 1
+
+
+class MetadataCache:
+    """Keeps the parsed metadata per file (relative path) between runs, together with the size and modified time of the file it was parsed from."""
+
+    def __init__(self, module_data_folder):
+        self.path = Path(module_data_folder).joinpath("cache/metadata.json")
+        self.version = f"{METADATA_CACHE_VERSION}/{OpenIncludedFile('version')}"
+        self.files = {}
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cache = json.loads(f.read())
+            if cache["version"] == self.version:
+                self.files = cache["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, rel_path, stat):
+        record = self.files.get(rel_path)
+        if record is None or record["size"] != stat[0] or record["mtime"] != stat[1]:
+            return None
+        return record["metadata"]
+
+    def set(self, rel_path, stat, metadata):
+        """Stores the metadata, and returns it as it will be read from the cache (i.e. after a round trip through json)"""
+        metadata = json.loads(json.dumps(metadata, cls=to_json_encoder))
+        self.files[rel_path] = {"size": stat[0], "mtime": stat[1], "metadata": metadata}
+        return metadata
+
+    def write(self, rel_paths):
+        """Writes the cache, leaving out the files that are no longer in the vault"""
+        files = {x: self.files[x] for x in rel_paths}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": self.version, "files": files}))
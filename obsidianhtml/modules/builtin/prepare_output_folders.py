@@ -8,6 +8,7 @@ from ...lib import pushd, WriteFileLog
 
 from ...core.NetworkTree import NetworkTree
 from ...core.FileObject import FileObject
+from ...core.IncrementalBuild import get_manifest_path
 
 from ..base_classes import ObsidianHtmlModule
 
@@ -55,7 +56,9 @@ class PrepareOutputFoldersModule(ObsidianHtmlModule):
             paths[key] = Path(value)
 
         # remove previous output
-        if self.value_of("clean_existing") is True:
+        # (unless we are doing an incremental build on top of the previous output)
+        incremental = self.gc("incremental_build") and get_manifest_path(self.module_data_folder).exists()
+        if self.value_of("clean_existing") is True and not incremental:
             if self.gc("toggles/compile_md") and paths["md_folder"].exists():
                 shutil.rmtree(paths["md_folder"])
             if paths["html_output_folder"].exists():
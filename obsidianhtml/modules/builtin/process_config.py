@@ -51,6 +51,19 @@ class ProcessConfigModule(ObsidianHtmlModule):
         if "verbose" in arguments:
             config["toggles"]["verbose_printout"] = arguments["verbose"]
 
+        # (--jobs <n> sets the amount of processes used to render html pages)
+        if "jobs" in arguments:
+            config["jobs"] = arguments["jobs"]
+        try:
+            config["jobs"] = int(config["jobs"])
+        except ValueError:
+            self.print("ERROR", f'Value of jobs should be a whole number, instead of "{config["jobs"]}".')
+            exit(1)
+
+        # (`serve --watch` converts the vault again on every change, only the pages of which the input changed should be rendered again)
+        if "watch" in arguments and arguments["watch"] is True:
+            config["incremental_build"] = True
+
         # Set toggles/no_tabs
         layout = config["toggles"]["features"]["styling"]["layout"]
         if layout == "tabs":
@@ -142,9 +142,16 @@ class SetupModule(ObsidianHtmlModule):
         self.set_module_data_folder_path(config["module_data_folder"])
 
         # ensure module data folder exists
+        # the cache folder is kept between runs (used for e.g. incremental builds)
         module_data_folder = Path(self.module_data_folder)
         if module_data_folder.exists():
-            shutil.rmtree(module_data_folder)
+            for path in module_data_folder.iterdir():
+                if path.name == "cache":
+                    continue
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
         module_data_folder.mkdir(parents=True, exist_ok=True)
 
         # write guid.txt, this contains the guid for this run, which can be used to target 
@@ -83,13 +83,11 @@ def run_module(
         )
     module_dot_method = getattr(module, method)
 
-    # import time
-    # start_time = time.perf_counter ()
-
-    result = module_dot_method()
-
-    # end_time = time.perf_counter ()
-    # print(end_time - start_time, "seconds")
+    if pb is not None:
+        with pb.profiler.phase(f"module:{module.module_name}.{method}"):
+            result = module_dot_method()
+    else:
+        result = module_dot_method()
 
     # convert basic result to run_module_result() type to manage different module outputs in an organized fashion
     result = run_module_result(module=module, output=result)
@@ -7,6 +7,7 @@ from pathlib import Path
 from datetime import datetime, date
 
 from ..lib import hash_wrap
+from ...lib import YamlLoader
 
 """
 Read:
@@ -145,7 +146,7 @@ class File:
     def from_yaml(self):
         if self.contents == "" or self.contents is None:
             return None
-        obj = yaml.safe_load(self.contents)
+        obj = yaml.load(self.contents, Loader=YamlLoader)
         if isinstance(obj, dict):
             return hash_wrap(obj)
         return obj
@@ -2,7 +2,6 @@ from __future__ import annotations
 import string
 import regex as re  # regex string finding/replacing
 from pathlib import Path
-import frontmatter  # remove yaml frontmatter from md files
 import urllib.parse  # convert link characters like %
 
 from ..lib import slugify, MalformedTags, OpenIncludedFile, bisect
@@ -11,13 +10,46 @@ from ..core import FileObject
 
 from .HeaderTree import PrintHeaderTree, convert_markdown_to_header_tree, get_referenced_block, GetSubHeaderTree
 
+# Patterns used to rewrite the page. Every rewrite step scans the page once with one of these, see ConvertObsidianPageToMarkdownPage()
+# ---------------------------------------------------------------------------------------------------------------------------------
+CODEBLOCK_RE = re.compile(r"^```([\s\S]*?)```[\s]*?$", re.MULTILINE)
+CODELINE_RE = re.compile(r"`(.*?)`")
+LATEXBLOCK_RE = re.compile(r"^\$\$([\s\S]*?)\$\$[\s]*?$", re.MULTILINE)
+CODE_PLACEHOLDER_RE = re.compile(r"%%%(codeblock|codeline|latexblock)-placeholder-(\d+)%%%")
+SVG_RE = re.compile(r"<svg[\s\S]*?</svg>")
+SVG_PLACEHOLDER_RE = re.compile(r"---obsidian_html_svg_block_(\d+)")
+
+HTML_IMG_RE = re.compile(r'<img src=".*?/>')
+EMBED_RE = re.compile(r"\!\[(.*?)\]\((.*?)\)")
+MD_LINK_RE = re.compile(r"\]\(([^\s\]]+)\)")
+# (the link does not start with a [, so that [[[Note]]] links to Note)
+WIKILINK_RE = re.compile(r"\[\[([^\[\n].*?)(?=\])(\]\])?")
+BARE_URL_RE = re.compile(r"(?<![\[\(\"])(https*:\/\/.[^\s|]*)")
+INLINE_TAG_RE = re.compile(r"(?<!\S)#[\w/\-]*[a-zA-Z\-_/][\w/\-]*")
+INCLUSION_RE = re.compile(r'(\<inclusion href="[^"]*" />)', re.MULTILINE)
+
+
+def stash_code_section(store, name, delimiter):
+    """Returns a function for re.sub() that moves the matched section into store, and puts a placeholder in its place."""
+
+    def replace(m):
+        store.append(m.group(1))
+        # the pattern can match trailing whitespace, which is not part of the section
+        tail = m.group(0)[len(delimiter) * 2 + len(m.group(1)) :]
+        return f"%%%{name}-placeholder-{len(store) - 1}%%%{tail}"
+
+    return replace
+
 
 class MarkdownPage:
     page = None  # Pure markdown code read from src file
     yaml = None  # Yaml is stripped from the src file and saved here
     codeblocks = None  # used to safely store ```codeblock content
     codelines = None  # Used to safely store `codeline` content
+    latexblocks = None  # Used to safely store $$latexblock$$ content
+    svgs = None  # Used to safely store <svg> content
     links = None  # Used to recurse to any page linked to by this page
+    inclusions = None  # File objects of the notes that are included in this page (also indirectly), used for incremental builds
 
     src_path = None  # Path() object of src file
     rel_src_path = None  # Path() object relative to given markdown root folder (src_folder_path)
@@ -38,12 +70,15 @@ class MarkdownPage:
         self.input_type = input_type
 
         self.links = []
+        self.inclusions = []
         self.codeblocks = []
         self.codelines = []
+        self.latexblocks = []
+        self.svgs = []
 
         # Load contents of entrypoint and strip frontmatter yaml.
-        with open(self.src_path, encoding="utf-8") as f:
-            self.metadata, self.page = frontmatter.parse(f.read())
+        # (the file is only read and parsed once per run, see core/DocumentCache.py)
+        self.metadata, self.page = self.pb.documents.load(self.src_path)
 
         self.SanitizeFrontmatter()
 
@@ -108,43 +143,44 @@ class MarkdownPage:
 
     def StripCodeSections(self):
         """(Temporarily) Remove codeblocks/-lines so that they are not altered in all the conversions. Placeholders are inserted."""
-        self.codeblocks = re.findall(r"^```([\s\S]*?)```[\s]*?$", self.page, re.MULTILINE)
-        for i, match in enumerate(self.codeblocks):
-            self.page = self.page.replace("```" + match + "```", f"%%%codeblock-placeholder-{i}%%%")
+        self.codeblocks = []
+        self.page = CODEBLOCK_RE.sub(stash_code_section(self.codeblocks, "codeblock", "```"), self.page)
 
-        self.codelines = re.findall("`(.*?)`", self.page)
-        for i, match in enumerate(self.codelines):
-            self.page = self.page.replace("`" + match + "`", f"%%%codeline-placeholder-{i}%%%")
+        self.codelines = []
+        self.page = CODELINE_RE.sub(stash_code_section(self.codelines, "codeline", "`"), self.page)
 
-        self.latexblocks = re.findall(r"^\$\$([\s\S]*?)\$\$[\s]*?$", self.page, re.MULTILINE)
-        for i, match in enumerate(self.latexblocks):
-            self.page = self.page.replace("$$" + match + "$$", f"%%%latexblock-placeholder-{i}%%%")
+        self.latexblocks = []
+        self.page = LATEXBLOCK_RE.sub(stash_code_section(self.latexblocks, "latexblock", "$$"), self.page)
 
     def RestoreCodeSections(self):
         """Undo the action of StripCodeSections."""
-        for i, value in enumerate(self.codeblocks):
-            self.page = self.page.replace(f"%%%codeblock-placeholder-{i}%%%", f"```{value}```\n")
-        for i, value in enumerate(self.codelines):
-            self.page = self.page.replace(f"%%%codeline-placeholder-{i}%%%", f"`{value}`")
-        for i, value in enumerate(self.latexblocks):
-            self.page = self.page.replace(f"%%%latexblock-placeholder-{i}%%%", f"$${value}$$")
+        sections = {
+            "codeblock": (self.codeblocks, "```{}```\n"),
+            "codeline": (self.codelines, "`{}`"),
+            "latexblock": (self.latexblocks, "$${}$$"),
+        }
+
+        def restore(m):
+            store, template = sections[m.group(1)]
+            i = int(m.group(2))
+            if i >= len(store):
+                return m.group(0)
+            return template.format(store[i])
+
+        self.page = CODE_PLACEHOLDER_RE.sub(restore, self.page)
 
     def strip_svgs(self):
         self.svgs = []
-        i = 0
-        for matched_block in re.findall(r"<svg[\s\S]*?</svg>", self.page):
-            new_link = "---obsidian_html_svg_block_"+str(i)
-            self.svgs.append(matched_block)
-            i += 1
 
-            safe_link = re.escape(matched_block)
-            self.page = re.sub(safe_link, new_link, self.page)
+        def stash(m):
+            self.svgs.append(m.group(0))
+            return "---obsidian_html_svg_block_" + str(len(self.svgs) - 1)
 
+        self.page = SVG_RE.sub(stash, self.page)
         return self.svgs
 
     def restore_svgs(self):
-        for i, v in enumerate(self.svgs):
-            self.page = self.page.replace("---obsidian_html_svg_block_"+str(i), v)
+        self.page = restore_svgs(self.page, self.svgs)
 
     def add_tag(self, tag):
         if "tags" not in self.metadata:
@@ -304,7 +340,9 @@ class MarkdownPage:
         # Further conversion will be done in the block below
         self.page = note2md.obs_img_to_md_img(self.pb, self.page)
 
-        for tag in re.findall(r'<img src=".*?/>', self.page):
+        def rewrite_html_img(m):
+            tag = m.group(0)
+
             # get template and link from tag
             # e.g. <img src="200w.gif"  width="200"> --> <img src="{link}"  width="200"> & 200w.gif
             parts = tag.split('src="')
@@ -317,7 +355,7 @@ class MarkdownPage:
 
             unquoted_link = urllib.parse.unquote(link)
             if "://" in unquoted_link:
-                continue
+                return tag
 
             # Find file
             rel_path_str, lo = self.pb.FileFinder.FindFile(link, self.pb)
@@ -330,7 +368,7 @@ class MarkdownPage:
                         print(
                             f"\t\t\t<continued> The link was not found in the file tree. Clean links in the file tree are: {', '.join(self.file_tree.keys())}"
                         )
-                continue
+                return tag
 
             # Get shorthand info
             relative_path = lo.path["markdown"]["file_relative_path"]
@@ -339,22 +377,21 @@ class MarkdownPage:
             lo.copy_file("ntm")
 
             # Adjust link in page
-            file_name = urllib.parse.unquote(link)
             relative_path = relative_path.as_posix()
             relative_path = ("../" * page_folder_depth) + relative_path
-            new_link = template.replace("{link}", urllib.parse.quote(relative_path))
+            return template.replace("{link}", urllib.parse.quote(relative_path))
 
-            safe_link = re.escape(tag)
-            self.page = re.sub(safe_link, new_link, self.page)
+        self.page = HTML_IMG_RE.sub(rewrite_html_img, self.page)
 
         # -- [4] Handle local image/video/audio links (copy them over to output)
-        for tag, link in re.findall("(?<=\!\[(.*?)\]\()(.*?)(?=\))", self.page):
+        def rewrite_embed(m):
+            tag, link = m.group(1), m.group(2)
             unq_link = urllib.parse.unquote(link)
 
             # clean_link_name = urllib.parse.unquote(link).split('/')[-1].split('|')[0]
             clean_link = unq_link.split("|")[0]
             if clean_link.strip() == "":
-                continue
+                return m.group(0)
 
             # Find file
             rel_path_str, lo = self.pb.FileFinder.FindFile(clean_link, self.pb)
@@ -367,7 +404,7 @@ class MarkdownPage:
                         print(
                             f"\t\t\t<continued> The link was not found in the file tree. Clean links in the file tree are: {', '.join(self.file_tree.keys())}"
                         )
-                continue
+                return m.group(0)
 
             # Get shorthand info
             suffix = lo.path["note"]["suffix"]
@@ -406,50 +443,57 @@ class MarkdownPage:
                 else:
                     new_link = f'<img src="{urllib.parse.quote(relative_path)}" width="{width}" alt="{alt}" title="{alt}" />'
 
-            safe_link = re.escape(f"![{tag}](" + link + ")")
-            self.page = re.sub(safe_link, new_link, self.page)
+            return new_link
+
+        self.page = EMBED_RE.sub(rewrite_embed, self.page)
 
         # -- [5] Change file name in proper markdown links to path
         # And while we are busy, change the path to point to the full relative path
-        proper_links = re.findall(r"(?<=\]\()[^\s\]]+(?=\))", self.page)
-        for matched_link in proper_links:
+        def rewrite_md_link(m):
+            matched_link = m.group(1)
+            tail = ""
+
             # There is currently no way to match links containing parentheses, AND not matching the last ) in a link like ([test](link))
             if matched_link.endswith(")"):
                 matched_link = matched_link[:-1]
+                tail = ")"
 
             # Get the filename
             link = urllib.parse.unquote(matched_link)
+            if link.startswith("#"):
+                return m.group(0)
 
-            if not link.startswith("#"):
-                res = self.pb.FileFinder.GetObsidianFilePath(link, self.pb)
-                rel_path_str = res["rtr_path_str"]
-                lo = res["fo"]
-                if lo is False:
-                    continue
+            res = self.pb.FileFinder.GetObsidianFilePath(link, self.pb)
+            rel_path_str = res["rtr_path_str"]
+            lo = res["fo"]
+            if lo is False:
+                return m.group(0)
 
-                # Determine if file is markdown
-                isMd = Path(rel_path_str).suffix == ".md"
-                if isMd:
-                    # Add to list to recurse to the link later
-                    self.links.append(lo)
+            # Determine if file is markdown
+            isMd = Path(rel_path_str).suffix == ".md"
+            if isMd:
+                # Add to list to recurse to the link later
+                self.links.append(lo)
 
-                # Get file info
-                file_link = lo.get_link("markdown", origin=origin)
+            # Get file info
+            file_link = lo.get_link("markdown", origin=origin)
 
-                # Update link
-                new_link = "](" + urllib.parse.quote(file_link) + ")"
-                safe_link = re.escape("](" + matched_link + ")")
-                self.page = re.sub(f"(?<![\[\(])({safe_link})", new_link, self.page)
+            if isMd is False:
+                # Copy file over to new location
+                lo.copy_file("ntm")
 
-                if isMd is False:
-                    # Copy file over to new location
-                    lo.copy_file("ntm")
+            # Update link, unless the link is directly preceded by [ or (
+            if m.start() > 0 and m.string[m.start() - 1] in "[(":
+                return m.group(0)
+            return "](" + urllib.parse.quote(file_link) + ")" + tail
+
+        self.page = MD_LINK_RE.sub(rewrite_md_link, self.page)
 
         # -- [6] Replace Obsidian links with proper markdown
         # This is any string in between [[ and ]], e.g. [[My Note]]
-        md_links = re.findall("(?<=\[\[).+?(?=\])", self.page)
-        for matched_link in md_links:
-            
+        def rewrite_wikilink(m):
+            matched_link = m.group(1)
+
             rest, alias = bisect(matched_link, "|")
             simple_path, hashpart = bisect(rest, "#", squash_tail=True) # hashpart can have more than 1 #!
             filename = simple_path.split("/")[-1]
@@ -491,8 +535,12 @@ class MarkdownPage:
                     newlink = '#' + make_valid_hashpart(slugify(hashpart))
                     alias = hashpart
 
-            # Replace Obsidian link with proper markdown link
-            self.page = self.page.replace("[[" + matched_link + "]]", f"[{alias}]({newlink})")
+            # Replace Obsidian link with proper markdown link (only when the link is closed with ]])
+            if m.group(2) is None:
+                return m.group(0)
+            return f"[{alias}]({newlink})"
+
+        self.page = WIKILINK_RE.sub(rewrite_wikilink, self.page)
 
         # -- [7] Fix newline issue by adding three spaces before any newline
         if not self.pb.gc("toggles/strict_line_breaks"):
@@ -501,38 +549,33 @@ class MarkdownPage:
         # -- [8] Insert markdown links for bare http(s) links (those without the [name](link) format).
         # Cannot start with [, (, nor "
         # match 'http://* ' or 'https://* ' (end match by whitespace)
-        matched_links = re.findall(r"(?<![\[\(\"])(https*:\/\/.[^\s|]*)", self.page)
-        
-        # sort from longest to shortest to avoid links with the same base being partly overwritten
-        matched_links.sort(reverse=True, key=lambda e: len(e))
-
-        for matched_link in matched_links:
-            new_md_link = f"[{matched_link}]({matched_link})"
-            safe_link = re.escape(matched_link)
-            self.page = re.sub(f"(?<![\[\(])({safe_link})", new_md_link, self.page) 
+        self.page = BARE_URL_RE.sub(lambda m: f"[{m.group(1)}]({m.group(1)})", self.page)
 
         # --- strip svg, we don't want to find "tags" in there
         self.strip_svgs()
 
         # -- [9] Remove inline tags, like #ThisIsATag
         # Inline tags are # connected to text (so no whitespace nor another #)
-        for matched_link in get_inline_tags(self.page):
-            tag = matched_link.replace(".", "")
-            new_md_str = f"**{tag}**"
+        def rewrite_inline_tag(m):
+            tag = m.group(0)[1:].replace(".", "")
+            self.add_tag(tag)
 
-            if self.pb.gc("toggles/preserve_inline_tags", cached=True):
-                new_md_str = "`{_obsidian_pattern_tag_" + tag + "}`"
+            # a tag at the very end of the page is left as is
+            if m.end() == len(m.string):
+                return m.group(0)
 
-            self.add_tag(tag)
+            if self.pb.gc("toggles/preserve_inline_tags", cached=True):
+                return "`{_obsidian_pattern_tag_" + tag + "}`"
+            return f"**{tag}**"
 
-            safe_str = "#" + re.escape(matched_link) + r"(?=[^\w/\-])"
-            self.page = re.sub(safe_str, new_md_str, self.page)
+        self.page = INLINE_TAG_RE.sub(rewrite_inline_tag, self.page)
 
         # --- restore svg, we don't want to find "tags" in there
         self.restore_svgs()
 
         # -- [10] Add code inclusions
-        for matched_link in re.findall(r'(\<inclusion href="[^"]*" />)', self.page, re.MULTILINE):
+        def include(m):
+            matched_link = m.group(0)
             link = matched_link.replace('<inclusion href="', "").replace('" />', "")
 
             result = self.pb.FileFinder.GetObsidianFilePath(link, self.pb)
@@ -540,23 +583,18 @@ class MarkdownPage:
             header = result["header"]
 
             if file_object is False:
-                self.page = self.page.replace(matched_link, f"> **obsidian-html error:** Could not find page {link}.")
-                continue
+                return f"> **obsidian-html error:** Could not find page {link}."
 
             self.links.append(file_object)
             link_path = file_object.get_link("markdown", origin=origin)
 
             if include_depth > 3:
-                self.page = self.page.replace(matched_link, f"[{link}]({link_path}).")
-                continue
+                return f"[{link}]({link_path})."
 
             if not file_object.is_valid_note("note"):
                 # make download button
                 file_object.copy_file("ntm")
-                self.page = self.page.replace(
-                    matched_link, f'[{link_path}]({urllib.parse.quote(link)}|_obsidian_html_download_button_)'
-                )
-                continue
+                return f'[{link_path}]({urllib.parse.quote(link)}|_obsidian_html_download_button_)'
 
             # Get code
             # included_page = MarkdownPage(self.pb, file_object, 'note', self.file_tree)
@@ -564,6 +602,8 @@ class MarkdownPage:
             included_page.ConvertObsidianPageToMarkdownPage(
                 origin=self.fo, include_depth=include_depth + 1, includer_page_depth=page_folder_depth, remove_block_references=False
             )
+            self.inclusions.append(file_object)
+            self.inclusions += included_page.inclusions
 
             # Get subsection of code if header is present
             if header != "":
@@ -586,20 +626,34 @@ class MarkdownPage:
                 # Wrap up
                 included_page.RestoreCodeSections()
 
-            self.page = self.page.replace(matched_link, "\n" + included_page.page + "\n")
-
             # [425] Add included references as links in graph view
             # add link to frontmatter yaml so that we can add it to the graphview
             if self.pb.gc("toggles/features/graph/show_inclusions_in_graph"):
                 self.AddInclusionLink(result["rtr_path_str"])
+
+            return "\n" + included_page.page + "\n"
+
+        self.page = INCLUSION_RE.sub(include, self.page)
         # -- [1] Restore codeblocks/-lines
         self.RestoreCodeSections()
 
         return self
 
 
+def restore_svgs(text, svgs):
+    """Puts the svgs that were replaced with placeholders by MarkdownPage.strip_svgs() back in."""
+
+    def restore(m):
+        i = int(m.group(1))
+        if i >= len(svgs):
+            return m.group(0)
+        return svgs[i]
+
+    return SVG_PLACEHOLDER_RE.sub(restore, text)
+
+
 def get_inline_tags(page):
-    return [x[1:].replace(".", "") for x in re.findall(r"(?<!\S)#[\w/\-]*[a-zA-Z\-_/][\w/\-]*", page)]
+    return [x[1:].replace(".", "") for x in INLINE_TAG_RE.findall(page)]
 
 def make_valid_hashpart(hashpart):
     """
@@ -4,14 +4,15 @@
 var SEARCH_DATA_SOURCE = '';                   // search.json contents
 var SEARCH_DATA_LOADED = false;
 var SEARCH_DATA = [];                          // SEARCH_DATA_SOURCE with changes made
+var SEARCH_INDEX;                              // search_index.json contents, built when the html was generated
 
 var URL_MODE = '{url_mode}';
 var RELATIVE_PATHS = {relative_paths};
 var CONFIGURED_HTML_URL_PREFIX = '{configured_html_url_prefix}';
 var TRY_PRELOAD = {try_preload};
 
-var fuse;                               // fuzzy search object
-var index;
+var SEARCH_RESULT_LIMIT = 100;                 // max amount of results per field
+var TERM_SEPARATOR = /[\p{Z}\p{S}\p{P}\p{C}]+/u;  // should be the same as TERM_SEPARATOR_RE in features/Search.py, see ci/unit_tests/tests_features/search_tokenizer.py
 
 
 // Get data
@@ -23,12 +24,13 @@ if (TRY_PRELOAD){
 async function PreLoadSearchData(){
     console.log('Try preloading search_data')
     let search_data = ls_get('search_data');
-    if (search_data){
+    let search_index = ls_get('search_index');
+    if (gzip_hash == ls_get('search_hash') && search_data && search_index){
         console.log('Using localStorage seach_data as input')
         SEARCH_DATA_SOURCE = JSON.parse(search_data)
+        SEARCH_INDEX = JSON.parse(search_index)
 
-        // start flex search, using SEARCH_DATA_SOURCE as input
-        InitFlexSearch();
+        InitSearch();
 
         // signal that the data is loaded and does not need to be reloaded
         SEARCH_DATA_LOADED = true;
@@ -49,9 +51,21 @@ async function LoadSearchData(){
     console.log('Search engine loading...')
     const start = performance.now();
 
-    function end_function(){
-        // start flex search, using SEARCH_DATA_SOURCE as input
-        InitFlexSearch();
+    // use cached data when it is not stale, otherwise get the data and cache it when possible
+    let use_cache = (gzip_hash == ls_get('search_hash'));
+    if (!use_cache){
+        ls_set('search_hash', '');
+    }
+
+    Promise.all([
+        LoadGzipJson('search_data', '/obs.html/data/search.json.gzip', use_cache),
+        LoadGzipJson('search_index', '/obs.html/data/search_index.json.gzip', use_cache)
+    ]).then(([search_data, search_index]) => {
+        ls_set('search_hash', gzip_hash);
+
+        SEARCH_DATA_SOURCE = search_data;
+        SEARCH_INDEX = search_index;
+        InitSearch();
 
         // signal that the data is loaded and does not need to be reloaded
         SEARCH_DATA_LOADED = true;
@@ -60,92 +74,143 @@ async function LoadSearchData(){
         console.log('Search engine loaded.')
         const end = performance.now();
         console.log(`Execution time search: ${end - start} ms`);
-    }
+    })
+}
 
-    // try using cached data
-    let search_hash = ls_get('search_hash');
-    if (gzip_hash == search_hash)
+async function LoadGzipJson(name, path, use_cache){
+    if (use_cache)
     {
-        // use parsed search_data (ready to be used) if present
-        let search_data = ls_get('search_data');
-        if (search_data){
-            console.log('Using localStorage seach_data as input')
-            SEARCH_DATA_SOURCE = JSON.parse(search_data)
-            return end_function()
+        // use unzipped data (ready to be used) if present
+        let data = ls_get(name);
+        if (data){
+            console.log(`Using localStorage ${name} as input`)
+            return JSON.parse(data)
         }
 
         // use zipped b64 data if present
-        let search_data_zipped_b64_str = ls_get('search_data_zipped_b64_str');
-        if (search_data_zipped_b64_str)
+        let data_zipped_b64_str = ls_get(name + '_zipped_b64_str');
+        if (data_zipped_b64_str)
         {
-            console.log('Using localStorage search_data_zipped_b64_str as input')
-            let search_data = UnzipData(search_data_zipped_b64_str)
-            SEARCH_DATA_SOURCE = JSON.parse(search_data)
-            return end_function()
+            console.log(`Using localStorage ${name}_zipped_b64_str as input`)
+            return JSON.parse(UnzipData(data_zipped_b64_str))
         }
     }
 
-    // no cached data available, get data and cache it when possible
-    console.log('Loading search data from file...')
+    console.log(`Loading ${name} from file...`)
+    let gzipped_data_str = await GetGzipContentsAsB64Str(CONFIGURED_HTML_URL_PREFIX + path);
+    let data = UnzipData(gzipped_data_str);
 
-    GetGzipContentsAsB64Str(CONFIGURED_HTML_URL_PREFIX + '/obs.html/data/search.json.gzip').then(gzipped_data_str => {
-
-        ls_set('search_hash', gzip_hash);
+    // stale data should not be used when caching the new data fails
+    ls_set(name, '');
+    ls_set(name + '_zipped_b64_str', '');
 
-        console.log('Unzipping search_data_zipped_b64_str to search_data... ')
-        let search_data = UnzipData(gzipped_data_str);
-        console.log('Unzipping search_data_zipped_b64_str to search_data... Done')
+    console.log(`Try caching ${name}... `)
+    try {
+        ls_set(name, data);
+        console.log(`Caching ${name}... Done`)
+    }
+    catch (error) {
+        console.error(error);
+        console.log(`Caching ${name}... Failed`)
+        ls_set(name, '');
 
-        console.log('Try caching search_data... ')
+        console.log(`Try caching ${name}_zipped_b64_str... `)
         try {
-            ls_set('search_data', search_data);
-            console.log('Caching search_data... Done')
-        } 
+            ls_set(name + '_zipped_b64_str', gzipped_data_str);
+            console.log(`Caching ${name}_zipped_b64_str... Done.`)
+        }
         catch (error) {
             console.error(error);
-            console.log('Caching search_data... Failed')
-
-            console.log('Try Caching search_data_zipped_b64_str... ')
-            try {
-                ls_set('search_data_zipped_b64_str', gzipped_data_str);
-                console.log('Caching search_data_zipped_b64_str... Done.')
-            } 
-            catch (error) {
-                console.error(error);
-                console.log('Caching search_data_zipped_b64_str... Failed')
-            }
+            console.log(`Caching ${name}_zipped_b64_str... Failed`)
         }
+    }
 
-        SEARCH_DATA_SOURCE = JSON.parse(search_data);
-        console.log('Loading search data from file... Done')
-        
-        return end_function()
-    })
+    console.log(`Loading ${name} from file... Done`)
+    return JSON.parse(data)
 }
 
-function InitFlexSearch(){
-    index = new FlexSearch.Document({
-        id: "id",
-        index: ["title", "content"],
-        tokenize: 'forward'
+function InitSearch(){
+    // the index is built when the html is generated, only the urls are set here
+    SEARCH_DATA_SOURCE.forEach(doc => {
+        doc.url = get_node_url_adaptive(doc);
+        SEARCH_DATA.push(doc);
     });
+}
 
-    let i = 0;
-    SEARCH_DATA_SOURCE.forEach(doc => {
-        let obj = {
-            id: i,
-            //content: doc.keywords,
-            content: doc.content,
-            title: doc.title,
-            url: get_node_url_adaptive(doc)
+
+// Search index
+// -----------------------------------------------------------------------------------------------
+function tokenize(text){
+    return text.toLowerCase().split(TERM_SEPARATOR).filter(x => x.length > 0);
+}
+
+function first_term_index(word){
+    // binary search for the first term that is >= word, the terms are sorted
+    let terms = SEARCH_INDEX.terms;
+    let lo = 0;
+    let hi = terms.length;
+    while (lo < hi){
+        let mid = (lo + hi) >> 1;
+        if (terms[mid] < word){
+            lo = mid + 1;
+        }
+        else {
+            hi = mid;
         }
-        index.add(obj);
+    }
+    return lo;
+}
 
-        doc.url = obj.url;
-        SEARCH_DATA.push(doc);
+function lookup_word(word, field_index){
+    // returns {id: 1 for an exact match, 0 for a match on the start of a term} for every entry with a term that starts with word
+    let matches = {};
+    let terms = SEARCH_INDEX.terms;
+    for (let i = first_term_index(word); i < terms.length && terms[i].startsWith(word); i++) {
+        let id = 0;
+        SEARCH_INDEX.postings[i][field_index].forEach(delta => {
+            id += delta;
+            if (!(id in matches) || terms[i] == word){
+                matches[id] = (terms[i] == word) ? 1 : 0;
+            }
+        });
+    }
+    return matches;
+}
 
-        i++;
+function search_index(search_string){
+    // returns [{field: <field>, result: [<id>, ...]}], only entries that match on all the words are included
+    let words = tokenize(search_string);
+    let results = [];
+    if (words.length == 0){
+        return results;
+    }
+
+    SEARCH_INDEX.fields.forEach((field, field_index) => {
+        let scores;
+        words.forEach(word => {
+            let matches = lookup_word(word, field_index);
+            if (scores === undefined){
+                scores = matches;
+                return;
+            }
+            let intersection = {};
+            for (let id in scores){
+                if (id in matches){
+                    intersection[id] = scores[id] + matches[id];
+                }
+            }
+            scores = intersection;
+        });
+
+        // exact matches first, then in the order of the search data
+        let ids = Object.keys(scores).map(Number);
+        ids.sort((a, b) => (scores[b] - scores[a]) || (a - b));
+        if (ids.length > 0){
+            results.push({field: field, result: ids.slice(0, SEARCH_RESULT_LIMIT)});
+        }
     });
+
+    return results;
 }
 
 
@@ -169,7 +234,7 @@ function run_search(search_string_id, hard_search_id) {
 }
 
 function search(string_search, hard_search) {
-    // get matches using flexsearch
+    // get matches using the search index
     results = GetResultsFlex(string_search, hard_search)
 
     // convert matches to a <ul><li> list
@@ -197,7 +262,7 @@ function GetResultsFlex(search_string, hard_search) {
     let match_ids = []
     let matches = []
 
-    index.search(search_string).forEach(field => {
+    search_index(search_string).forEach(field => {
         field.result.forEach(result => {
             let record_id = result
 